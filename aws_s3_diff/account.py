@@ -4,17 +4,21 @@ from aws_s3_diff.local_result import LocalResult
 
 
 def get_account_to_analyze() -> str:
-    result_file_names = LocalResult().get_file_names_results()
-    for account_to_analyze in S3UrisFileReader().get_accounts():
-        if get_account_file_name(account_to_analyze) not in result_file_names:
-            return account_to_analyze
+    accounts_to_analyze = get_accounts_to_analyze()
+    if len(accounts_to_analyze) > 0:
+        return accounts_to_analyze[0]
     # Unexpected situation. This method cannot be called if all accounts have been analyzed.
     raise RuntimeError("All AWS accounts have been analyzed")
 
 
-def have_all_accounts_been_analyzed() -> bool:
+def get_accounts_to_analyze() -> list[str]:
     result_file_names = LocalResult().get_file_names_results()
-    for account_to_analyze in S3UrisFileReader().get_accounts():
-        if get_account_file_name(account_to_analyze) not in result_file_names:
-            return False
-    return True
+    return [
+        account
+        for account in S3UrisFileReader().get_accounts()
+        if get_account_file_name(account) not in result_file_names
+    ]
+
+
+def have_all_accounts_been_analyzed() -> bool:
+    return len(get_accounts_to_analyze()) == 0
@@ -1,12 +1,17 @@
+import os
+import time
 from abc import ABC
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 
 from botocore.exceptions import ClientError
 from botocore.exceptions import EndpointConnectionError
 from botocore.exceptions import NoCredentialsError
+from botocore.exceptions import ProfileNotFound
 from pandas import DataFrame as Df
 
 from aws_s3_diff.account import get_account_to_analyze
+from aws_s3_diff.account import get_accounts_to_analyze
 from aws_s3_diff.account import have_all_accounts_been_analyzed
 from aws_s3_diff.config_file import AnalysisConfigChecker
 from aws_s3_diff.config_file import AnalysisConfigReader
@@ -15,12 +20,18 @@ from aws_s3_diff.config_file import S3UrisFileReader
 from aws_s3_diff.exception import AnalysisConfigError
 from aws_s3_diff.exception import FolderInS3UriError
 from aws_s3_diff.exception import MESSAGE_INCORRECT_CREDENTIALS
+from aws_s3_diff.exception import MESSAGE_S3_THROTTLING
 from aws_s3_diff.exception import S3UrisFileError
+from aws_s3_diff.exception import UnsortedAccountDataError
 from aws_s3_diff.local_result import AnalysisDateTimeExporter
 from aws_s3_diff.local_result import LocalResult
 from aws_s3_diff.logger import get_logger
+from aws_s3_diff.metrics import get_metrics
+from aws_s3_diff.metrics import MetricsExporter
 from aws_s3_diff.s3_data.all_accounts import AccountsCsvExporter
 from aws_s3_diff.s3_data.all_accounts import AccountsDataGenerator
+from aws_s3_diff.s3_data.all_accounts import AccountsPartitionedDataGenerator
+from aws_s3_diff.s3_data.all_accounts import AccountsSortedMergeDataGenerator
 from aws_s3_diff.s3_data.analysis import AnalysisCsvExporter
 from aws_s3_diff.s3_data.analysis import AnalysisDataGenerator
 from aws_s3_diff.s3_data.one_account import AccountCsvExporter
@@ -32,11 +43,13 @@ class Main:
         self._analysis_date_time_exporter = AnalysisDateTimeExporter()
         self._local_result = LocalResult()
         self._logger = get_logger()
+        self._metrics_exporter = MetricsExporter()
         self._s3_uris_file_checker = S3UrisFileChecker()
         self._s3_uris_file_reader = S3UrisFileReader()
 
     def run(self):
         self._logger.info("Welcome to the AWS S3 Diff tool!")
+        get_metrics().reset()
         try:
             self._s3_uris_file_checker.assert_file_is_correct()
         except S3UrisFileError as exception:
@@ -55,11 +68,27 @@ class Main:
         self._logger.info(f"AWS accounts configured to be analyzed:{''.join(accounts_list)}")
 
     def _export_csvs(self):
+        # The path is obtained before the analysis, that removes the file with the analysis directory name.
+        metrics_file_path = self._local_result.get_file_path_metrics()
+        try:
+            self._export_csvs_of_states()
+        finally:
+            self._metrics_exporter.export(metrics_file_path)
+
+    def _export_csvs_of_states(self):
         csvs_generator = _CsvsGenerator()
         while csvs_generator.must_run_next_state:
+            state_name = csvs_generator.state_name
+            start = time.perf_counter()
             try:
                 df = csvs_generator.get_df()
-            except (AnalysisConfigError, EndpointConnectionError, FolderInS3UriError) as exception:
+            except (
+                AnalysisConfigError,
+                EndpointConnectionError,
+                FolderInS3UriError,
+                ProfileNotFound,
+                UnsortedAccountDataError,
+            ) as exception:
                 self._logger.error(exception)
                 return
             except NoCredentialsError:
@@ -74,8 +103,12 @@ class Main:
                 if error_code in ("AccessDenied", "InvalidAccessKeyId"):
                     self._logger.error(MESSAGE_INCORRECT_CREDENTIALS)
                     return
+                if error_code == "SlowDown":
+                    self._logger.error(MESSAGE_S3_THROTTLING)
+                    return
                 raise Exception from exception
             csvs_generator.export_csv(df)
+            get_metrics().add_state(state_name, time.perf_counter() - start)
 
     def _get_error_message_no_such_bucket(self, exception: ClientError) -> str:
         bucket_name = exception.response["Error"]["BucketName"]
@@ -117,8 +150,14 @@ class _CsvsGenerator:
     def must_run_next_state(self) -> bool:
         return self._must_run_next_state
 
+    @property
+    def state_name(self) -> str:
+        return self._state.name
+
 
 class _State(ABC):
+    name = ""
+
     @abstractmethod
     def get_df(self) -> Df:
         pass
@@ -129,18 +168,31 @@ class _State(ABC):
 
 
 class _AccountState(_State):
+    name = "account"
+
     def __init__(self, csvs_generator: _CsvsGenerator):
         self._csvs_generator = csvs_generator
         self._account_csv_exporter = AccountCsvExporter()
         self._logger = get_logger()
+        self._must_analyze_all_accounts = os.getenv("AWS_PROFILES") == "true"
+        self._must_stream_export = os.getenv("AWS_STREAM_EXPORT") == "true"
 
     def get_df(self) -> Df:
+        if self._must_analyze_all_accounts:
+            self._export_all_accounts()
+            return Df()
         account = get_account_to_analyze()
         self._logger.info(f"Analyzing the AWS '{account}' account")
-        return AccountDataGenerator(account).get_df()
+        account_data_generator = AccountDataGenerator(account)
+        if self._must_stream_export:
+            # Export the results while they are generated instead of storing all of them in memory.
+            self._account_csv_exporter.export_dfs(account_data_generator.get_dfs())
+            return Df()
+        return account_data_generator.get_df()
 
     def export_csv(self, df: Df):
-        self._account_csv_exporter.export_df(df)
+        if not (self._must_analyze_all_accounts or self._must_stream_export):
+            self._account_csv_exporter.export_df(df)
         if have_all_accounts_been_analyzed():
             self._csvs_generator.set_state_combine()
         else:
@@ -150,22 +202,53 @@ class _AccountState(_State):
             )
             self._csvs_generator.set_must_not_run_next_state()
 
+    def _export_all_accounts(self):
+        """Each account uses its AWS profile, so they are analyzed at the same time in one run."""
+        accounts = get_accounts_to_analyze()
+        with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+            # Consume the results to raise the exceptions of the threads.
+            list(executor.map(self._export_account, accounts))
+
+    def _export_account(self, account: str):
+        self._logger.info(f"Analyzing the AWS '{account}' account")
+        account_data_generator = AccountDataGenerator(account)
+        account_csv_exporter = AccountCsvExporter(account)
+        if self._must_stream_export:
+            account_csv_exporter.export_dfs(account_data_generator.get_dfs())
+        else:
+            account_csv_exporter.export_df(account_data_generator.get_df())
+
 
 class _CombineState(_State):
+    name = "combine"
+
     def __init__(self, csvs_generator: _CsvsGenerator):
         self._csvs_generator = csvs_generator
         self._accounts_csv_exporter = AccountsCsvExporter()
         self._accounts_data_generator = AccountsDataGenerator()
+        self._partitions = int(os.getenv("AWS_COMBINE_PARTITIONS", 1))
+        self._is_sorted_merge = os.getenv("AWS_COMBINE_SORTED_MERGE") == "true"
 
     def get_df(self) -> Df:
+        # Export the results while they are generated, the accounts data can be bigger than the memory.
+        if self._is_sorted_merge:
+            must_verify_sort = os.getenv("AWS_COMBINE_VERIFY_SORTED") == "true"
+            self._accounts_csv_exporter.export_dfs(AccountsSortedMergeDataGenerator(must_verify_sort).get_dfs())
+            return Df()
+        if self._partitions > 1:
+            self._accounts_csv_exporter.export_dfs(AccountsPartitionedDataGenerator(self._partitions).get_dfs())
+            return Df()
         return self._accounts_data_generator.get_df()
 
     def export_csv(self, df: Df):
-        self._accounts_csv_exporter.export_df(df)
+        if not self._is_sorted_merge and self._partitions == 1:
+            self._accounts_csv_exporter.export_df(df)
         self._csvs_generator.set_state_analysis()
 
 
 class _AnalysisState(_State):
+    name = "analysis"
+
     def __init__(self, csvs_generator: _CsvsGenerator):
         self._csvs_generator = csvs_generator
         self._analysis_config_reader = AnalysisConfigReader()
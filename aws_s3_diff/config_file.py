@@ -10,10 +10,13 @@ from aws_s3_diff.exception import DuplicatedUriS3UrisFileError
 from aws_s3_diff.exception import EmptyAccountNameS3UrisFileError
 from aws_s3_diff.exception import EmptyUriS3UrisFileError
 from aws_s3_diff.local_result import LocalPath
+from aws_s3_diff.s3_data.listing_filter import ListingFilter
 from aws_s3_diff.s3_uri import S3UriPart
 from aws_s3_diff.type_custom import S3Query
 
 _FILE_NAME_ANALYSIS_CONFIG = "analysis-config.json"
+_FILE_NAME_LISTING_FILTERS = "listing-filters.json"
+_FILE_NAME_S3_URIS_TO_RELIST = "s3-uris-to-relist.txt"
 
 
 class AnalysisConfigChecker:
@@ -38,7 +41,12 @@ class AnalysisConfigChecker:
         accounts_wrong_check_more_files = self._get_accounts_not_exist(
             self._analysis_config_reader.get_accounts_that_must_not_have_more_files()
         )
-        accounts_wrong = accounts_wrong_check_hash_match | accounts_wrong_check_more_files
+        accounts_wrong_check_content_match = self._get_accounts_not_exist(
+            self._analysis_config_reader.get_accounts_where_content_must_match()
+        )
+        accounts_wrong = (
+            accounts_wrong_check_hash_match | accounts_wrong_check_more_files | accounts_wrong_check_content_match
+        )
         if len(accounts_wrong) == 1:
             raise AnalysisConfigError(self._get_error_message_account_does_not_exist(list(accounts_wrong)[0]))
         if len(accounts_wrong) > 1:
@@ -80,6 +88,10 @@ class AnalysisConfigReader:
     def get_accounts_where_hash_must_match(self) -> list[str]:
         return self._get_analysis_config()["is_hash_the_same_in"]
 
+    def get_accounts_where_content_must_match(self) -> list[str]:
+        """Optional, it downloads the files with different hash."""
+        return self._get_analysis_config().get("is_content_the_same_in", [])
+
     def _get_analysis_config(self) -> dict:
         if self._analysis_config_cache is None:
             file_path_what_to_analyze = self._config_directory_path.joinpath(_FILE_NAME_ANALYSIS_CONFIG)
@@ -148,3 +160,52 @@ class S3UrisFileReader:
         result = result.fillna("")  # Avoid error stripping column where all data is null.
         result = result.apply(lambda column: column.fillna("").astype(str).str.strip())
         return result.replace("", None)
+
+
+class S3UrisToRelistFileReader:
+    """The incremental analysis lists again these URIs, the other ones reuse the results of the previous analysis."""
+
+    def __init__(self):
+        self._config_directory_path = LocalPath().config_directory
+        self._s3_queries_cache = None
+
+    def get_s3_queries(self) -> set[S3Query]:
+        if self._s3_queries_cache is None:
+            self._s3_queries_cache = set()
+            file_path = self._config_directory_path.joinpath(_FILE_NAME_S3_URIS_TO_RELIST)
+            if file_path.is_file():
+                with open(file_path, encoding="utf-8") as file:
+                    s3_uris = [line.strip() for line in file if line.strip() != ""]
+                self._s3_queries_cache = {
+                    S3Query(S3UriPart(s3_uri).bucket, S3UriPart(s3_uri).key) for s3_uri in s3_uris
+                }
+        return self._s3_queries_cache
+
+
+class ListingFiltersFileReader:
+    """Optional file with the filters of the files to list. The `all` key has the filters of all the S3 URIs, and
+    each S3 URI key has the filters of that S3 URI, that replace the filters of `all` with the same name.
+    """
+
+    def __init__(self):
+        self._config_directory_path = LocalPath().config_directory
+        self._filters_of_s3_uris_cache = None
+
+    def get_listing_filter(self, s3_query: S3Query) -> ListingFilter | None:
+        filters_of_s3_uris = self._get_filters_of_s3_uris()
+        filters = filters_of_s3_uris.get("all", {}) | filters_of_s3_uris.get(str(s3_query), {})
+        return None if len(filters) == 0 else ListingFilter(filters)
+
+    def _get_filters_of_s3_uris(self) -> dict[str, dict]:
+        if self._filters_of_s3_uris_cache is None:
+            self._filters_of_s3_uris_cache = {}
+            file_path = self._config_directory_path.joinpath(_FILE_NAME_LISTING_FILTERS)
+            if file_path.is_file():
+                with open(file_path, encoding="utf-8") as read_file:
+                    filters_of_keys = json.load(read_file)
+                # The S3 URIs are compared with the trailing slash.
+                self._filters_of_s3_uris_cache = {
+                    key if key == "all" else str(S3Query(S3UriPart(key).bucket, S3UriPart(key).key)): filters
+                    for key, filters in filters_of_keys.items()
+                }
+        return self._filters_of_s3_uris_cache
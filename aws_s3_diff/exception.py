@@ -1,14 +1,45 @@
 MESSAGE_INCORRECT_CREDENTIALS = "Incorrect AWS credentials. Authenticate and run the program again"
+MESSAGE_S3_THROTTLING = (
+    "S3 has throttled the requests. Decrease AWS_LISTING_WORKERS or AWS_LISTING_PARTITIONS, or increase"
+    " AWS_THROTTLE_MAX_ATTEMPTS, and run the program again"
+)
 
 
 class FolderInS3UriError(IsADirectoryError):
-    pass
+    def __init__(self, bucket: str, folder_path_names: list[str]):
+        super().__init__(
+            f"Subfolders detected in bucket '{bucket}'. Set AWS_RECURSIVE=true to analyze subfolders"
+            f". Subfolders ({len(folder_path_names)}): {', '.join(folder_path_names)}"
+        )
 
 
 class AnalysisConfigError(ValueError):
     pass
 
 
+class ListingFiltersFileError(ValueError):
+    def __init__(self, error_detail: str):
+        super().__init__(f"Error in listing-filters.json. {error_detail}")
+
+
+class StorageFormatError(ValueError):
+    def __init__(self, storage_format: str, storage_formats: str):
+        super().__init__(f"Not supported storage format '{storage_format}'. Supported formats: {storage_formats}")
+
+
+class S3InventoryFormatError(ValueError):
+    def __init__(self, file_format: str, file_formats: str):
+        super().__init__(f"Not supported S3 Inventory format '{file_format}'. Supported formats: {file_formats}")
+
+
+class UnsortedAccountDataError(ValueError):
+    def __init__(self, account: str, bucket: str, prefix: str, file_name: str):
+        super().__init__(
+            f"The data of the AWS account {account} is not sorted by S3 URI and file name"
+            f": s3://{bucket}/{prefix}{file_name}. Set AWS_COMBINE_SORTED_MERGE=false to combine the accounts"
+        )
+
+
 class S3UrisFileError(ValueError):
     _message = "Error in s3-uris-to-analyze.csv"
     _error_detail = "No error specified"
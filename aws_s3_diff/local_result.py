@@ -2,14 +2,18 @@ import datetime
 from pathlib import Path
 
 from aws_s3_diff.logger import get_logger
+from aws_s3_diff.storage import get_storage
 
-_EXTENSION_FILE_NAME = ".csv"
-_ACCOUNTS_FILE_NAME = f"s3-files-all-accounts{_EXTENSION_FILE_NAME}"
-_ANALYSIS_FILE_NAME = f"analysis{_EXTENSION_FILE_NAME}"
+_ANALYSIS_FILE_NAME = "analysis.csv"
+_METRICS_FILE_NAME = "metrics.json"
 
 
 def get_account_file_name(account: str) -> str:
-    return f"{account}{_EXTENSION_FILE_NAME}"
+    return f"{account}.{get_storage().extension}"
+
+
+def _get_accounts_file_name() -> str:
+    return f"s3-files-all-accounts.{get_storage().extension}"
 
 
 class LocalPath:
@@ -48,18 +52,34 @@ class LocalResult:
         return self._directory_analysis_path.exists()
 
     def get_file_names_results(self) -> list[str]:
-        paths = self._directory_analysis_path.glob(f"*{_EXTENSION_FILE_NAME}")
+        paths = self._directory_analysis_path.glob(f"*.{get_storage().extension}")
         return [path.name for path in paths]
 
     def get_file_path_account(self, account: str) -> Path:
         return self._get_file_path_results(get_account_file_name(account))
 
     def get_file_path_all_accounts(self) -> Path:
-        return self._get_file_path_results(_ACCOUNTS_FILE_NAME)
+        return self._get_file_path_results(_get_accounts_file_name())
 
     def get_file_path_analysis(self) -> Path:
         return self._get_file_path_results(_ANALYSIS_FILE_NAME)
 
+    def get_file_path_metrics(self) -> Path:
+        return self._get_file_path_results(_METRICS_FILE_NAME)
+
+    def get_file_path_account_previous_analysis(self, account: str) -> Path | None:
+        """Returns the account file of the most recent analysis before the current one that has it."""
+        directory_paths = [
+            directory_path
+            for directory_path in self._local_paths.all_results_directory.glob("20*")
+            if directory_path.is_dir() and directory_path.name < self._directory_analysis_path.name
+        ]
+        for directory_path in sorted(directory_paths, reverse=True):
+            file_path = directory_path.joinpath(get_account_file_name(account))
+            if file_path.is_file():
+                return file_path
+        return None
+
     @property
     def _directory_analysis_path(self) -> Path:
         if self._directory_analysis_path_cache is None:
@@ -0,0 +1,119 @@
+import datetime
+import importlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+from aws_s3_diff.logger import get_logger
+from aws_s3_diff.type_custom import S3Query
+
+
+class Metrics:
+    """Metrics of one run of the program. The S3 URIs can be listed in different threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._start = datetime.datetime.now(datetime.timezone.utc)
+            self._states = []
+            self._queries = []
+            self._list_objects_v2_calls = 0
+            self._retries = 0
+            self._throttles = 0
+
+    def add_state(self, state_name: str, seconds: float):
+        with self._lock:
+            self._states.append({"state": state_name, "seconds": seconds})
+
+    def add_query(self, account: str, s3_query: S3Query, seconds: float, pages: int, keys: int, bytes_: int):
+        """The bytes are the sum of the sizes of the files."""
+        with self._lock:
+            self._queries.append(
+                {
+                    "account": account,
+                    "s3_uri": str(s3_query),
+                    "seconds": seconds,
+                    "pages": pages,
+                    "keys": keys,
+                    "bytes": bytes_,
+                }
+            )
+
+    def add_list_objects_v2_call(self, retries: int):
+        with self._lock:
+            self._list_objects_v2_calls += 1
+            self._retries += retries
+
+    def add_throttle(self):
+        with self._lock:
+            self._throttles += 1
+
+    def get_run(self) -> dict:
+        with self._lock:
+            return {
+                "start": self._start.isoformat(),
+                "states": list(self._states),
+                "queries": list(self._queries),
+                "list_objects_v2_calls": self._list_objects_v2_calls,
+                "retries": self._retries,
+                "throttles": self._throttles,
+                "max_memory_megabytes": _get_max_memory_megabytes(),
+            }
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+class MetricsExporter:
+    """Adds the metrics of the run to the metrics file, that has the runs of the analysis, one run for each account
+    if the accounts are analyzed in different runs.
+
+    The AWS_METRICS_HOOK environment variable can set a function, with the format `module:function`, that receives the
+    metrics of the run.
+    """
+
+    def __init__(self):
+        self._logger = get_logger()
+
+    def export(self, file_path: Path):
+        run = get_metrics().get_run()
+        runs = json.loads(file_path.read_text())["runs"] if file_path.is_file() else []
+        runs.append(run)
+        self._logger.debug(f"Exporting {file_path}")
+        file_path.write_text(json.dumps({"runs": runs}, indent=2))
+        self._call_hook(run)
+
+    def _call_hook(self, run: dict):
+        hook_name = os.getenv("AWS_METRICS_HOOK")
+        if hook_name is None:
+            return
+        try:
+            # A malformed name raises an error too, the format is `module:function`.
+            module_name, function_name = hook_name.split(":")
+            getattr(importlib.import_module(module_name), function_name)(run)
+        except Exception as exception:
+            # The analysis results are valid despite the hook errors.
+            self._logger.error(f"Error in the metrics hook {hook_name}: {exception!r}")
+
+
+def _get_max_memory_megabytes() -> float | None:
+    """https://docs.python.org/3/library/resource.html#resource.getrusage
+
+    None if the `resource` module is not available, for example in Windows.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes in Linux and bytes in macOS.
+    return max_memory / 1e6 if sys.platform == "darwin" else max_memory / 1e3
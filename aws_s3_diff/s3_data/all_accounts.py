@@ -1,13 +1,23 @@
+import heapq
+import itertools
+import pickle
 import re
+import tempfile
+from collections.abc import Iterable
+from collections.abc import Iterator
+from pathlib import Path
 
+import numpy as np
+import pandas as pd
 from pandas import DataFrame as Df
 from pandas import Index
 from pandas import MultiIndex
-from pandas import read_csv
 
 from aws_s3_diff.config_file import S3UrisFileReader
+from aws_s3_diff.exception import UnsortedAccountDataError
 from aws_s3_diff.local_result import LocalResult
 from aws_s3_diff.logger import get_logger
+from aws_s3_diff.s3_data.column_projection import get_file_column_names
 from aws_s3_diff.s3_data.df_utility import get_column_name_from_column_multi_index
 from aws_s3_diff.s3_data.interface import CsvExporter
 from aws_s3_diff.s3_data.interface import CsvReader
@@ -16,24 +26,38 @@ from aws_s3_diff.s3_data.one_account import AccountCsvReader
 from aws_s3_diff.s3_data.one_account import OriginS3UrisAsIndexAccountDfModifier
 from aws_s3_diff.s3_uri import get_df_add_last_slash_to_values
 from aws_s3_diff.s3_uri import get_df_uri_parts
+from aws_s3_diff.storage import get_storage
+
+_ROWS_PER_DF = 100_000
 
 
 class AccountsCsvExporter(CsvExporter):
     def __init__(self):
         self._local_result = LocalResult()
         self._logger = get_logger()
+        self._storage = get_storage()
 
     def export_df(self, df: Df):
         file_path = self._local_result.get_file_path_all_accounts()
         self._logger.info(f"Exporting {file_path}")
-        df.to_csv(index=False, path_or_buf=file_path)
+        self._storage.write_df(df, file_path)
+
+    def export_dfs(self, dfs: Iterable[Df]):
+        """A temporal file name is used until the end, an interrupted export must not mark the accounts as combined"""
+        file_path = self._local_result.get_file_path_all_accounts()
+        file_path_in_progress = file_path.with_name(f"{file_path.name}.tmp")
+        self._logger.info(f"Exporting {file_path}")
+        self._storage.write_dfs(dfs, file_path_in_progress)
+        file_path_in_progress.replace(file_path)
 
 
 class AccountsCsvReader(CsvReader):
     def __init__(self):
         self._accounts_cache = None
+        self._file_column_names = get_file_column_names()
         self._local_result = LocalResult()
         self._s3_uris_file_reader = S3UrisFileReader()
+        self._storage = get_storage()
 
     def get_df(self) -> Df:
         result = self._get_df_from_csv()
@@ -41,15 +65,22 @@ class AccountsCsvReader(CsvReader):
         return result
 
     def _get_df_from_csv(self) -> Df:
-        return read_csv(
-            self._local_result.get_file_path_all_accounts(),
-            index_col=[
-                f"bucket_in_{self._accounts[0]}",
-                f"prefix_in_{self._accounts[0]}",
-                "file_name_in_all_accounts",
-            ],
-            parse_dates=[f"date_in_{account}" for account in self._accounts],
-        ).astype({f"size_in_{account}": "Int64" for account in self._accounts})
+        return (
+            self._storage.read_df(
+                self._local_result.get_file_path_all_accounts(),
+                date_column_names=[
+                    f"date_in_{account}" for account in self._accounts if "date" in self._file_column_names
+                ],
+            )
+            .set_index(
+                [
+                    f"bucket_in_{self._accounts[0]}",
+                    f"prefix_in_{self._accounts[0]}",
+                    "file_name_in_all_accounts",
+                ]
+            )
+            .astype({f"size_in_{account}": "Int64" for account in self._accounts})
+        )
 
     def _get_multi_index_tuples_for_df_columns(self, columns: Index) -> list[tuple[str, str]]:
         return [self._get_multi_index_from_column_name(column_name) for column_name in columns]
@@ -71,19 +102,15 @@ class AccountsCsvReader(CsvReader):
 class AccountsDataGenerator(DataGenerator):
     def __init__(self):
         self._accounts_cache = None
+        self._file_column_names = get_file_column_names()
+        self._queries_index_cache = None
         self._s3_uris_file_reader = S3UrisFileReader()
 
     def get_df(self) -> Df:
         result = self._get_df_combine_accounts_s3_data()
         result = self._get_df_set_all_queries_despite_without_results(result)
         self._get_df_set_columns_as_single_index(result)
-        return result.reset_index(
-            names=[
-                f"bucket_in_{self._account_origin}",
-                f"prefix_in_{self._account_origin}",
-                "file_name_in_all_accounts",
-            ]
-        )
+        return result.reset_index(names=self._index_names)
 
     def _get_df_combine_accounts_s3_data(self) -> Df:
         account_origin_df = AccountCsvReader(self._account_origin).get_df()
@@ -117,6 +144,24 @@ class AccountsDataGenerator(DataGenerator):
     def _get_df_set_columns_as_single_index(self, df: Df):
         df.columns = df.columns.map(get_column_name_from_column_multi_index)
 
+    def _get_column_types_to_export(self) -> dict[str, str]:
+        result = {}
+        for account in self._accounts:
+            if "date" in self._file_column_names:
+                result[f"date_in_{account}"] = "datetime64[ns, UTC]"
+            result[f"size_in_{account}"] = "Int64"
+        return result
+
+    def _get_queries_index(self) -> MultiIndex:
+        """The (bucket, prefix) of the origin account queries, in the order of the S3 URIs file."""
+        if self._queries_index_cache is None:
+            self._queries_index_cache = self._get_empty_df_original_account_queries_as_index().index
+        return self._queries_index_cache
+
+    @property
+    def _index_names(self) -> list[str]:
+        return [f"bucket_in_{self._account_origin}", f"prefix_in_{self._account_origin}", "file_name_in_all_accounts"]
+
     @property
     def _account_origin(self) -> str:
         return self._accounts[0]
@@ -130,3 +175,221 @@ class AccountsDataGenerator(DataGenerator):
         if self._accounts_cache is None:
             self._accounts_cache = self._s3_uris_file_reader.get_accounts()
         return self._accounts_cache
+
+
+class AccountsPartitionedDataGenerator(AccountsDataGenerator):
+    """Combines the accounts without reading all their data in memory, the memory is bounded by the partitions size.
+
+    The rows of each account are split in partition files by the hash of their (bucket, prefix, name) index, so each
+    partition is joined independently. The joined partitions are sorted and merged to return the same rows, in the same
+    order, as `AccountsDataGenerator`: the order of the queries, then the order of the first account with the file.
+    """
+
+    _sort_column_names = ["query_position", "account_position", "row_number"]
+
+    def __init__(self, partitions: int):
+        super().__init__()
+        self._local_result = LocalResult()
+        self._partitions = partitions
+        self._column_names = []
+        self._query_positions_with_files = set()
+
+    def get_df(self) -> Df:
+        return pd.concat(self.get_dfs(), ignore_index=True)
+
+    def get_dfs(self) -> Iterator[Df]:
+        directory_path_all_accounts = self._local_result.get_file_path_all_accounts().parent
+        with tempfile.TemporaryDirectory(dir=directory_path_all_accounts) as directory_path_name:
+            directory_path = Path(directory_path_name)
+            for account in self._accounts:
+                self._export_account_partitions(account, directory_path)
+            sorted_file_paths = [
+                self._export_partition_joined_and_sorted(partition_number, directory_path)
+                for partition_number in range(self._partitions)
+            ]
+            yield from self._get_dfs_merge_sorted_files(sorted_file_paths)
+
+    def _export_account_partitions(self, account: str, directory_path: Path):
+        df_modifier = OriginS3UrisAsIndexAccountDfModifier(self._account_origin, account)
+        row_number = 0
+        for df in AccountCsvReader(account).get_dfs(_ROWS_PER_DF):
+            if account != self._account_origin:
+                df = df_modifier.get_df_modified(df)
+            # Required to sort the joined rows as the in-memory join.
+            df[(account, "row_number")] = np.arange(row_number, row_number + len(df))
+            row_number += len(df)
+            partition_numbers = pd.util.hash_pandas_object(df.index, index=False).to_numpy() % self._partitions
+            for partition_number, partition_df in df.groupby(partition_numbers):
+                _append_df_to_file(
+                    partition_df, self._get_partition_file_path(directory_path, account, partition_number)
+                )
+
+    def _export_partition_joined_and_sorted(self, partition_number: int, directory_path: Path) -> Path:
+        account_dfs = [
+            self._get_df_of_partition(account, partition_number, directory_path) for account in self._accounts
+        ]
+        result = account_dfs[0].join(account_dfs[1:], how="outer")
+        row_number_column_names = [(account, "row_number") for account in self._accounts]
+        data_column_names = [
+            column_name for column_name in result.columns if column_name not in row_number_column_names
+        ]
+        result = result.dropna(axis="index", how="all", subset=data_column_names)
+        sort_values = self._get_sort_values(result, row_number_column_names)
+        result = result.drop(columns=row_number_column_names)
+        self._get_df_set_columns_as_single_index(result)
+        result = result.reset_index(names=self._index_names)
+        for column_index, column_name in enumerate(self._sort_column_names):
+            result.insert(column_index, column_name, sort_values[column_index])
+        # The in-memory join omits the rows of S3 URIs not in the origin account.
+        result = result.loc[result["query_position"] != -1].sort_values(self._sort_column_names)
+        self._column_names = result.columns.tolist()
+        self._query_positions_with_files.update(result["query_position"].unique().tolist())
+        file_path = directory_path.joinpath(f"sorted-{partition_number}.pickle")
+        for start_index in range(0, len(result), _ROWS_PER_DF):
+            _append_df_to_file(result.iloc[start_index : start_index + _ROWS_PER_DF], file_path)
+        return file_path
+
+    def _get_df_of_partition(self, account: str, partition_number: int, directory_path: Path) -> Df:
+        dfs = list(_get_dfs_from_file(self._get_partition_file_path(directory_path, account, partition_number)))
+        if len(dfs) > 0:
+            return pd.concat(dfs)
+        return Df(
+            columns=MultiIndex.from_product([[account], [*self._file_column_names, "row_number"]]),
+            index=MultiIndex.from_arrays([[], [], []], names=["bucket", "prefix", "name"]),
+        )
+
+    def _get_sort_values(self, df: Df, row_number_column_names: list[tuple[str, str]]) -> list[np.ndarray]:
+        query_positions = self._get_queries_index().get_indexer(df.index.droplevel("name"))
+        account_positions = np.full(len(df), -1)
+        row_numbers = np.full(len(df), -1)
+        # The first account with the file determines the order.
+        for account_position, column_name in reversed(list(enumerate(row_number_column_names))):
+            has_the_account_the_file = df[column_name].notnull().to_numpy()
+            account_positions[has_the_account_the_file] = account_position
+            row_numbers[has_the_account_the_file] = df[column_name].to_numpy()[has_the_account_the_file]
+        return [query_positions, account_positions, row_numbers]
+
+    def _get_dfs_merge_sorted_files(self, file_paths: list[Path]) -> Iterator[Df]:
+        rows_of_files = [_get_rows_from_file(file_path) for file_path in file_paths]
+        rows_of_queries_without_files = self._get_df_queries_without_files().itertuples(index=False, name=None)
+        rows = heapq.merge(
+            *rows_of_files, rows_of_queries_without_files, key=lambda row: row[: len(self._sort_column_names)]
+        )
+        while rows_df := list(itertools.islice(rows, _ROWS_PER_DF)):
+            df = Df.from_records(rows_df, columns=self._column_names)
+            yield df.drop(columns=self._sort_column_names).astype(self._get_column_types_to_export())
+
+    def _get_df_queries_without_files(self) -> Df:
+        """The in-memory join returns one row without file for each S3 URI without files in all the accounts."""
+        queries_index = self._get_queries_index()
+        query_positions = [
+            query_position
+            for query_position in range(len(queries_index))
+            if query_position not in self._query_positions_with_files
+        ]
+        result = Df(columns=self._column_names, index=range(len(query_positions)))
+        result["query_position"] = query_positions
+        result["account_position"] = -1
+        result["row_number"] = -1
+        result[self._index_names[0]] = queries_index.get_level_values("bucket")[query_positions]
+        result[self._index_names[1]] = queries_index.get_level_values("prefix")[query_positions]
+        return result
+
+    def _get_partition_file_path(self, directory_path: Path, account: str, partition_number: int) -> Path:
+        return directory_path.joinpath(f"{self._accounts.index(account)}-{partition_number}.pickle")
+
+
+class AccountsSortedMergeDataGenerator(AccountsDataGenerator):
+    """Combines the accounts with a streaming merge of their files, the memory does not depend on the files size.
+
+    The S3 responses are sorted by key, so the rows of each account file are sorted by S3 URI, in the order of the
+    S3 URIs file, and by file name. The result has the same rows as `AccountsDataGenerator`, the files of each S3 URI
+    are sorted by name, instead of having the files that only exist in the target accounts after the origin ones.
+    """
+
+    def __init__(self, must_verify_sort: bool = False):
+        super().__init__()
+        self._local_result = LocalResult()
+        self._must_verify_sort = must_verify_sort
+        self._storage = get_storage()
+
+    def get_df(self) -> Df:
+        return pd.concat(self.get_dfs(), ignore_index=True)
+
+    def get_dfs(self) -> Iterator[Df]:
+        column_names = self._index_names + [
+            f"{column_name}_in_{account}" for account in self._accounts for column_name in self._file_column_names
+        ]
+        rows = self._get_rows()
+        while rows_df := list(itertools.islice(rows, _ROWS_PER_DF)):
+            yield Df.from_records(rows_df, columns=column_names).astype(self._get_column_types_to_export())
+
+    def _get_rows(self) -> Iterator[tuple]:
+        queries_index = self._get_queries_index()
+        rows_of_accounts = [
+            self._get_rows_of_account(account_position, account)
+            for account_position, account in enumerate(self._accounts)
+        ]
+        # The account position avoids comparing the values of the accounts with the same file.
+        rows = heapq.merge(*rows_of_accounts)
+        next_query_position = 0
+        columns = len(self._file_column_names)
+        for (query_position, file_name), rows_of_file in itertools.groupby(rows, key=lambda row: row[:2]):
+            yield from self._get_rows_of_queries_without_files(next_query_position, query_position)
+            next_query_position = query_position + 1
+            values = [np.nan] * columns * len(self._accounts)
+            for _, _, account_position, *account_values in rows_of_file:
+                values[columns * account_position : columns * (account_position + 1)] = account_values
+            yield *queries_index[query_position], file_name, *values
+        yield from self._get_rows_of_queries_without_files(next_query_position, len(queries_index))
+
+    def _get_rows_of_queries_without_files(self, start_query_position: int, end_query_position: int) -> Iterator[tuple]:
+        for query_position in range(start_query_position, end_query_position):
+            yield (
+                *self._get_queries_index()[query_position],
+                np.nan,
+                *[np.nan] * len(self._file_column_names) * len(self._accounts),
+            )
+
+    def _get_rows_of_account(self, account_position: int, account: str) -> Iterator[tuple]:
+        """Returns (query position, file name, account position, *file columns) for each file of the account."""
+        query_positions = {
+            (s3_query.bucket, s3_query.prefix): query_position
+            for query_position, s3_query in enumerate(self._s3_uris_file_reader.get_s3_queries_for_account(account))
+        }
+        last_row_key = None
+        for df in self._storage.read_dfs(
+            self._local_result.get_file_path_account(account),
+            date_column_names=["date"] if "date" in self._file_column_names else [],
+            rows_per_df=_ROWS_PER_DF,
+        ):
+            # The rows without file are the S3 URIs without files.
+            df = df.loc[df["name"].notnull()].astype({"size": "Int64"})
+            for bucket, prefix, file_name, *values in df.itertuples(index=False, name=None):
+                row_key = (query_positions[(bucket, prefix)], file_name)
+                if self._must_verify_sort and last_row_key is not None and row_key <= last_row_key:
+                    raise UnsortedAccountDataError(account=account, bucket=bucket, prefix=prefix, file_name=file_name)
+                last_row_key = row_key
+                yield *row_key, account_position, *values
+
+
+def _append_df_to_file(df: Df, file_path: Path):
+    """The partition files are only used by this program, pickle keeps the types and allows appending Dfs."""
+    with open(file_path, "ab") as file:
+        pickle.dump(df, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _get_dfs_from_file(file_path: Path) -> Iterator[Df]:
+    if not file_path.is_file():
+        return
+    with open(file_path, "rb") as file:
+        while True:
+            try:
+                yield pickle.load(file)
+            except EOFError:
+                return
+
+
+def _get_rows_from_file(file_path: Path) -> Iterator[tuple]:
+    for df in _get_dfs_from_file(file_path):
+        yield from df.itertuples(index=False, name=None)
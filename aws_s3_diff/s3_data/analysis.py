@@ -1,18 +1,27 @@
+import logging
+import os
 import re
 from abc import ABC
 from abc import abstractmethod
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
+import numpy as np
+import pandas as pd
 from pandas import DataFrame as Df
-from pandas import Series
 
 from aws_s3_diff.config_file import AnalysisConfigReader
+from aws_s3_diff.config_file import S3UrisFileReader
 from aws_s3_diff.local_result import LocalResult
 from aws_s3_diff.logger import get_logger
 from aws_s3_diff.s3_data.all_accounts import AccountsCsvReader
 from aws_s3_diff.s3_data.df_utility import get_column_name_from_column_multi_index
 from aws_s3_diff.s3_data.interface import CsvExporter
 from aws_s3_diff.s3_data.interface import DataGenerator
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.s3_data.s3_content import S3ContentHasher
 
 
 class AnalysisCsvExporter(CsvExporter):
@@ -30,6 +39,7 @@ class AnalysisDataGenerator(DataGenerator):
     def __init__(self):
         self._accounts_csv_reader = AccountsCsvReader()
         self._analysis_config_reader = AnalysisConfigReader()
+        self._processes = int(os.getenv("AWS_ANALYSIS_PROCESSES", 1))
 
     def get_df(self) -> Df:
         df = self._get_df_s3_data_analyzed()
@@ -40,82 +50,164 @@ class AnalysisDataGenerator(DataGenerator):
         return self._get_df_set_analysis_columns(all_accounts_s3_data_df)
 
     def _get_df_set_analysis_columns(self, df: Df) -> Df:
-        account_origin = self._analysis_config_reader.get_account_origin()
-        result_builder = _AnalysisBuilder(account_origin, df)
-        if len(self._analysis_config_reader.get_accounts_where_hash_must_match()):
-            result_builder.with_analysis_is_hash_matched()
-        if len(self._analysis_config_reader.get_accounts_that_must_not_have_more_files()):
-            result_builder.with_analysis_can_the_file_exist()
-        return result_builder.build()
+        if self._processes > 1:
+            return _AnalysisProcessPool(self._processes, self._analysis_config_reader).get_df_set_analysis_columns(df)
+        return _get_df_set_analysis_columns(self._analysis_config_reader, df)
 
     def _get_df_with_single_index(self, df: Df) -> Df:
-        result = df.copy()
-        self._set_df_columns_as_single_index(result)
-        result = result.rename(columns=lambda column_name: re.sub("^analysis_", "", column_name))
-        return result.reset_index()
+        # The Df has been created by this class, its columns are modified instead of copying it.
+        df.columns = [
+            re.sub("^analysis_", "", get_column_name_from_column_multi_index(column_name)) for column_name in df.columns
+        ]
+        return df.reset_index()
 
-    def _set_df_columns_as_single_index(self, df: Df):
-        df.columns = df.columns.map(get_column_name_from_column_multi_index)
+
+class _AnalysisProcessPool:
+    """Sets the analysis columns of row ranges of the Df in parallel processes.
+
+    The processes only receive the columns required by the analysis. The analysis columns of the row ranges are
+    concatenated in the order of the ranges, the result is the same as with one process.
+    """
+
+    def __init__(self, processes: int, analysis_config_reader: AnalysisConfigReader):
+        self._analysis_config_reader = analysis_config_reader
+        self._logger = get_logger()
+        self._processes = processes
+
+    def get_df_set_analysis_columns(self, df: Df) -> Df:
+        df_to_analyze = df.loc[:, self._get_column_names_to_analyze(df)]
+        row_ranges = np.array_split(np.arange(len(df_to_analyze)), self._processes)
+        self._logger.info(f"Analyzing {len(df_to_analyze)} files in {self._processes} processes")
+        # The workers that compare the content are split between the processes, one for each process at least.
+        content_hash_workers = max(1, int(os.getenv("AWS_CONTENT_HASH_WORKERS", 10)) // self._processes)
+        with ProcessPoolExecutor(
+            max_workers=self._processes, initializer=_set_worker_config, initargs=(content_hash_workers,)
+        ) as executor:
+            analysis_dfs = list(
+                executor.map(
+                    _get_df_analysis_columns,
+                    [self._analysis_config_reader] * len(row_ranges),
+                    [df_to_analyze.iloc[row_range] for row_range in row_ranges],
+                )
+            )
+        analysis_df = pd.concat(analysis_dfs)
+        for column_name in analysis_df.columns:
+            df[column_name] = analysis_df[column_name].to_numpy()
+        return df
+
+    def _get_column_names_to_analyze(self, df: Df) -> list[tuple[str, str]]:
+        """The hashes are not in the Df if the columns are projected for analysis without them."""
+        accounts = [self._analysis_config_reader.get_account_origin()]
+        for account in (
+            self._analysis_config_reader.get_accounts_where_hash_must_match()
+            + self._analysis_config_reader.get_accounts_that_must_not_have_more_files()
+            + self._analysis_config_reader.get_accounts_where_content_must_match()
+        ):
+            if account not in accounts:
+                accounts.append(account)
+        return [
+            (account, column_name)
+            for account in accounts
+            for column_name in ("size", "hash")
+            if (account, column_name) in df
+        ]
+
+
+def _get_df_set_analysis_columns(analysis_config_reader: AnalysisConfigReader, df: Df) -> Df:
+    account_origin = analysis_config_reader.get_account_origin()
+    result_builder = _AnalysisBuilder(account_origin, df, analysis_config_reader)
+    if len(analysis_config_reader.get_accounts_where_hash_must_match()):
+        result_builder.with_analysis_is_hash_matched()
+    if len(analysis_config_reader.get_accounts_that_must_not_have_more_files()):
+        result_builder.with_analysis_can_the_file_exist()
+    if len(analysis_config_reader.get_accounts_where_content_must_match()):
+        result_builder.with_analysis_is_content_matched()
+    return result_builder.build()
+
+
+def _get_df_analysis_columns(analysis_config_reader: AnalysisConfigReader, df: Df) -> Df:
+    """Runs in the processes of `_AnalysisProcessPool`."""
+    return _get_df_set_analysis_columns(analysis_config_reader, df).loc[:, ["analysis"]]
+
+
+def _set_worker_config(content_hash_workers: int):
+    """The main process logs the analysis, instead of each process."""
+    get_logger().setLevel(logging.WARNING)
+    os.environ["AWS_CONTENT_HASH_WORKERS"] = str(content_hash_workers)
 
 
 _AccountsToCompare = namedtuple("_AccountsToCompare", "origin target")
 
 
+class _TwoAccountsMasks(NamedTuple):
+    has_the_origin_account_a_file: np.ndarray
+    has_the_target_account_a_file: np.ndarray
+    is_the_same_file_in_both_accounts: np.ndarray
+
+    @classmethod
+    def from_df(cls, accounts: _AccountsToCompare, df: Df) -> "_TwoAccountsMasks":
+        return cls(
+            has_the_origin_account_a_file=df.loc[:, (accounts.origin, "size")].notnull().to_numpy(),
+            has_the_target_account_a_file=df.loc[:, (accounts.target, "size")].notnull().to_numpy(),
+            is_the_same_file_in_both_accounts=cls._get_mask_is_the_same_hash(accounts, df),
+        )
+
+    @staticmethod
+    def _get_mask_is_the_same_hash(accounts: _AccountsToCompare, df: Df) -> np.ndarray:
+        """Without the hash columns, projected for analysis without them, no file is the same."""
+        if (accounts.origin, "hash") not in df:
+            return np.zeros(len(df), dtype=bool)
+        # The comparison of null values returns False.
+        # https://pandas.pydata.org/docs/user_guide/missing_data.html#values-considered-missing
+        return df.loc[:, (accounts.origin, "hash")].eq(df.loc[:, (accounts.target, "hash")]).to_numpy()
+
+
 class _TwoAccountsAnalysisSetter(ABC):
-    def __init__(self, accounts: _AccountsToCompare, df: Df):
+    """Adds the analysis column to the Df, without copying it."""
+
+    def __init__(self, accounts: _AccountsToCompare, df: Df, masks: _TwoAccountsMasks | None = None):
         self._accounts = accounts
         self._df = df
         self._logger = get_logger()
+        self._masks = _TwoAccountsMasks.from_df(accounts, df) if masks is None else masks
 
-    @abstractmethod
     def get_df_set_analysis_column(self) -> Df:
-        pass
+        self._log_analysis()
+        # https://stackoverflow.com/questions/18470323/selecting-columns-from-pandas-multiindex
+        self._df[("analysis", self._column_name_result)] = self._get_analysis_values()
+        return self._df
 
     @property
-    def _is_the_same_file_in_both_accounts(self) -> Series:
-        # Replace nan results to avoid incorrect values due to equality comparisons between null values.
-        # https://pandas.pydata.org/docs/user_guide/missing_data.html#filling-missing-data
-        return (
-            self._df.loc[:, (self._accounts.origin, "hash")]
-            .eq(self._df.loc[:, (self._accounts.target, "hash")])
-            .fillna(False)
-        )
+    @abstractmethod
+    def _column_name_result(self) -> str:
+        pass
 
-    @property
-    def _has_the_origin_account_a_file(self) -> Series:
-        return self._df.loc[:, (self._accounts.origin, "size")].notnull()
+    @abstractmethod
+    def _get_analysis_values(self) -> np.ndarray:
+        """Object array of True, False and None values."""
+        pass
 
-    @property
-    def _has_the_target_account_a_file(self) -> Series:
-        return self._df.loc[:, (self._accounts.target, "size")].notnull()
+    @abstractmethod
+    def _log_analysis(self):
+        pass
 
 
 class _IsHashMatchedTwoAccountsAnalysisSetter(_TwoAccountsAnalysisSetter):
-    def get_df_set_analysis_column(self) -> Df:
+    def _get_analysis_values(self) -> np.ndarray:
+        return np.select(
+            [
+                self._masks.has_the_origin_account_a_file & self._masks.is_the_same_file_in_both_accounts,
+                self._masks.has_the_origin_account_a_file | self._masks.has_the_target_account_a_file,
+            ],
+            [True, False],
+            default=None,
+        )
+
+    def _log_analysis(self):
         self._logger.info(
             f"Analyzing if the files in the '{self._accounts.target}' account have the same hash as in the"
             f"'{self._accounts.origin}' account"
         )
-        result = self._df.copy()
-        # https://stackoverflow.com/questions/18470323/selecting-columns-from-pandas-multiindex
-        result[[("analysis", self._column_name_result)]] = None
-        result.loc[
-            self._has_the_origin_account_a_file & ~self._is_the_same_file_in_both_accounts,
-            [("analysis", self._column_name_result)],
-        ] = False
-        result.loc[
-            self._has_the_origin_account_a_file & self._is_the_same_file_in_both_accounts,
-            [("analysis", self._column_name_result)],
-        ] = True
-        result.loc[
-            ~self._has_the_origin_account_a_file & self._has_the_target_account_a_file,
-            [("analysis", self._column_name_result)],
-        ] = False
-        result.loc[
-            ~self._has_the_origin_account_a_file & ~self._has_the_target_account_a_file,
-            [("analysis", self._column_name_result)],
-        ] = None
-        return result
 
     @property
     def _column_name_result(self) -> str:
@@ -123,29 +215,109 @@ class _IsHashMatchedTwoAccountsAnalysisSetter(_TwoAccountsAnalysisSetter):
 
 
 class _CanFileExistTwoAccountsAnalysisSetter(_TwoAccountsAnalysisSetter):
-    def get_df_set_analysis_column(self) -> Df:
+    def _get_analysis_values(self) -> np.ndarray:
+        return np.select(
+            [~self._masks.has_the_origin_account_a_file & self._masks.has_the_target_account_a_file],
+            [False],
+            default=None,
+        )
+
+    def _log_analysis(self):
         self._logger.info(
             f"Analyzing if the files in the '{self._accounts.target}' account can exist, compared to the"
             f" '{self._accounts.origin}' account"
         )
-        result = self._df.copy()
-        result[[("analysis", self._column_name_result)]] = None
-        result.loc[
-            ~self._has_the_origin_account_a_file & self._has_the_target_account_a_file,
-            [("analysis", self._column_name_result)],
-        ] = False
-        return result
 
     @property
     def _column_name_result(self) -> str:
         return f"can_exist_in_{self._accounts.target}"
 
 
+class _IsContentMatchedTwoAccountsAnalysisSetter(_TwoAccountsAnalysisSetter):
+    """Compares the SHA-256 of the content of the files with the same size and different hash.
+
+    The hash of the files uploaded with multipart depends on the part size, so equal files can have different hashes.
+    The other files are not compared, the S3 objects are downloaded if S3 has not stored their checksum.
+    """
+
+    def __init__(self, accounts: _AccountsToCompare, df: Df, masks: _TwoAccountsMasks | None = None):
+        super().__init__(accounts, df, masks)
+        self._origin_hasher = S3ContentHasher(_get_s3_client(accounts.origin))
+        self._target_hasher = S3ContentHasher(_get_s3_client(accounts.target))
+
+    def _get_analysis_values(self) -> np.ndarray:
+        result = np.full(len(self._df), None, dtype=object)
+        row_numbers_to_compare = np.flatnonzero(self._get_mask_files_to_compare())
+        if len(row_numbers_to_compare) == 0:
+            return result
+        target_queries = self._get_target_bucket_and_prefix_of_origin_queries()
+        files_to_compare = [
+            (bucket, f"{prefix}{file_name}", *target_queries[(bucket, prefix)], file_name)
+            for bucket, prefix, file_name in self._df.index[row_numbers_to_compare]
+        ]
+        # The files are compared in parallel, each thread downloads one range at the same time.
+        with ThreadPoolExecutor(max_workers=int(os.getenv("AWS_CONTENT_HASH_WORKERS", 10))) as executor:
+            result[row_numbers_to_compare] = list(executor.map(self._is_the_same_content, files_to_compare))
+        return result
+
+    def _is_the_same_content(self, file_to_compare: tuple[str, str, str, str, str]) -> bool:
+        origin_bucket, origin_key, target_bucket, target_prefix, file_name = file_to_compare
+        return self._origin_hasher.get_hash(origin_bucket, origin_key) == self._target_hasher.get_hash(
+            target_bucket, f"{target_prefix}{file_name}"
+        )
+
+    def _get_mask_files_to_compare(self) -> np.ndarray:
+        is_the_same_size = (
+            self._df.loc[:, (self._accounts.origin, "size")]
+            .eq(self._df.loc[:, (self._accounts.target, "size")])
+            .fillna(False)
+            .to_numpy(dtype=bool)
+        )
+        return (
+            self._masks.has_the_origin_account_a_file
+            & self._masks.has_the_target_account_a_file
+            & ~self._masks.is_the_same_file_in_both_accounts
+            & is_the_same_size
+        )
+
+    def _get_target_bucket_and_prefix_of_origin_queries(self) -> dict[tuple[str, str], tuple[str, str]]:
+        """Bucket and prefix of the target account for the bucket and prefix of the origin account."""
+        s3_uris_file_reader = S3UrisFileReader()
+        return {
+            (origin_s3_query.bucket, origin_s3_query.prefix): (target_s3_query.bucket, target_s3_query.prefix)
+            for origin_s3_query, target_s3_query in zip(
+                s3_uris_file_reader.get_s3_queries_for_account(self._accounts.origin),
+                s3_uris_file_reader.get_s3_queries_for_account(self._accounts.target),
+                strict=True,
+            )
+        }
+
+    def _log_analysis(self):
+        self._logger.info(
+            f"Analyzing if the files in the '{self._accounts.target}' account with other hash have the same content as"
+            f" in the '{self._accounts.origin}' account"
+        )
+
+    @property
+    def _column_name_result(self) -> str:
+        return f"is_content_the_same_in_{self._accounts.target}"
+
+
+def _get_s3_client(account: str):
+    """With AWS_PROFILES, each account uses the AWS profile with its name."""
+    profile_name = account if os.getenv("AWS_PROFILES") == "true" else None
+    return S3ClientFactory(profile_name).get_client()
+
+
 class _AnalysisBuilder:
-    def __init__(self, account_origin: str, df: Df):
+    def __init__(self, account_origin: str, df: Df, analysis_config_reader: AnalysisConfigReader | None = None):
         self._account_origin = account_origin
         self._df = df
-        self._analysis_config_reader = AnalysisConfigReader()
+        self._analysis_config_reader = (
+            AnalysisConfigReader() if analysis_config_reader is None else analysis_config_reader
+        )
+        # The masks are calculated once for each pair of accounts, several analysis can use them.
+        self._masks_of_accounts = {}
 
     def with_analysis_is_hash_matched(self) -> "_AnalysisBuilder":
         account_targets = self._analysis_config_reader.get_accounts_where_hash_must_match()
@@ -157,6 +329,11 @@ class _AnalysisBuilder:
         self._set_analysis_columns_for_all_accounts(account_targets, _CanFileExistTwoAccountsAnalysisSetter)
         return self
 
+    def with_analysis_is_content_matched(self) -> "_AnalysisBuilder":
+        account_targets = self._analysis_config_reader.get_accounts_where_content_must_match()
+        self._set_analysis_columns_for_all_accounts(account_targets, _IsContentMatchedTwoAccountsAnalysisSetter)
+        return self
+
     def build(self) -> Df:
         return self._df
 
@@ -167,4 +344,8 @@ class _AnalysisBuilder:
     ):
         for account_target in account_targets:
             accounts = _AccountsToCompare(self._account_origin, account_target)
-            self._df = two_accounts_analysis_setter_class(accounts, self._df).get_df_set_analysis_column()
+            if accounts not in self._masks_of_accounts:
+                self._masks_of_accounts[accounts] = _TwoAccountsMasks.from_df(accounts, self._df)
+            self._df = two_accounts_analysis_setter_class(
+                accounts, self._df, self._masks_of_accounts[accounts]
+            ).get_df_set_analysis_column()
@@ -0,0 +1,110 @@
+import json
+import pickle
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from pandas import DataFrame as Df
+
+from aws_s3_diff.local_result import LocalResult
+from aws_s3_diff.logger import get_logger
+from aws_s3_diff.type_custom import S3Query
+
+
+class ListingCheckpoint:
+    """Saves the results of each S3 request of an account, a new run continues the listing after the last saved key.
+
+    Two files are created in the analysis directory, next to the account file:
+    - The journal, a JSON line for each saved page with the S3 URI, its last file name and the size of the data
+      file after saving it, and a JSON line for each S3 URI completed after its pages.
+    - The data file, with the Dfs of the pages. Pickle keeps the types and allows appending Dfs.
+
+    The page is saved in the data file before the journal, the data after the last line of the journal is discarded.
+    """
+
+    def __init__(self, account: str):
+        self._account = account
+        self._dfs_of_queries = defaultdict(list)
+        self._last_file_names_of_queries = {}
+        self._completed_queries = set()
+        self._lock = threading.Lock()
+        self._logger = get_logger()
+        self._data_file_path, self._journal_file_path = _get_file_paths(account)
+        self._load()
+
+    def get_dfs_of_query(self, s3_query: S3Query) -> list[Df]:
+        return self._dfs_of_queries[str(s3_query)]
+
+    def get_last_file_name(self, s3_query: S3Query) -> str | None:
+        return self._last_file_names_of_queries.get(str(s3_query))
+
+    def is_query_completed(self, s3_query: S3Query) -> bool:
+        return str(s3_query) in self._completed_queries
+
+    def add_page(self, s3_query: S3Query, df: Df, last_file_name: str | None, is_completed: bool = False):
+        """The last file name is None for the S3 URIs without files, their only page completes them in the same
+        journal line, so the page is not saved again if the listing is interrupted before completing them.
+        """
+        entry = {"s3_uri": str(s3_query), "last_file_name": last_file_name}
+        if is_completed:
+            entry["is_completed"] = True
+        # The S3 URIs can be listed in different threads.
+        with self._lock:
+            with open(self._data_file_path, "ab") as file:
+                pickle.dump((str(s3_query), df), file, protocol=pickle.HIGHEST_PROTOCOL)
+                entry["data_file_size"] = file.tell()
+            self._append_to_journal(entry)
+
+    def set_query_completed(self, s3_query: S3Query):
+        with self._lock:
+            self._append_to_journal({"s3_uri": str(s3_query), "is_completed": True})
+
+    def _append_to_journal(self, entry: dict):
+        with open(self._journal_file_path, "a") as file:
+            file.write(f"{json.dumps(entry)}\n")
+
+    def _load(self):
+        if not self._journal_file_path.is_file():
+            # The data saved without journal line is discarded.
+            self._data_file_path.unlink(missing_ok=True)
+            return
+        self._logger.info(f"Resuming the listing of the AWS account '{self._account}' from {self._journal_file_path}")
+        entries = self._get_journal_entries()
+        data_file_size = 0
+        for entry in entries:
+            if "data_file_size" in entry:
+                self._last_file_names_of_queries[entry["s3_uri"]] = entry["last_file_name"]
+                data_file_size = entry["data_file_size"]
+            if entry.get("is_completed"):
+                self._completed_queries.add(entry["s3_uri"])
+        # Rewrite the files without the not finished writes, to append after them.
+        self._journal_file_path.write_text("".join(f"{json.dumps(entry)}\n" for entry in entries))
+        with open(self._data_file_path, "ab") as file:
+            file.truncate(data_file_size)
+        self._load_dfs(data_file_size)
+
+    def _get_journal_entries(self) -> list[dict]:
+        """An interrupted write can leave the last line incomplete."""
+        lines = self._journal_file_path.read_text().splitlines(keepends=True)
+        return [json.loads(line) for line in lines if line.endswith("\n")]
+
+    def _load_dfs(self, data_file_size: int):
+        with open(self._data_file_path, "rb") as file:
+            while file.tell() < data_file_size:
+                s3_uri, df = pickle.load(file)
+                self._dfs_of_queries[s3_uri].append(df)
+
+
+def remove_listing_checkpoint(account: str):
+    """The checkpoint is not required after exporting the account file."""
+    for file_path in _get_file_paths(account):
+        file_path.unlink(missing_ok=True)
+
+
+def _get_file_paths(account: str) -> tuple[Path, Path]:
+    """Data and journal files."""
+    account_file_path = LocalResult().get_file_path_account(account)
+    return (
+        account_file_path.with_name(f"{account_file_path.name}.checkpoint"),
+        account_file_path.with_name(f"{account_file_path.name}.journal"),
+    )
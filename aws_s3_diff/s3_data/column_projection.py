@@ -0,0 +1,26 @@
+import os
+
+from aws_s3_diff.config_file import AnalysisConfigReader
+
+_FILE_COLUMN_NAMES = ["date", "size", "hash"]
+
+
+def get_file_column_names() -> list[str]:
+    """Columns of the files in the accounts data, in the order of the files.
+
+    With AWS_PROJECT_COLUMNS, only the columns used by the analysis of the configuration file are kept: the size, that
+    marks if an account has the file, and the hash if the hashes or the contents are compared. The date is not used by
+    any analysis. All the columns are kept if the analysis is not run.
+    """
+    if os.getenv("AWS_PROJECT_COLUMNS") != "true":
+        return _FILE_COLUMN_NAMES
+    analysis_config_reader = AnalysisConfigReader()
+    if not analysis_config_reader.must_run_analysis():
+        return _FILE_COLUMN_NAMES
+    result = ["size"]
+    if (
+        len(analysis_config_reader.get_accounts_where_hash_must_match()) > 0
+        or len(analysis_config_reader.get_accounts_where_content_must_match()) > 0
+    ):
+        result.append("hash")
+    return result
@@ -1,4 +1,18 @@
+from collections.abc import Iterable
+from typing import TextIO
+
+from pandas import DataFrame as Df
+
+
 def get_column_name_from_column_multi_index(column_multi_index: tuple[str, str]) -> str:
     if column_multi_index[1] in ("date", "hash", "size"):
         return f"{column_multi_index[1]}_in_{column_multi_index[0]}"
     return "_".join(column_multi_index)
+
+
+def write_dfs_to_csv_buffer(dfs: Iterable[Df], buffer: TextIO):
+    """The result is the same as exporting the concatenation of the Dfs, they must have the same columns."""
+    is_first_df = True
+    for df in dfs:
+        df.to_csv(buffer, index=False, header=is_first_df)
+        is_first_df = False
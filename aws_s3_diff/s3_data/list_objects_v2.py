@@ -0,0 +1,122 @@
+import bisect
+import datetime
+from collections.abc import Iterable
+from typing import NamedTuple
+from urllib.parse import unquote_plus
+from xml.etree import ElementTree
+
+import numpy as np
+
+
+class ListObjectsV2Contents(NamedTuple):
+    """Objects of a `list_objects_v2` response as column arrays, sorted by key as in the response.
+
+    The hashes are the ETags without quotes.
+    """
+
+    keys: np.ndarray
+    dates: np.ndarray
+    sizes: np.ndarray
+    hashes: np.ndarray
+
+    @classmethod
+    def from_response(cls, response: dict) -> "ListObjectsV2Contents":
+        """The response can be parsed by botocore or by the fast parser."""
+        if "ContentsColumns" in response:
+            return response["ContentsColumns"]
+        contents = response.get("Contents", [])
+        return cls(
+            np.array([content["Key"] for content in contents], dtype=object),
+            _get_datetime64_from_datetimes(content["LastModified"] for content in contents),
+            np.fromiter((content["Size"] for content in contents), dtype=np.int64, count=len(contents)),
+            np.array([content["ETag"].strip('"') for content in contents], dtype=np.bytes_),
+        )
+
+    def get_contents_until(self, end_key: str) -> "ListObjectsV2Contents":
+        """The keys lower or equal than `end_key`."""
+        end_index = bisect.bisect_right(self.keys, end_key)
+        return ListObjectsV2Contents(*(array[:end_index] for array in self))
+
+    def get_contents_with_prefix(self, prefix: str) -> "ListObjectsV2Contents":
+        """The keys with a prefix are consecutive, they are between the prefix and the prefix with the last character
+        incremented."""
+        start_index = bisect.bisect_left(self.keys, prefix)
+        end_index = bisect.bisect_left(self.keys, f"{prefix[:-1]}{chr(ord(prefix[-1]) + 1)}")
+        return ListObjectsV2Contents(*(array[start_index:end_index] for array in self))
+
+
+def get_last_key(response: dict) -> str | None:
+    if "ContentsColumns" in response:
+        keys = response["ContentsColumns"].keys
+        return keys[-1] if len(keys) > 0 else None
+    return response["Contents"][-1]["Key"] if "Contents" in response else None
+
+
+def add_fast_parser(s3_client):
+    """The `list_objects_v2` responses are parsed to column arrays, instead of a dict with Python objects for each
+    object created by botocore. The responses with errors are parsed by botocore.
+
+    The parsed response has the keys used by the program, with the objects in the `ContentsColumns` key instead of
+    `Contents`.
+    """
+    s3_client.meta.events.register("before-parse.s3.ListObjectsV2", _parse_response)
+
+
+def _parse_response(response_dict: dict, customized_response_dict: dict, **_kwargs):
+    """https://docs.aws.amazon.com/AmazonS3/latest/API/API_ListObjectsV2.html#API_ListObjectsV2_ResponseSyntax"""
+    if response_dict["status_code"] != 200:
+        return
+    customized_response_dict.update(get_response_from_xml(response_dict["body"]))
+    # The values are in the customized response, botocore adds the response metadata only.
+    response_dict["body"] = b""
+
+
+def get_response_from_xml(body: bytes) -> dict:
+    """The keys are decoded if they are URL encoded, botocore requests them encoded by default. The `EncodingType` is
+    not returned, to avoid decoding them again with the botocore handler."""
+    root = ElementTree.fromstring(body)
+    namespace = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    is_url_encoded = root.findtext(f"{namespace}EncodingType") == "url"
+    key_tag, date_tag, size_tag, hash_tag = (f"{namespace}{tag}" for tag in ("Key", "LastModified", "Size", "ETag"))
+    keys, dates, sizes, hashes = [], [], [], []
+    for contents in root.iterfind(f"{namespace}Contents"):
+        keys.append(contents.findtext(key_tag))
+        dates.append(contents.findtext(date_tag))
+        sizes.append(contents.findtext(size_tag))
+        hashes.append(contents.findtext(hash_tag))
+    prefixes = [element.text for element in root.iterfind(f"{namespace}CommonPrefixes/{namespace}Prefix")]
+    result = {
+        "KeyCount": int(root.findtext(f"{namespace}KeyCount", len(keys) + len(prefixes))),
+        "IsTruncated": root.findtext(f"{namespace}IsTruncated") == "true",
+        "ContentsColumns": ListObjectsV2Contents(
+            np.array(_get_decoded(keys) if is_url_encoded else keys, dtype=object),
+            _get_datetime64_from_iso_strings(dates),
+            np.array(sizes, dtype=np.int64),
+            np.array([hash_.strip('"') for hash_ in hashes], dtype=np.bytes_),
+        ),
+    }
+    next_continuation_token = root.findtext(f"{namespace}NextContinuationToken")
+    if next_continuation_token is not None:
+        result["NextContinuationToken"] = next_continuation_token
+    if len(prefixes) > 0:
+        result["CommonPrefixes"] = [
+            {"Prefix": prefix} for prefix in (_get_decoded(prefixes) if is_url_encoded else prefixes)
+        ]
+    return result
+
+
+def _get_decoded(values: list[str]) -> list[str]:
+    """Only the values with encoded characters are decoded, `unquote_plus` is slower than the check."""
+    return [unquote_plus(value) if "%" in value or "+" in value else value for value in values]
+
+
+def _get_datetime64_from_iso_strings(dates: list[str]) -> np.ndarray:
+    """The S3 dates are UTC, with the `Z` suffix that numpy does not parse."""
+    return np.array([date.removesuffix("Z") for date in dates], dtype="datetime64[ns]")
+
+
+def _get_datetime64_from_datetimes(datetimes: Iterable[datetime.datetime]) -> np.ndarray:
+    """The conversion of the datetime objects by numpy is slow, the POSIX timestamps are UTC. S3 dates have seconds
+    or milliseconds, the microseconds are rounded to avoid float errors."""
+    microseconds = np.round(np.fromiter((date.timestamp() for date in datetimes), dtype=np.float64) * 1e6)
+    return microseconds.astype(np.int64).astype("datetime64[us]").astype("datetime64[ns]")
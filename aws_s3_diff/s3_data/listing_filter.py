@@ -0,0 +1,97 @@
+import datetime
+import fnmatch
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from aws_s3_diff.exception import ListingFiltersFileError
+
+
+class ListingFilter:
+    """Selects the files of a S3 URI while it is listed, the other files are not stored nor analyzed.
+
+    The filters, all optional, are:
+    - `include` and `exclude`: glob patterns of the file names, relative to the S3 URI. A file is selected if it
+      matches any `include` pattern and no `exclude` pattern.
+    - `min_size` and `max_size`: bytes, both included.
+    - `modified_since` and `modified_before`: ISO 8601 dates, UTC if they have no time zone. The first is included.
+    - `modified_in_last_days`: days before the creation of the filter.
+    """
+
+    _filter_names = (
+        "include",
+        "exclude",
+        "min_size",
+        "max_size",
+        "modified_since",
+        "modified_before",
+        "modified_in_last_days",
+    )
+
+    def __init__(self, filters: dict):
+        unknown_filter_names = sorted(set(filters) - set(self._filter_names))
+        if len(unknown_filter_names) > 0:
+            raise ListingFiltersFileError(f"Unknown filters: {', '.join(unknown_filter_names)}")
+        self._include_patterns = filters.get("include", [])
+        self._include_regex = _get_regex_of_patterns(self._include_patterns)
+        self._exclude_regex = _get_regex_of_patterns(filters.get("exclude", []))
+        self._min_size = filters.get("min_size")
+        self._max_size = filters.get("max_size")
+        self._modified_since = _get_datetime64_or_none(filters.get("modified_since"))
+        self._modified_before = _get_datetime64_or_none(filters.get("modified_before"))
+        if "modified_in_last_days" in filters:
+            now = np.datetime64(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None), "ns")
+            modified_since = now - np.timedelta64(int(filters["modified_in_last_days"] * 86400), "s")
+            if self._modified_since is None or modified_since > self._modified_since:
+                self._modified_since = modified_since
+
+    def get_mask(self, names: np.ndarray, dates: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        """The dates are UTC without time zone, as in `S3Data`."""
+        result = np.ones(len(names), dtype=bool)
+        if self._include_regex is not None:
+            result &= _get_mask_of_regex(self._include_regex, names)
+        if self._exclude_regex is not None:
+            result &= ~_get_mask_of_regex(self._exclude_regex, names)
+        if self._min_size is not None:
+            result &= sizes >= self._min_size
+        if self._max_size is not None:
+            result &= sizes <= self._max_size
+        if self._modified_since is not None:
+            result &= dates >= self._modified_since
+        if self._modified_before is not None:
+            result &= dates < self._modified_before
+        return result
+
+    def get_start_after_and_end_key(self, prefix: str) -> tuple[str | None, str | None]:
+        """The keys that can match the `include` patterns are between these keys, the characters of the patterns
+        before the first wildcard are the same for all the selected files. None values mean no limit.
+        """
+        literal_prefix = os.path.commonprefix([re.split(r"[*?\[]", pattern)[0] for pattern in self._include_patterns])
+        if literal_prefix == "":
+            return None, None
+        # The end key is greater than all the keys with the literal prefix.
+        return (
+            f"{prefix}{literal_prefix[:-1]}",
+            f"{prefix}{literal_prefix[:-1]}{chr(ord(literal_prefix[-1]) + 1)}",
+        )
+
+
+def _get_regex_of_patterns(patterns: list[str]) -> re.Pattern | None:
+    """Case-sensitive as the S3 keys, `*` matches slashes too."""
+    if len(patterns) == 0:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns))
+
+
+def _get_mask_of_regex(regex: re.Pattern, names: np.ndarray) -> np.ndarray:
+    return np.fromiter((regex.match(name) is not None for name in names), dtype=bool, count=len(names))
+
+
+def _get_datetime64_or_none(date: str | None) -> np.datetime64 | None:
+    if date is None:
+        return None
+    timestamp = pd.Timestamp(date)
+    timestamp = timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+    return np.datetime64(timestamp.tz_localize(None).to_datetime64(), "ns")
@@ -1,70 +1,269 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame as Df
 from pandas import MultiIndex
 
 from aws_s3_diff.account import get_account_to_analyze
+from aws_s3_diff.config_file import ListingFiltersFileReader
 from aws_s3_diff.config_file import S3UrisFileReader
+from aws_s3_diff.config_file import S3UrisToRelistFileReader
 from aws_s3_diff.local_result import LocalResult
 from aws_s3_diff.logger import get_logger
+from aws_s3_diff.metrics import get_metrics
+from aws_s3_diff.s3_data.checkpoint import ListingCheckpoint
+from aws_s3_diff.s3_data.checkpoint import remove_listing_checkpoint
+from aws_s3_diff.s3_data.column_projection import get_file_column_names
 from aws_s3_diff.s3_data.interface import CsvExporter
 from aws_s3_diff.s3_data.interface import CsvReader
 from aws_s3_diff.s3_data.interface import DataGenerator
 from aws_s3_diff.s3_data.interface import DfModifier
 from aws_s3_diff.s3_data.s3_client import S3Client
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.s3_data.s3_client import S3SiblingPrefixesClient
+from aws_s3_diff.s3_data.s3_inventory import S3InventoryClient
+from aws_s3_diff.s3_data.s3_inventory import S3InventoryManifests
+from aws_s3_diff.s3_data.s3_query_planner import S3QueriesPlanner
 from aws_s3_diff.s3_uri import get_df_add_last_slash_to_values
 from aws_s3_diff.s3_uri import get_df_uri_parts
-from aws_s3_diff.type_custom import FileS3Data
+from aws_s3_diff.storage import get_storage
 from aws_s3_diff.type_custom import S3Data
 from aws_s3_diff.type_custom import S3Query
 
 
 class AccountCsvExporter(CsvExporter):
-    def __init__(self):
+    def __init__(self, account: str | None = None):
+        """The account to analyze is exported if no account is specified."""
+        self._account = account
         self._local_result = LocalResult()
         self._logger = get_logger()
+        self._storage = get_storage()
 
     def export_df(self, df: Df):
-        account = get_account_to_analyze()
+        account = self._get_account()
         file_path = self._local_result.get_file_path_account(account)
         self._logger.info(f"Exporting {file_path}")
-        df.to_csv(index=False, path_or_buf=file_path)
+        self._storage.write_df(df, file_path)
+        remove_listing_checkpoint(account)
+
+    def export_dfs(self, dfs: Iterable[Df]):
+        """A temporal file name is used until the end, an interrupted export must not mark the account as analyzed"""
+        account = self._get_account()
+        file_path = self._local_result.get_file_path_account(account)
+        file_path_in_progress = file_path.with_name(f"{file_path.name}.tmp")
+        self._logger.info(f"Exporting {file_path}")
+        self._storage.write_dfs(dfs, file_path_in_progress)
+        file_path_in_progress.replace(file_path)
+        remove_listing_checkpoint(account)
+
+    def _get_account(self) -> str:
+        return get_account_to_analyze() if self._account is None else self._account
 
 
 class AccountDataGenerator(DataGenerator):
     def __init__(self, account: str):
         self._account = account
+        self._file_column_names = get_file_column_names()
         self._logger = get_logger()
+        self._must_reuse_previous_results = os.getenv("AWS_INCREMENTAL") == "true"
+        self._listing_filters_file_reader = ListingFiltersFileReader()
+        self._previous_account_data_reader = _PreviousAccountDataReader(account)
+        # Each account uses the AWS profile with its name if the accounts are analyzed in one run.
+        profile_name = account if os.getenv("AWS_PROFILES") == "true" else None
+        self._s3_client_factory = S3ClientFactory(profile_name)
+        self._s3_inventory_manifests = S3InventoryManifests()
+        self._s3_queries_cache = None
+        self._s3_queries_to_list_cache = None
         self._s3_uris_file_reader = S3UrisFileReader()
+        self._s3_uris_to_relist_file_reader = S3UrisToRelistFileReader()
+        self._checkpoint = ListingCheckpoint(account) if os.getenv("AWS_CHECKPOINT") == "true" else None
+        self._must_coalesce_prefixes = os.getenv("AWS_COALESCE_PREFIXES") == "true"
+        self._sibling_prefixes_clients_cache = None
+        self._lock = threading.Lock()
 
     def get_df(self) -> Df:
-        result = Df()
-        s3_queries = self._get_s3_queries()
-        for query_index, s3_query in enumerate(s3_queries, 1):
-            self._logger.info(f"Analyzing S3 URI {query_index}/{len(s3_queries)}: {s3_query}")
-            for s3_data in self._get_s3_data_of_query(s3_query):
-                if s3_data is None:
-                    # To avoid pandas warning when concatenating a Df with a Df with null values.
-                    query_and_data_df = self._get_df_for_query_without_result(s3_query)
-                else:
-                    query_and_data_df = self._get_df_from_s3_data_and_query(s3_data, s3_query)
-                result = pd.concat([result, query_and_data_df])
+        # Concatenate once, concatenating each new Df to the previous result copies all the data every time.
+        query_and_data_dfs = list(self._get_query_and_data_dfs())
+        result = pd.concat(query_and_data_dfs) if len(query_and_data_dfs) > 0 else Df()
         return self._get_df_add_lost_columns(result)
 
+    def get_dfs(self) -> Iterator[Df]:
+        """Returns a Df for each S3 request, the requests are done while the Dfs are consumed"""
+        for query_and_data_df in self._get_query_and_data_dfs():
+            yield self._get_df_add_lost_columns(query_and_data_df)
+
+    def _get_query_and_data_dfs(self) -> Iterator[Df]:
+        for query_dfs in self._get_dfs_of_all_queries():
+            yield from query_dfs
+
+    def _get_dfs_of_all_queries(self) -> Iterator[Iterable[Df]]:
+        """The results are returned in the same order as the queries, despite the number of workers."""
+        s3_queries = self._get_s3_queries()
+        query_indexes = range(1, len(s3_queries) + 1)
+        max_workers = int(os.getenv("AWS_LISTING_WORKERS", 1))
+        if max_workers == 1:
+            yield from map(self._get_dfs_of_query, query_indexes, s3_queries)
+        else:
+            yield from self._get_dfs_of_all_queries_in_workers(max_workers, query_indexes, s3_queries)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._log_s3_clients()
+
+    def _log_s3_clients(self):
+        try:
+            number_of_connections = self._s3_client_factory.get_number_of_connections()
+        except (AttributeError, KeyError, TypeError):
+            # The connections are read from private attributes of botocore and urllib3, they can change.
+            number_of_connections = "unknown"
+        self._logger.debug(
+            f"S3 clients created: {self._s3_client_factory.get_number_of_clients()}"
+            f". Connections opened: {number_of_connections}"
+        )
+
+    def _get_dfs_of_all_queries_in_workers(
+        self, max_workers: int, query_indexes: Iterable[int], s3_queries: list[S3Query]
+    ) -> Iterator[list[Df]]:
+        """The S3 URIs are submitted while the results are consumed, at most one S3 URI for each worker is listed
+        ahead, so the memory does not depend on the number of S3 URIs, for example with AWS_STREAM_EXPORT.
+        """
+        futures = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for query_index, s3_query in zip(query_indexes, s3_queries, strict=True):
+                    if len(futures) == max_workers:
+                        yield futures.popleft().result()
+                    futures.append(executor.submit(self._get_list_dfs_of_query, query_index, s3_query))
+                while len(futures) > 0:
+                    yield futures.popleft().result()
+            finally:
+                # The S3 URIs not started are not listed if the results are not consumed, for example after an error.
+                for future in futures:
+                    future.cancel()
+
+    def _get_list_dfs_of_query(self, query_index: int, s3_query: S3Query) -> list[Df]:
+        return list(self._get_dfs_of_query(query_index, s3_query))
+
+    def _get_dfs_of_query(self, query_index: int, s3_query: S3Query) -> Iterator[Df]:
+        previous_df = self._get_previous_df_of_query(s3_query)
+        if previous_df is not None:
+            self._logger.info(
+                f"Reusing previous results of S3 URI {query_index}/{len(self._get_s3_queries())}: {s3_query}"
+            )
+            yield previous_df
+            return
+        self._logger.info(f"Analyzing S3 URI {query_index}/{len(self._get_s3_queries())}: {s3_query}")
+        start_after_file_name = None
+        if self._checkpoint is not None:
+            yield from self._checkpoint.get_dfs_of_query(s3_query)
+            if self._checkpoint.is_query_completed(s3_query):
+                return
+            start_after_file_name = self._checkpoint.get_last_file_name(s3_query)
+            if start_after_file_name is not None:
+                self._logger.info(f"Resuming S3 URI {query_index} after the file {start_after_file_name}")
+        is_completed = False
+        for s3_data in self._get_s3_data_of_query(s3_query, start_after_file_name):
+            if s3_data is None:
+                # To avoid pandas warning when concatenating a Df with a Df with null values.
+                df = self._get_df_for_query_without_result(s3_query)
+            else:
+                df = self._get_df_from_s3_data_and_query(s3_data, s3_query)
+            if self._checkpoint is not None:
+                # The S3 URIs without files are completed with their only page.
+                is_completed = s3_data is None
+                self._checkpoint.add_page(s3_query, df, None if s3_data is None else s3_data.names[-1], is_completed)
+            yield df
+        if self._checkpoint is not None and not is_completed:
+            self._checkpoint.set_query_completed(s3_query)
+
+    def _get_previous_df_of_query(self, s3_query: S3Query) -> Df | None:
+        if not self._must_reuse_previous_results or s3_query in self._s3_uris_to_relist_file_reader.get_s3_queries():
+            return None
+        return self._previous_account_data_reader.get_df_of_query(s3_query)
+
     def _get_s3_queries(self) -> list[S3Query]:
-        return self._s3_uris_file_reader.get_s3_queries_for_account(self._account)
+        if self._s3_queries_cache is None:
+            self._s3_queries_cache = self._s3_uris_file_reader.get_s3_queries_for_account(self._account)
+        return self._s3_queries_cache
+
+    def _get_s3_data_of_query(
+        self, s3_query: S3Query, start_after_file_name: str | None = None
+    ) -> Iterator[S3Data | None]:
+        """The time of the query metrics includes the time to process the results, they are generated on demand.
 
-    def _get_s3_data_of_query(self, s3_query: S3Query) -> Iterator[S3Data | None]:
-        is_any_result = False
-        for s3_data in S3Client(s3_query).get_s3_data():
-            is_any_result = True
+        With `start_after_file_name`, the previous files have been returned before, so the S3 URI has files.
+        """
+        start = time.perf_counter()
+        pages, keys, bytes_ = 0, 0, 0
+        for s3_data in self._get_s3_client(s3_query).get_s3_data(start_after_file_name):
+            pages += 1
+            keys += len(s3_data)
+            bytes_ += s3_data.get_bytes()
             yield s3_data
-        if not is_any_result:
+        if pages == 0 and start_after_file_name is None:
             yield None
+        get_metrics().add_query(self._account, s3_query, time.perf_counter() - start, pages, keys, bytes_)
+
+    def _get_s3_client(self, s3_query: S3Query):
+        listing_filter = self._listing_filters_file_reader.get_listing_filter(s3_query)
+        if self._s3_inventory_manifests.get_manifest_path(s3_query.bucket) is not None:
+            s3_inventory_reader = self._s3_inventory_manifests.get_s3_inventory_reader(
+                s3_query.bucket, self._get_s3_queries_to_list()
+            )
+            return S3InventoryClient(s3_query, s3_inventory_reader, listing_filter)
+        if self._must_coalesce_prefixes:
+            sibling_prefixes_client = self._get_sibling_prefixes_clients().get(s3_query)
+            if sibling_prefixes_client is not None:
+                return sibling_prefixes_client.get_s3_client(s3_query)
+        return S3Client(s3_query, self._s3_client_factory, listing_filter=listing_filter)
+
+    def _get_sibling_prefixes_clients(self) -> dict[S3Query, S3SiblingPrefixesClient]:
+        """The S3 URIs to list are grouped with the number of files of the previous analysis."""
+        # The queries can be analyzed in different threads.
+        with self._lock:
+            if self._sibling_prefixes_clients_cache is None:
+                self._sibling_prefixes_clients_cache = {}
+                s3_queries_planner = S3QueriesPlanner(
+                    self._previous_account_data_reader.get_number_of_files_of_queries()
+                )
+                s3_queries_to_list = [
+                    s3_query
+                    for s3_query in self._get_s3_queries_to_list()
+                    if self._s3_inventory_manifests.get_manifest_path(s3_query.bucket) is None
+                ]
+                for s3_queries in s3_queries_planner.get_groups(s3_queries_to_list):
+                    self._logger.info(
+                        f"Listing {len(s3_queries)} S3 URIs together, from {s3_queries[0]} to {s3_queries[-1]}"
+                    )
+                    listing_filters = {
+                        s3_query: self._listing_filters_file_reader.get_listing_filter(s3_query)
+                        for s3_query in s3_queries
+                    }
+                    sibling_prefixes_client = S3SiblingPrefixesClient(
+                        s3_queries, self._s3_client_factory, listing_filters
+                    )
+                    self._sibling_prefixes_clients_cache |= dict.fromkeys(s3_queries, sibling_prefixes_client)
+            return self._sibling_prefixes_clients_cache
+
+    def _get_s3_queries_to_list(self) -> list[S3Query]:
+        """Without the S3 URIs with previous results or completed in the checkpoint when the listing started."""
+        if self._s3_queries_to_list_cache is None:
+            self._s3_queries_to_list_cache = [
+                s3_query
+                for s3_query in self._get_s3_queries()
+                if self._get_previous_df_of_query(s3_query) is None
+                and (self._checkpoint is None or not self._checkpoint.is_query_completed(s3_query))
+            ]
+        return self._s3_queries_to_list_cache
 
     def _get_df_from_s3_data_and_query(self, s3_data: S3Data, s3_query: S3Query) -> Df:
-        result = Df(file_data._asdict() for file_data in s3_data)
+        result = s3_data.get_df(self._file_column_names)
         result.insert(0, "bucket", s3_query.bucket)
         result.insert(1, "prefix", s3_query.prefix)
         return result
@@ -73,26 +272,112 @@ class AccountDataGenerator(DataGenerator):
         return Df({"bucket": [s3_query.bucket], "prefix": [s3_query.prefix]})
 
     def _get_df_add_lost_columns(self, df: Df) -> Df:
+        """The Dfs of the S3 URIs without files only have the bucket and prefix, the other columns are added with null
+        values. The previous results can have columns not projected in this run, they are removed.
+        """
         result = df
-        lost_columns = [column_name for column_name in FileS3Data._fields if column_name not in result]
-        if len(lost_columns) > 0:
-            column_names = result.columns.tolist() + lost_columns
-            return result.reindex(columns=column_names)
+        column_names = ["bucket", "prefix", "name", *self._file_column_names]
+        if result.columns.tolist() != column_names:
+            result = result.reindex(columns=column_names)
+        # Avoid float values if there are null sizes, the exported value would depend on the other rows.
+        result = result.astype({"size": "Int64"})
+        if "date" in result:
+            # Avoid a float column if there are only null dates, all the Dfs of an account must have the same types.
+            result["date"] = pd.to_datetime(result["date"], utc=True)
         return result
 
 
+class _PreviousAccountDataReader:
+    def __init__(self, account: str):
+        self._account = account
+        self._df_cache = None
+        self._file_column_names = get_file_column_names()
+        self._local_result = LocalResult()
+        self._lock = threading.Lock()
+        self._logger = get_logger()
+        self._row_numbers_of_queries_cache = None
+        self._storage = get_storage()
+
+    def get_df_of_query(self, s3_query: S3Query) -> Df | None:
+        """None if the previous analysis has not the S3 URI or the columns of this run, for example if the previous
+        run used AWS_PROJECT_COLUMNS, so the S3 URI is listed again.
+        """
+        if not self._has_file_columns():
+            return None
+        row_numbers = self._get_row_numbers_of_queries().get(s3_query)
+        return None if row_numbers is None else self._get_df().iloc[row_numbers]
+
+    def get_number_of_files_of_queries(self) -> dict[S3Query, int]:
+        """The S3 URIs without files have a row without name."""
+        df = self._get_df()
+        return {
+            s3_query: int(df["name"].iloc[row_numbers].count())
+            for s3_query, row_numbers in self._get_row_numbers_of_queries().items()
+        }
+
+    def _has_file_columns(self) -> bool:
+        return set(self._file_column_names).issubset(self._get_df().columns)
+
+    def _get_row_numbers_of_queries(self) -> dict[S3Query, np.ndarray]:
+        """The rows of each S3 URI are grouped once, instead of searching them for each S3 URI."""
+        df = self._get_df()
+        with self._lock:
+            if self._row_numbers_of_queries_cache is None:
+                row_numbers_of_queries = df.groupby(["bucket", "prefix"], sort=False).indices
+                self._row_numbers_of_queries_cache = {
+                    S3Query(bucket, prefix): row_numbers
+                    for (bucket, prefix), row_numbers in row_numbers_of_queries.items()
+                }
+            return self._row_numbers_of_queries_cache
+
+    def _get_df(self) -> Df:
+        # The queries can be analyzed in different threads.
+        with self._lock:
+            if self._df_cache is None:
+                file_path = self._local_result.get_file_path_account_previous_analysis(self._account)
+                if file_path is None:
+                    self._df_cache = Df(columns=["bucket", "prefix"])
+                else:
+                    # The previous analysis can have other columns.
+                    self._df_cache = self._storage.read_df(file_path, date_column_names=[])
+                    column_names_not_in_file = [
+                        column_name
+                        for column_name in self._file_column_names
+                        if column_name not in self._df_cache.columns
+                    ]
+                    if len(column_names_not_in_file) > 0:
+                        self._logger.info(
+                            f"The previous analysis {file_path} has not the columns {column_names_not_in_file}"
+                            ", its S3 URIs are listed again"
+                        )
+                    if "date" in self._file_column_names and "date" in self._df_cache:
+                        self._df_cache["date"] = pd.to_datetime(self._df_cache["date"], utc=True)
+            return self._df_cache
+
+
 class AccountCsvReader(CsvReader):
     def __init__(self, account: str):
         self._account = account
+        self._date_column_names = ["date"] if "date" in get_file_column_names() else []
         self._local_result = LocalResult()
+        self._storage = get_storage()
 
     def get_df(self) -> Df:
-        account_df = pd.read_csv(
+        account_df = self._storage.read_df(
             self._local_result.get_file_path_account(self._account),
-            parse_dates=["date"],
+            date_column_names=self._date_column_names,
         ).astype({"size": "Int64"})
         return self._get_df_with_multi_index(account_df)
 
+    def get_dfs(self, rows_per_df: int) -> Iterator[Df]:
+        """The concatenation of the Dfs is the same as `get_df`, without reading all the file in memory."""
+        for account_df in self._storage.read_dfs(
+            self._local_result.get_file_path_account(self._account),
+            date_column_names=self._date_column_names,
+            rows_per_df=rows_per_df,
+        ):
+            yield self._get_df_with_multi_index(account_df.astype({"size": "Int64"}))
+
     def _get_df_with_multi_index(self, df: Df) -> Df:
         result = df.copy()
         result = result.set_index(["bucket", "prefix", "name"], drop=True)
@@ -1,87 +1,520 @@
 import os
+import queue
+import random
+import string
+import threading
+import time
+from collections.abc import Callable
 from collections.abc import Iterator
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
 import boto3
+import numpy as np
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 from aws_s3_diff.exception import FolderInS3UriError
-from aws_s3_diff.type_custom import FileS3Data
+from aws_s3_diff.metrics import get_metrics
+from aws_s3_diff.s3_data.list_objects_v2 import add_fast_parser
+from aws_s3_diff.s3_data.list_objects_v2 import get_last_key
+from aws_s3_diff.s3_data.list_objects_v2 import ListObjectsV2Contents
+from aws_s3_diff.s3_data.listing_filter import ListingFilter
 from aws_s3_diff.type_custom import S3Data
 from aws_s3_diff.type_custom import S3Query
 
 
+class S3ClientFactory:
+    """Creates one boto3 client per endpoint and reuses it, boto3 clients are thread safe.
+
+    The clients use the credentials of the AWS profile, if specified.
+
+    https://boto3.amazonaws.com/v1/documentation/api/latest/guide/clients.html#multithreading-or-multiprocessing-with-clients
+    """
+
+    def __init__(self, profile_name: str | None = None):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._profile_name = profile_name
+
+    def get_client(self):
+        endpoint_url = os.getenv("AWS_ENDPOINT")
+        # Boto3 sessions are not thread safe.
+        with self._lock:
+            if endpoint_url not in self._clients:
+                client = boto3.Session(profile_name=self._profile_name).client(
+                    "s3", endpoint_url=endpoint_url, config=self._get_client_config()
+                )
+                # Called after each attempt of the requests, first to be called despite the retries.
+                client.meta.events.register_first("needs-retry.s3", _add_throttle_metric_if_throttled)
+                if os.getenv("AWS_FAST_XML_PARSER") == "true":
+                    add_fast_parser(client)
+                self._clients[endpoint_url] = client
+            return self._clients[endpoint_url]
+
+    def get_number_of_clients(self) -> int:
+        return len(self._clients)
+
+    def get_number_of_connections(self) -> int:
+        """Connections opened by the urllib3 pools of the clients. There is no public API to get this value"""
+        result = 0
+        for client in self._clients.values():
+            pools = client._endpoint.http_session._manager.pools
+            pool_keys = pools.keys()  # The pools container does not allow iteration.
+            result += sum(pools[pool_key].num_connections for pool_key in pool_keys)
+        return result
+
+    def _get_client_config(self) -> Config:
+        """The retry mode is configured with the AWS_RETRY_MODE and AWS_MAX_ATTEMPTS environment variables.
+
+        https://boto3.amazonaws.com/v1/documentation/api/latest/guide/retries.html
+        """
+        return Config(
+            connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", 60)),
+            max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", 10)),
+            read_timeout=float(os.getenv("AWS_READ_TIMEOUT", 60)),
+        )
+
+
+def _add_throttle_metric_if_throttled(response: tuple | None = None, **_kwargs):
+    """https://docs.aws.amazon.com/AmazonS3/latest/API/ErrorResponses.html"""
+    if response is None:
+        return
+    http_response, parsed_response = response
+    if http_response.status_code == 503 or parsed_response.get("Error", {}).get("Code") == "SlowDown":
+        get_metrics().add_throttle()
+
+
 class S3Client:
+    def __init__(
+        self,
+        s3_query: S3Query,
+        s3_client_factory: S3ClientFactory | None = None,
+        is_recursive: bool | None = None,
+        listing_filter: ListingFilter | None = None,
+    ):
+        """By default, the subfolders are listed if AWS_RECURSIVE is true.
+
+        With a filter, only the keys that can match it are requested and the other files are discarded.
+        """
+        self._s3_query = s3_query
+        s3_client_factory = S3ClientFactory() if s3_client_factory is None else s3_client_factory
+        self._s3_requester = _S3Requester(s3_query, s3_client_factory.get_client(), is_recursive)
+        self._response_analyzer = _ResponseAnalyzer(s3_query, listing_filter)
+        self._key_range = (
+            _KeyRange()
+            if listing_filter is None
+            else _KeyRange(*listing_filter.get_start_after_and_end_key(s3_query.prefix))
+        )
+
+    def get_s3_data(self, start_after_file_name: str | None = None) -> Iterator[S3Data]:
+        """https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html
+
+        The files until `start_after_file_name`, included, are omitted.
+        """
+        start_after = None if start_after_file_name is None else f"{self._s3_query.prefix}{start_after_file_name}"
+        key_range = self._key_range.get_key_range_after(start_after)
+        if not key_range.has_keys():
+            return
+        partitions = int(os.getenv("AWS_LISTING_PARTITIONS", 1))
+        if partitions == 1:
+            yield from self._get_s3_data_of_key_range(key_range)
+            return
+        key_ranges = [
+            partition_key_range.get_intersection(key_range)
+            for partition_key_range in _KeyRangesGenerator(self._s3_query).get_key_ranges(partitions)
+        ]
+        key_ranges = [key_range for key_range in key_ranges if key_range.has_keys()]
+        with ThreadPoolExecutor(max_workers=partitions) as executor:
+            # The key ranges are sorted, so their results are returned in the same order as the sequential listing.
+            for key_range_s3_data in executor.map(self._get_list_s3_data_of_key_range, key_ranges):
+                yield from key_range_s3_data
+
+    def _get_list_s3_data_of_key_range(self, key_range: "_KeyRange") -> list[S3Data]:
+        return list(self._get_s3_data_of_key_range(key_range))
+
+    def get_contents_of_key_range(self, key_range: "_KeyRange") -> Iterator[ListObjectsV2Contents]:
+        """The responses are converted here, while the next ones are requested."""
+        responses = self._s3_requester.get_responses(key_range)
+        for response in _ResponsesPrefetcher(int(os.getenv("AWS_PREFETCH_PAGES", 1))).get_responses(responses):
+            self._response_analyzer.raise_exception_if_folders_in_response(response, self._s3_query.bucket)
+            contents = ListObjectsV2Contents.from_response(response)
+            if key_range.end_key is not None:
+                contents = contents.get_contents_until(key_range.end_key)
+            yield contents
+
+    def _get_s3_data_of_key_range(self, key_range: "_KeyRange") -> Iterator[S3Data]:
+        for contents in self.get_contents_of_key_range(key_range):
+            s3_data = self._response_analyzer.get_s3_data_from_contents(contents)
+            if len(s3_data) > 0:
+                yield s3_data
+
+
+class S3SiblingPrefixesClient:
+    """Lists the S3 URIs of a bucket in the same folder with one listing of the folder, instead of one listing for
+    each S3 URI, and splits the files by S3 URI. The keys between the S3 URIs are listed too.
+
+    The folder is listed with its subfolders, the subfolders of the S3 URIs are detected in the keys if AWS_RECURSIVE
+    is not true. The files of each S3 URI are kept in memory until they are returned. The filters of the S3 URIs are
+    applied to their files, they do not narrow the listing of the folder.
+
+    The listing of the folder stops when it has made as many requests as S3 URIs, for example if there are more keys
+    between the S3 URIs than estimated, so the memory is limited. The S3 URIs not listed completely continue with a
+    listing for each S3 URI.
+    """
+
+    def __init__(
+        self,
+        s3_queries: list[S3Query],
+        s3_client_factory: S3ClientFactory | None = None,
+        listing_filters: dict[S3Query, ListingFilter] | None = None,
+    ):
+        self._listing_filters = {} if listing_filters is None else listing_filters
+        self._s3_queries = sorted(s3_queries, key=lambda s3_query: s3_query.prefix)
+        self._s3_client_factory = s3_client_factory
+        parent_s3_query = S3Query(s3_queries[0].bucket, get_parent_prefix(s3_queries[0].prefix))
+        self._s3_client = S3Client(parent_s3_query, s3_client_factory, is_recursive=True)
+        self._is_recursive = os.getenv("AWS_RECURSIVE") == "true"
+        self._lock = threading.Lock()
+        self._s3_data_of_queries = None
+        # The S3 URIs not listed completely, with the name of their last file listed, None if no file was listed.
+        self._last_file_names_of_queries_not_completed = {}
+
+    def get_s3_client(self, s3_query: S3Query) -> "_S3SiblingPrefixClient":
+        return _S3SiblingPrefixClient(self, s3_query)
+
+    def get_s3_data_of_query(self, s3_query: S3Query, start_after_file_name: str | None = None) -> Iterator[S3Data]:
+        """The files until `start_after_file_name`, included, are omitted."""
+        # The S3 URIs can be listed in different threads, the folder is listed for the first one.
+        with self._lock:
+            if self._s3_data_of_queries is None:
+                self._s3_data_of_queries = self._get_s3_data_of_queries()
+            s3_data_of_query = self._s3_data_of_queries.pop(s3_query)
+        for s3_data in s3_data_of_query:
+            if start_after_file_name is not None:
+                s3_data = s3_data.get_files_after(start_after_file_name)
+            if len(s3_data) > 0:
+                yield s3_data
+        if s3_query in self._last_file_names_of_queries_not_completed:
+            last_file_name = self._last_file_names_of_queries_not_completed[s3_query]
+            if last_file_name is not None and (start_after_file_name is None or last_file_name > start_after_file_name):
+                start_after_file_name = last_file_name
+            s3_client = S3Client(s3_query, self._s3_client_factory, listing_filter=self._listing_filters.get(s3_query))
+            yield from s3_client.get_s3_data(start_after_file_name)
+
+    def _get_s3_data_of_queries(self) -> dict[S3Query, list[S3Data]]:
+        result = {s3_query: [] for s3_query in self._s3_queries}
+        # From the first S3 URI, its keys are after its prefix without slash, to the last one.
+        key_range = _KeyRange(self._s3_queries[0].prefix[:-1], get_last_key_of_prefix(self._s3_queries[-1].prefix))
+        contents_of_key_range = self._s3_client.get_contents_of_key_range(key_range)
+        for requests, contents in enumerate(contents_of_key_range, 1):
+            if len(contents.keys) == 0:
+                continue
+            for s3_query in self._s3_queries:
+                if s3_query.prefix > contents.keys[-1] or get_last_key_of_prefix(s3_query.prefix) < contents.keys[0]:
+                    continue
+                s3_query_contents = contents.get_contents_with_prefix(s3_query.prefix)
+                if not self._is_recursive:
+                    self._raise_exception_if_folders(s3_query, s3_query_contents)
+                response_analyzer = _ResponseAnalyzer(s3_query, self._listing_filters.get(s3_query))
+                s3_data = response_analyzer.get_s3_data_from_contents(s3_query_contents)
+                if len(s3_data) > 0:
+                    result[s3_query].append(s3_data)
+            if requests == len(self._s3_queries):
+                contents_of_key_range.close()
+                self._set_queries_not_completed(contents.keys[-1])
+                break
+        return result
+
+    def _set_queries_not_completed(self, last_key: str):
+        """The S3 URIs with keys after the last key listed."""
+        for s3_query in self._s3_queries:
+            if get_last_key_of_prefix(s3_query.prefix) > last_key:
+                last_file_name = last_key[len(s3_query.prefix) :] if last_key.startswith(s3_query.prefix) else None
+                self._last_file_names_of_queries_not_completed[s3_query] = last_file_name
+
+    @staticmethod
+    def _raise_exception_if_folders(s3_query: S3Query, contents: ListObjectsV2Contents):
+        """The folders without files are detected too, as the S3 responses of the S3 URI."""
+        folder_names = {
+            key[len(s3_query.prefix) :].split("/")[0] for key in contents.keys if "/" in key[len(s3_query.prefix) :]
+        }
+        if len(folder_names) == 0:
+            return
+        folder_path_names = [f"{s3_query.prefix}{folder_name}/" for folder_name in sorted(folder_names)]
+        raise FolderInS3UriError(s3_query.bucket, folder_path_names)
+
+
+class _S3SiblingPrefixClient:
+    """The client of a S3 URI listed by `S3SiblingPrefixesClient`."""
+
+    def __init__(self, s3_sibling_prefixes_client: S3SiblingPrefixesClient, s3_query: S3Query):
+        self._s3_query = s3_query
+        self._s3_sibling_prefixes_client = s3_sibling_prefixes_client
+
+    def get_s3_data(self, start_after_file_name: str | None = None) -> Iterator[S3Data]:
+        return self._s3_sibling_prefixes_client.get_s3_data_of_query(self._s3_query, start_after_file_name)
+
+
+def get_parent_prefix(prefix: str) -> str:
+    """The prefixes end with slash. Example: `a/b/` is the parent of `a/b/c/`."""
+    return prefix[: prefix.rstrip("/").rfind("/") + 1]
+
+
+def get_last_key_of_prefix(prefix: str) -> str:
+    """A key greater than all the keys with the prefix, the next character of the slash."""
+    return f"{prefix[:-1]}0"
+
+
+class _KeyRange(NamedTuple):
+    """Keys greater than `start_after` and lower or equal than `end_key`. `None` values mean no limit."""
+
+    start_after: str | None = None
+    end_key: str | None = None
+
+    def is_key_after_end(self, key: str) -> bool:
+        return self.end_key is not None and key > self.end_key
+
+    def has_keys(self) -> bool:
+        return self.start_after is None or self.end_key is None or self.end_key > self.start_after
+
+    def get_key_range_after(self, key: str | None) -> "_KeyRange":
+        if key is None or (self.start_after is not None and self.start_after >= key):
+            return self
+        return self._replace(start_after=key)
+
+    def get_intersection(self, other: "_KeyRange") -> "_KeyRange":
+        result = self.get_key_range_after(other.start_after)
+        if other.end_key is None or (result.end_key is not None and result.end_key <= other.end_key):
+            return result
+        return result._replace(end_key=other.end_key)
+
+
+class _KeyRangesGenerator:
+    """Splits the keys of a prefix by the first character after the prefix.
+
+    Python compares strings by Unicode code point, which is the same order as the UTF-8 binary order used by S3.
+    """
+
+    _characters_to_split = string.digits + string.ascii_uppercase + string.ascii_lowercase
+
     def __init__(self, s3_query: S3Query):
-        self._bucket = s3_query.bucket
-        self._s3_requester = _S3Requester(s3_query)
-        self._response_analyzer = _ResponseAnalyzer()
+        self._s3_query = s3_query
+
+    def get_key_ranges(self, partitions: int) -> list[_KeyRange]:
+        limits = [None] + self._get_keys_to_split(partitions) + [None]
+        return [_KeyRange(start_after, end_key) for start_after, end_key in zip(limits[:-1], limits[1:], strict=True)]
+
+    def _get_keys_to_split(self, partitions: int) -> list[str]:
+        characters = self._characters_to_split
+        indexes = sorted({len(characters) * partition // partitions for partition in range(1, partitions)})
+        return [f"{self._s3_query.prefix}{characters[index]}" for index in indexes]
+
+
+class _RateController:
+    """Limits the concurrent requests to a bucket and retries the throttled requests.
+
+    The concurrency limit is increased by one for each limit of successful requests and halved when a request is
+    throttled (AIMD). The throttled requests are retried after a random time up to an exponential backoff.
+    The botocore retries are done before, this retries the requests throttled after them.
+
+    https://docs.aws.amazon.com/AmazonS3/latest/userguide/optimizing-performance.html
+    https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    """
+
+    _backoff_base_seconds = 0.5
+    _backoff_max_seconds = 30.0
+
+    def __init__(self, max_concurrency: int):
+        self._concurrency_limit = float(max_concurrency)
+        self._condition = threading.Condition()
+        self._max_concurrency = max_concurrency
+        self._requests_in_progress = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._concurrency_limit)
+
+    def get_response(self, send_request: Callable[[], dict]) -> dict:
+        max_attempts = int(os.getenv("AWS_THROTTLE_MAX_ATTEMPTS", 10))
+        for attempt in range(1, max_attempts + 1):
+            self._wait_for_free_request()
+            try:
+                result = send_request()
+            except ClientError as exception:
+                if not _is_throttling_error(exception) or attempt == max_attempts:
+                    raise
+                self._decrease_concurrency_limit()
+            else:
+                self._increase_concurrency_limit()
+                return result
+            finally:
+                self._free_request()
+            time.sleep(random.uniform(0, min(self._backoff_max_seconds, self._backoff_base_seconds * 2**attempt)))
+        raise ValueError("The number of attempts must be greater than 0")
+
+    def _wait_for_free_request(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._requests_in_progress < self.concurrency_limit)
+            self._requests_in_progress += 1
+
+    def _free_request(self):
+        with self._condition:
+            self._requests_in_progress -= 1
+            self._condition.notify_all()
+
+    def _increase_concurrency_limit(self):
+        with self._condition:
+            self._concurrency_limit = min(self._max_concurrency, self._concurrency_limit + 1 / self._concurrency_limit)
+            self._condition.notify_all()
+
+    def _decrease_concurrency_limit(self):
+        with self._condition:
+            self._concurrency_limit = max(1.0, self._concurrency_limit / 2)
+
+
+def _is_throttling_error(exception: ClientError) -> bool:
+    """https://docs.aws.amazon.com/AmazonS3/latest/API/ErrorResponses.html"""
+    return (
+        exception.response.get("Error", {}).get("Code") in ("SlowDown", "503")
+        or exception.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 503
+    )
 
-    def get_s3_data(self) -> Iterator[S3Data]:
-        """https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/list_objects_v2.html"""
-        response = self._s3_requester.get_response()
-        while response["KeyCount"] != 0:
-            self._response_analyzer.raise_exception_if_folders_in_response(response, self._bucket)
-            yield self._response_analyzer.get_s3_data_from_response(response)
-            last_key = response["Contents"][-1]["Key"]
-            response = self._s3_requester.get_response(last_key)
+
+_rate_controllers = {}
+_rate_controllers_lock = threading.Lock()
+
+
+def _get_rate_controller(bucket: str) -> _RateController:
+    """The requests to the same bucket share the controller, despite the S3 URI and the thread."""
+    with _rate_controllers_lock:
+        if bucket not in _rate_controllers:
+            _rate_controllers[bucket] = _RateController(int(os.getenv("AWS_MAX_POOL_CONNECTIONS", 10)))
+        return _rate_controllers[bucket]
 
 
 class _S3Requester:
-    def __init__(self, s3_query: S3Query):
+    def __init__(self, s3_query: S3Query, s3_client, is_recursive: bool | None = None):
+        self._is_recursive = os.getenv("AWS_RECURSIVE") == "true" if is_recursive is None else is_recursive
         self._s3_query = s3_query
-        self._s3_client = boto3.Session().client("s3", endpoint_url=os.getenv("AWS_ENDPOINT"))
+        self._s3_client = s3_client
 
-    def get_response(self, last_key: str | None = None) -> dict:
-        return self._s3_client.list_objects_v2(**self._get_request_arguments(last_key))
+    def get_responses(self, key_range: "_KeyRange") -> Iterator[dict]:
+        """The responses with files until the end of the key range, the last one can have keys after it.
 
-    def _get_request_arguments(self, last_key: str | None = None) -> dict:
+        The next page is requested with the continuation token of the truncated responses, which does not need the
+        last key, or after the last key if the response has no token.
+        """
+        response = self._get_response(start_after=key_range.start_after)
+        while response["KeyCount"] != 0:
+            yield response
+            last_key = get_last_key(response)
+            if response.get("IsTruncated") is False or (last_key is not None and key_range.is_key_after_end(last_key)):
+                return
+            if "NextContinuationToken" in response:
+                response = self._get_response(continuation_token=response["NextContinuationToken"])
+            else:
+                response = self._get_response(start_after=last_key)
+
+    def _get_response(self, start_after: str | None = None, continuation_token: str | None = None) -> dict:
+        request_arguments = self._get_request_arguments(start_after, continuation_token)
+        result = _get_rate_controller(self._s3_query.bucket).get_response(
+            lambda: self._s3_client.list_objects_v2(**request_arguments)
+        )
+        get_metrics().add_list_objects_v2_call(retries=result.get("ResponseMetadata", {}).get("RetryAttempts", 0))
+        return result
+
+    def _get_request_arguments(self, start_after: str | None = None, continuation_token: str | None = None) -> dict:
         max_keys = int(os.getenv("AWS_MAX_KEYS", 1000))
         result = {
             "Bucket": self._s3_query.bucket,
             "Prefix": self._s3_query.prefix,
             "MaxKeys": max_keys,
-            "Delimiter": "/",  # Required for folders detection.
         }
-        if last_key:
-            result["StartAfter"] = last_key
+        if not self._is_recursive:
+            result["Delimiter"] = "/"  # Required for folders detection.
+        if continuation_token is not None:
+            result["ContinuationToken"] = continuation_token
+        elif start_after:
+            result["StartAfter"] = start_after
         return result
 
 
+class _ResponsesPrefetcher:
+    """Requests the next responses in a thread while the previous ones are processed, so the requests and the
+    processing overlap. At most `depth` responses wait to be processed, to limit the memory. A depth of 0 requests
+    each response after processing the previous one.
+    """
+
+    _END = object()
+    _put_timeout_seconds = 0.1
+
+    def __init__(self, depth: int):
+        self._depth = depth
+
+    def get_responses(self, responses: Iterator[dict]) -> Iterator[dict]:
+        if self._depth == 0:
+            yield from responses
+            return
+        responses_queue = queue.Queue(maxsize=self._depth)
+        stop_event = threading.Event()
+        thread = threading.Thread(target=self._put_responses, args=(responses, responses_queue, stop_event))
+        thread.start()
+        try:
+            while (response := responses_queue.get()) is not self._END:
+                if isinstance(response, Exception):
+                    raise response
+                yield response
+        finally:
+            # The requests must stop if the responses are not consumed, for example after an error.
+            stop_event.set()
+            thread.join()
+
+    def _put_responses(self, responses: Iterator[dict], responses_queue: queue.Queue, stop_event: threading.Event):
+        try:
+            for response in responses:
+                if not self._put(response, responses_queue, stop_event):
+                    return
+            self._put(self._END, responses_queue, stop_event)
+        except Exception as exception:
+            self._put(exception, responses_queue, stop_event)
+
+    def _put(self, item, responses_queue: queue.Queue, stop_event: threading.Event) -> bool:
+        """Returns False if the responses are not consumed anymore."""
+        while not stop_event.is_set():
+            try:
+                responses_queue.put(item, timeout=self._put_timeout_seconds)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
 class _ResponseAnalyzer:
+    def __init__(self, s3_query: S3Query, listing_filter: ListingFilter | None = None):
+        self._listing_filter = listing_filter
+        self._s3_query = s3_query
+
     def raise_exception_if_folders_in_response(self, response: dict, bucket: str):
         folder_path_names = self._get_folder_path_names_in_response(response)
         if len(folder_path_names) == 0:
             return
-        folder_path_names = [common_prefix["Prefix"] for common_prefix in response["CommonPrefixes"]]
-        error_text = (
-            f"Subfolders detected in bucket '{bucket}'. The current version of the program cannot manage subfolders"
-            f". Subfolders ({len(folder_path_names)}): {', '.join(folder_path_names)}"
-        )
-        raise FolderInS3UriError(error_text)
+        raise FolderInS3UriError(bucket, folder_path_names)
 
-    def get_s3_data_from_response(self, response: dict) -> S3Data:
-        return [
-            self._get_file_s3_data_from_s3_response_content(content)
-            for content in response["Contents"]
-            if self._is_file(content)
-        ]
+    def get_s3_data_from_contents(self, contents: ListObjectsV2Contents) -> S3Data:
+        """The values are converted to the column arrays without a Python object for each file."""
+        # Sometimes the responses have the folders.
+        is_folder = np.array([key.endswith("/") for key in contents.keys], dtype=bool) & (contents.sizes == 0)
+        is_file = ~is_folder
+        # The path relative to the prefix identifies the files of subfolders too.
+        prefix_length = len(self._s3_query.prefix)
+        names = np.array([key[prefix_length:] for key in contents.keys], dtype=object)
+        if self._listing_filter is not None:
+            is_file &= self._listing_filter.get_mask(names, contents.dates, contents.sizes)
+        return S3Data(names[is_file], contents.dates[is_file], contents.sizes[is_file], contents.hashes[is_file])
 
     def _get_folder_path_names_in_response(self, response: dict) -> list[str]:
         # Detect folders: https://stackoverflow.com/a/71579041
         if "CommonPrefixes" not in response:
             return []
         return [common_prefix["Prefix"] for common_prefix in response["CommonPrefixes"]]
-
-    @staticmethod
-    def _get_file_s3_data_from_s3_response_content(s3_response_content: dict) -> FileS3Data:
-        return FileS3Data(
-            Path(s3_response_content["Key"]).name,
-            s3_response_content["LastModified"],
-            s3_response_content["Size"],
-            s3_response_content["ETag"].strip('"'),
-        )
-
-    @staticmethod
-    def _is_file(content: dict) -> bool:
-        """Sometimes Boto3 retuns the folder in the response"""
-        return not (content["Key"].endswith("/") and content["Size"] == 0)
@@ -0,0 +1,37 @@
+import base64
+import hashlib
+
+
+class S3ContentHasher:
+    """Returns the SHA-256 of the content of the S3 objects, in base64 as the S3 checksums.
+
+    The ETag of the objects uploaded with multipart depends on the part size, the SHA-256 of the content does not. The
+    checksum stored by S3 is used if it is of the full object, otherwise the object is downloaded in ranges.
+
+    https://docs.aws.amazon.com/AmazonS3/latest/userguide/checking-object-integrity.html
+    """
+
+    _bytes_per_range = 8 * 1024 * 1024
+
+    def __init__(self, s3_client):
+        self._s3_client = s3_client
+
+    def get_hash(self, bucket: str, key: str) -> str:
+        attributes = self._s3_client.get_object_attributes(
+            Bucket=bucket, Key=key, ObjectAttributes=["Checksum", "ETag", "ObjectSize"]
+        )
+        checksum = attributes.get("Checksum", {}).get("ChecksumSHA256")
+        # The checksums of multipart uploads are of the parts checksums, their ETags end with the number of parts.
+        if checksum is not None and "-" not in attributes["ETag"]:
+            return checksum
+        return self._get_hash_of_ranges(bucket, key, attributes["ObjectSize"])
+
+    def _get_hash_of_ranges(self, bucket: str, key: str, size: int) -> str:
+        """Only one range is in memory at the same time."""
+        result = hashlib.sha256()
+        for start in range(0, size, self._bytes_per_range):
+            end = min(start + self._bytes_per_range, size) - 1
+            response = self._s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+            for chunk in response["Body"].iter_chunks():
+                result.update(chunk)
+        return base64.b64encode(result.digest()).decode()
@@ -0,0 +1,297 @@
+import json
+import os
+import re
+import threading
+from abc import ABC
+from abc import abstractmethod
+from collections.abc import Iterator
+from pathlib import Path
+from urllib.parse import unquote_plus
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as Df
+
+from aws_s3_diff.exception import FolderInS3UriError
+from aws_s3_diff.exception import S3InventoryFormatError
+from aws_s3_diff.logger import get_logger
+from aws_s3_diff.s3_data.listing_filter import ListingFilter
+from aws_s3_diff.s3_data.s3_client import get_last_key_of_prefix
+from aws_s3_diff.type_custom import S3Data
+from aws_s3_diff.type_custom import S3Query
+
+# Names of the columns in the ORC and Parquet files. The CSV files have no header, the manifest has their names.
+_COLUMN_NAMES_OF_CSV_COLUMN_NAMES = {
+    "Bucket": "bucket",
+    "Key": "key",
+    "Size": "size",
+    "LastModifiedDate": "last_modified_date",
+    "ETag": "e_tag",
+    "IsLatest": "is_latest",
+    "IsDeleteMarker": "is_delete_marker",
+}
+# Optional fields of the reports, the other columns are always included.
+_REQUIRED_OPTIONAL_COLUMN_NAMES = ["size", "last_modified_date", "e_tag"]
+_ROWS_PER_CHUNK = 100_000
+
+
+class S3InventoryManifests:
+    """Local S3 Inventory reports configured with the AWS_INVENTORY_MANIFESTS environment variable.
+
+    https://docs.aws.amazon.com/AmazonS3/latest/userguide/storage-inventory-location.html
+    """
+
+    def __init__(self):
+        self._logger = get_logger()
+        self._manifest_paths_cache = None
+        self._s3_inventory_readers = {}
+        self._lock = threading.Lock()
+
+    def get_manifest_path(self, bucket: str) -> Path | None:
+        """The reports without the fields required by the analysis are omitted, their buckets are listed."""
+        return self._get_manifest_paths().get(bucket)
+
+    def get_s3_inventory_reader(self, bucket: str, s3_queries: list[S3Query]) -> "S3InventoryReader":
+        """The report of the bucket is read once for its S3 URIs of the first call, the other S3 URIs are omitted."""
+        # The S3 URIs can be listed in different threads.
+        with self._lock:
+            if bucket not in self._s3_inventory_readers:
+                self._s3_inventory_readers[bucket] = S3InventoryReader(self.get_manifest_path(bucket), s3_queries)
+            return self._s3_inventory_readers[bucket]
+
+    def _get_manifest_paths(self) -> dict[str, Path]:
+        if self._manifest_paths_cache is None:
+            self._manifest_paths_cache = {}
+            for manifest_path_name in os.getenv("AWS_INVENTORY_MANIFESTS", "").split(","):
+                if manifest_path_name.strip() == "":
+                    continue
+                manifest_path = Path(manifest_path_name.strip())
+                manifest = _Manifest(manifest_path)
+                missing_column_names = manifest.get_missing_column_names()
+                if len(missing_column_names) > 0:
+                    self._logger.warning(
+                        f"The S3 Inventory report {manifest_path} has not the fields {missing_column_names}"
+                        f", the bucket '{manifest.source_bucket}' is listed"
+                    )
+                    continue
+                self._manifest_paths_cache[manifest.source_bucket] = manifest_path
+        return self._manifest_paths_cache
+
+
+class S3InventoryReader:
+    """Reads the S3 Inventory report of a bucket once and splits its files by S3 URI, instead of reading the report
+    for each S3 URI. The files of each S3 URI are kept in memory until they are returned.
+    """
+
+    def __init__(self, manifest_path: Path, s3_queries: list[S3Query]):
+        self._manifest = _Manifest(manifest_path)
+        self._s3_queries = [s3_query for s3_query in s3_queries if s3_query.bucket == self._manifest.source_bucket]
+        self._lock = threading.Lock()
+        self._dfs_of_queries = None
+
+    def get_df_of_query(self, s3_query: S3Query) -> Df:
+        """The files of the S3 URI, without order. The report is read again for a S3 URI not split or returned."""
+        # The S3 URIs can be listed in different threads, the report is read for the first one.
+        with self._lock:
+            if self._dfs_of_queries is None:
+                self._dfs_of_queries = self._get_dfs_of_queries(self._s3_queries)
+            dfs = self._dfs_of_queries.pop(s3_query, None)
+        if dfs is None:
+            dfs = self._get_dfs_of_queries([s3_query])[s3_query]
+        if len(dfs) == 0:
+            return Df(columns=["name", "date", "size", "hash"])
+        return pd.concat(dfs, ignore_index=True)
+
+    def _get_dfs_of_queries(self, s3_queries: list[S3Query]) -> dict[S3Query, list[Df]]:
+        result = {s3_query: [] for s3_query in s3_queries}
+        for df in self._manifest.get_dfs():
+            df = self._get_df_of_files(df)
+            # The keys of each S3 URI are a range of the sorted keys.
+            keys = df["key"].to_numpy(dtype=object)
+            for s3_query in s3_queries:
+                start_index, end_index = keys.searchsorted(
+                    np.array([s3_query.prefix, get_last_key_of_prefix(s3_query.prefix)], dtype=object)
+                )
+                if end_index > start_index:
+                    result[s3_query].append(self._get_df_of_query(s3_query, df.iloc[start_index:end_index]))
+        return result
+
+    def _get_df_of_files(self, df: Df) -> Df:
+        """The current versions of the files of the bucket, sorted by key."""
+        df = df.loc[df["bucket"].eq(self._manifest.source_bucket)]
+        if "is_latest" in df:
+            df = df.loc[df["is_latest"]]
+        if "is_delete_marker" in df:
+            df = df.loc[~df["is_delete_marker"]]
+        # Folders are objects with a trailing slash and without content, S3 responses omit them too.
+        df = df.loc[~(df["key"].str.endswith("/") & df["size"].fillna(-1).eq(0))]
+        return df.sort_values("key", ignore_index=True)
+
+    @staticmethod
+    def _get_df_of_query(s3_query: S3Query, df: Df) -> Df:
+        return Df(
+            {
+                # The path relative to the prefix identifies the files of subfolders too.
+                "name": df["key"].str.slice(len(s3_query.prefix)),
+                "date": pd.to_datetime(df["last_modified_date"], utc=True),
+                "size": df["size"].astype("Int64"),
+                "hash": df["e_tag"].str.strip('"'),
+            }
+        )
+
+
+class S3InventoryClient:
+    """Returns the same S3 data as `S3Client` reading a S3 Inventory report instead of listing the bucket."""
+
+    def __init__(
+        self,
+        s3_query: S3Query,
+        s3_inventory_reader: S3InventoryReader,
+        listing_filter: ListingFilter | None = None,
+    ):
+        self._is_recursive = os.getenv("AWS_RECURSIVE") == "true"
+        self._listing_filter = listing_filter
+        self._s3_inventory_reader = s3_inventory_reader
+        self._s3_query = s3_query
+
+    def get_s3_data(self, start_after_file_name: str | None = None) -> Iterator[S3Data]:
+        """The files until `start_after_file_name`, included, are omitted."""
+        df = self._s3_inventory_reader.get_df_of_query(self._s3_query)
+        self._raise_exception_if_folders(df)
+        # Same order as the S3 responses.
+        df = df.loc[~df["name"].eq("")].sort_values("name", ignore_index=True)
+        if start_after_file_name is not None:
+            df = df.loc[df["name"].gt(start_after_file_name)].reset_index(drop=True)
+        max_keys = int(os.getenv("AWS_MAX_KEYS", 1000))
+        for start_index in range(0, len(df), max_keys):
+            page_df = df.iloc[start_index : start_index + max_keys]
+            s3_data = S3Data(
+                page_df["name"].to_numpy(dtype=object),
+                page_df["date"].dt.tz_convert(None).to_numpy(dtype="datetime64[ns]"),
+                page_df["size"].to_numpy(dtype=np.int64),
+                page_df["hash"].to_numpy(dtype=np.bytes_),
+            )
+            if self._listing_filter is not None:
+                s3_data = s3_data.get_files_of_mask(
+                    self._listing_filter.get_mask(s3_data.names, s3_data.dates, s3_data.sizes)
+                )
+            if len(s3_data) > 0:
+                yield s3_data
+
+    def _raise_exception_if_folders(self, df: Df):
+        if self._is_recursive:
+            return
+        folder_names = df.loc[df["name"].str.contains("/", regex=False), "name"].str.split("/").str[0]
+        if len(folder_names) == 0:
+            return
+        folder_path_names = [f"{self._s3_query.prefix}{folder_name}/" for folder_name in sorted(folder_names.unique())]
+        raise FolderInS3UriError(self._s3_query.bucket, folder_path_names)
+
+
+class _Manifest:
+    """https://docs.aws.amazon.com/AmazonS3/latest/userguide/storage-inventory-location.html#storage-inventory-location-manifest"""
+
+    def __init__(self, file_path: Path):
+        self._file_path = file_path
+        with open(file_path, encoding="utf-8") as file:
+            self._manifest = json.load(file)
+
+    @property
+    def source_bucket(self) -> str:
+        return self._manifest["sourceBucket"]
+
+    def get_missing_column_names(self) -> list[str]:
+        """The schema has the CSV column names or the ORC and Parquet schema with the names of their columns."""
+        schema_names = re.findall(r"\w+", self._manifest["fileSchema"])
+        column_names = {_COLUMN_NAMES_OF_CSV_COLUMN_NAMES.get(name, name) for name in schema_names}
+        return [column_name for column_name in _REQUIRED_OPTIONAL_COLUMN_NAMES if column_name not in column_names]
+
+    def get_dfs(self) -> Iterator[Df]:
+        file_reader = self._get_file_reader()
+        for file in self._manifest["files"]:
+            yield from file_reader.get_dfs(self._get_data_file_path(file["key"]))
+
+    def _get_data_file_path(self, key: str) -> Path:
+        """The data files are in the `data` folder next to the folder of the manifest."""
+        return self._file_path.parent.parent.joinpath("data", Path(key).name)
+
+    def _get_file_reader(self) -> "_InventoryFileReader":
+        file_format = self._manifest["fileFormat"]
+        if file_format == "CSV":
+            csv_column_names = [column_name.strip() for column_name in self._manifest["fileSchema"].split(",")]
+            return _CsvInventoryFileReader(csv_column_names)
+        if file_format == "ORC":
+            return _OrcInventoryFileReader()
+        if file_format == "Parquet":
+            return _ParquetInventoryFileReader()
+        raise S3InventoryFormatError(file_format=file_format, file_formats="CSV, ORC, Parquet")
+
+
+class _InventoryFileReader(ABC):
+    """Reads the data files in chunks and only the columns required."""
+
+    @abstractmethod
+    def get_dfs(self, file_path: Path) -> Iterator[Df]:
+        pass
+
+
+class _CsvInventoryFileReader(_InventoryFileReader):
+    def __init__(self, csv_column_names: list[str]):
+        self._csv_column_names = csv_column_names
+
+    def get_dfs(self, file_path: Path) -> Iterator[Df]:
+        csv_column_names_to_read = [
+            column_name for column_name in self._csv_column_names if column_name in _COLUMN_NAMES_OF_CSV_COLUMN_NAMES
+        ]
+        with pd.read_csv(
+            file_path,
+            chunksize=_ROWS_PER_CHUNK,
+            dtype=str,
+            header=None,
+            keep_default_na=False,
+            names=self._csv_column_names,
+            usecols=csv_column_names_to_read,
+        ) as reader:
+            for df in reader:
+                yield self._get_df_with_parsed_values(df.rename(columns=_COLUMN_NAMES_OF_CSV_COLUMN_NAMES))
+
+    @staticmethod
+    def _get_df_with_parsed_values(df: Df) -> Df:
+        # The keys of the CSV files are URL-encoded.
+        df["key"] = df["key"].map(unquote_plus)
+        # The delete markers have no size.
+        df["size"] = pd.to_numeric(df["size"].mask(df["size"].eq(""))).astype("Int64")
+        for column_name in ("is_latest", "is_delete_marker"):
+            if column_name in df:
+                df[column_name] = df[column_name].str.lower().eq("true")
+        return df
+
+
+class _OrcInventoryFileReader(_InventoryFileReader):
+    """Requires the pyarrow package."""
+
+    def get_dfs(self, file_path: Path) -> Iterator[Df]:
+        import pyarrow.orc as orc
+
+        orc_file = orc.ORCFile(file_path)
+        column_names = [column_name for column_name in orc_file.schema.names if _is_column_to_read(column_name)]
+        for stripe_index in range(orc_file.nstripes):
+            yield orc_file.read_stripe(stripe_index, columns=column_names).to_pandas()
+
+
+class _ParquetInventoryFileReader(_InventoryFileReader):
+    """Requires the pyarrow package."""
+
+    def get_dfs(self, file_path: Path) -> Iterator[Df]:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        column_names = [
+            column_name for column_name in parquet_file.schema_arrow.names if _is_column_to_read(column_name)
+        ]
+        for record_batch in parquet_file.iter_batches(batch_size=_ROWS_PER_CHUNK, columns=column_names):
+            yield record_batch.to_pandas()
+
+
+def _is_column_to_read(column_name: str) -> bool:
+    return column_name in _COLUMN_NAMES_OF_CSV_COLUMN_NAMES.values()
@@ -0,0 +1,89 @@
+import bisect
+import itertools
+import math
+import os
+from collections import defaultdict
+
+from aws_s3_diff.s3_data.s3_client import get_last_key_of_prefix
+from aws_s3_diff.s3_data.s3_client import get_parent_prefix
+from aws_s3_diff.type_custom import S3Query
+
+
+class S3QueriesPlanner:
+    """Groups the S3 URIs of a bucket in the same folder, to list each group with one listing of the folder.
+
+    The cost of a listing is its number of S3 requests, estimated with the number of files of the S3 URIs in the
+    previous analysis. The listing of a group has the keys from its first S3 URI to its last one, so its estimate has
+    the files of all the known S3 URIs in that range, not only the files of the S3 URIs of the group. A group is listed
+    together if it requires fewer requests than listing its S3 URIs separately, each S3 URI requires one request at
+    least. The S3 URIs with an unknown number of files or with one page of files or more are listed alone and the
+    groups do not include them, and the folders in the bucket root are not grouped.
+
+    The other keys between the S3 URIs are unknown, `S3SiblingPrefixesClient` stops the listing of a group that
+    requires more requests than estimated.
+    """
+
+    _max_files_per_listing = 100_000
+
+    def __init__(self, number_of_files_of_queries: dict[S3Query, int]):
+        self._number_of_files_of_queries = number_of_files_of_queries
+        self._max_keys = int(os.getenv("AWS_MAX_KEYS", 1000))
+        self._prefixes_and_cumulative_files_of_buckets = self._get_prefixes_and_cumulative_files_of_buckets()
+
+    def get_groups(self, s3_queries: list[S3Query]) -> list[list[S3Query]]:
+        """Only the groups with more than one S3 URI are returned, sorted by prefix."""
+        s3_queries_of_parents = defaultdict(list)
+        for s3_query in sorted(set(s3_queries), key=lambda s3_query: (s3_query.bucket, s3_query.prefix)):
+            parent_prefix = get_parent_prefix(s3_query.prefix)
+            if parent_prefix != "":
+                s3_queries_of_parents[(s3_query.bucket, parent_prefix)].append(s3_query)
+        result = []
+        for sibling_s3_queries in s3_queries_of_parents.values():
+            result.extend(group for group in self._get_groups_of_siblings(sibling_s3_queries) if len(group) > 1)
+        return result
+
+    def _get_groups_of_siblings(self, s3_queries: list[S3Query]) -> list[list[S3Query]]:
+        result = []
+        group = []
+        for s3_query in s3_queries:
+            if not self._can_be_grouped(s3_query):
+                # The files of the S3 URI would be listed by the group.
+                result.append(group)
+                group = []
+                continue
+            if len(group) > 0 and self._get_number_of_files_of_group([*group, s3_query]) > self._max_files_per_listing:
+                result.append(group)
+                group = []
+            group.append(s3_query)
+        result.append(group)
+        return [group for group in result if len(group) > 1 and self._is_group_cheaper(group)]
+
+    def _can_be_grouped(self, s3_query: S3Query) -> bool:
+        number_of_files = self._number_of_files_of_queries.get(s3_query)
+        return number_of_files is not None and number_of_files < self._max_keys
+
+    def _is_group_cheaper(self, s3_queries: list[S3Query]) -> bool:
+        group_files = self._get_number_of_files_of_group(s3_queries)
+        return max(1, math.ceil(group_files / self._max_keys)) < len(s3_queries)
+
+    def _get_number_of_files_of_group(self, s3_queries: list[S3Query]) -> int:
+        """The files of the known S3 URIs from the first S3 URI of the group to the last one, both included."""
+        prefixes, cumulative_files = self._prefixes_and_cumulative_files_of_buckets[s3_queries[0].bucket]
+        start_index = bisect.bisect_left(prefixes, s3_queries[0].prefix)
+        end_index = bisect.bisect_left(prefixes, get_last_key_of_prefix(s3_queries[-1].prefix))
+        return cumulative_files[end_index] - cumulative_files[start_index]
+
+    def _get_prefixes_and_cumulative_files_of_buckets(self) -> dict[str, tuple[list[str], list[int]]]:
+        """The cumulative files start with 0, the files of a range of prefixes are the difference of two values."""
+        result = {}
+        s3_queries = sorted(self._number_of_files_of_queries, key=lambda s3_query: (s3_query.bucket, s3_query.prefix))
+        for bucket, bucket_s3_queries in itertools.groupby(s3_queries, key=lambda s3_query: s3_query.bucket):
+            bucket_s3_queries = list(bucket_s3_queries)
+            result[bucket] = (
+                [s3_query.prefix for s3_query in bucket_s3_queries],
+                [
+                    0,
+                    *itertools.accumulate(self._number_of_files_of_queries[s3_query] for s3_query in bucket_s3_queries),
+                ],
+            )
+        return result
@@ -0,0 +1,148 @@
+import os
+from abc import ABC
+from abc import abstractmethod
+from collections.abc import Iterable
+from collections.abc import Iterator
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame as Df
+
+from aws_s3_diff.exception import StorageFormatError
+from aws_s3_diff.s3_data.df_utility import write_dfs_to_csv_buffer
+
+
+def get_storage() -> "Storage":
+    storage_format = os.getenv("AWS_STORAGE_FORMAT", _CsvStorage.extension)
+    storage_classes = [_CsvStorage, _FeatherStorage, _ParquetStorage]
+    for storage_class in storage_classes:
+        if storage_class.extension == storage_format:
+            return storage_class()
+    storage_formats = ", ".join(storage_class.extension for storage_class in storage_classes)
+    raise StorageFormatError(storage_format=storage_format, storage_formats=storage_formats)
+
+
+class Storage(ABC):
+    """Manages the files with the intermediate results of the analysis"""
+
+    extension = ""
+
+    @abstractmethod
+    def read_df(self, file_path: Path, date_column_names: list[str]) -> Df:
+        pass
+
+    @abstractmethod
+    def read_dfs(self, file_path: Path, date_column_names: list[str], rows_per_df: int) -> Iterator[Df]:
+        """Reads the file in chunks, the concatenation of the Dfs is the same as `read_df`."""
+        pass
+
+    @abstractmethod
+    def write_df(self, df: Df, file_path: Path):
+        pass
+
+    @abstractmethod
+    def write_dfs(self, dfs: Iterable[Df], file_path: Path):
+        """The result is the same as writing the concatenation of the Dfs, they must have the same columns."""
+        pass
+
+
+class _CsvStorage(Storage):
+    extension = "csv"
+
+    def read_df(self, file_path: Path, date_column_names: list[str]) -> Df:
+        return pd.read_csv(file_path, parse_dates=date_column_names)
+
+    def read_dfs(self, file_path: Path, date_column_names: list[str], rows_per_df: int) -> Iterator[Df]:
+        with pd.read_csv(file_path, chunksize=rows_per_df, parse_dates=date_column_names) as reader:
+            yield from reader
+
+    def write_df(self, df: Df, file_path: Path):
+        df.to_csv(index=False, path_or_buf=file_path)
+
+    def write_dfs(self, dfs: Iterable[Df], file_path: Path):
+        with open(file_path, "w", newline="") as file:
+            write_dfs_to_csv_buffer(dfs, file)
+
+
+class _ArrowStorage(Storage):
+    """Typed columnar files, the values are not parsed again when the files are read.
+
+    Requires the pyarrow package.
+    """
+
+    def write_df(self, df: Df, file_path: Path):
+        self.write_dfs([df], file_path)
+
+    def write_dfs(self, dfs: Iterable[Df], file_path: Path):
+        import pyarrow as pa
+
+        writer = None
+        try:
+            for df in dfs:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    schema = self._get_schema_without_null_types(table.schema)
+                    writer = self._get_writer(file_path, schema)
+                writer.write_table(table.cast(schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            self.write_df(Df(), file_path)
+
+    @staticmethod
+    def _get_schema_without_null_types(schema):
+        """Pyarrow infers the null type for a column without values, in this program they can only be strings."""
+        import pyarrow as pa
+
+        for index, field in enumerate(schema):
+            if pa.types.is_null(field.type):
+                schema = schema.set(index, field.with_type(pa.string()))
+        return schema
+
+    @abstractmethod
+    def _get_writer(self, file_path: Path, schema):
+        pass
+
+
+class _FeatherStorage(_ArrowStorage):
+    extension = "feather"
+
+    def _get_writer(self, file_path: Path, schema):
+        """The Feather format is the Arrow IPC file format: https://arrow.apache.org/docs/python/feather.html"""
+        import pyarrow as pa
+
+        return pa.ipc.new_file(file_path, schema)
+
+    def read_df(self, file_path: Path, date_column_names: list[str]) -> Df:
+        return pd.read_feather(file_path)
+
+    def read_dfs(self, file_path: Path, date_column_names: list[str], rows_per_df: int) -> Iterator[Df]:
+        """The batches are sliced, a file written by `write_df` has one batch with all the rows."""
+        import pyarrow as pa
+
+        with pa.memory_map(str(file_path)) as source:
+            reader = pa.ipc.open_file(source)
+            for batch_index in range(reader.num_record_batches):
+                batch = reader.get_batch(batch_index)
+                # The slices are views of the memory map, only each Df is loaded in memory.
+                for offset in range(0, batch.num_rows, rows_per_df):
+                    yield batch.slice(offset, rows_per_df).to_pandas()
+
+
+class _ParquetStorage(_ArrowStorage):
+    extension = "parquet"
+
+    def _get_writer(self, file_path: Path, schema):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(file_path, schema)
+
+    def read_df(self, file_path: Path, date_column_names: list[str]) -> Df:
+        return pd.read_parquet(file_path)
+
+    def read_dfs(self, file_path: Path, date_column_names: list[str], rows_per_df: int) -> Iterator[Df]:
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(file_path).iter_batches(batch_size=rows_per_df):
+            yield record_batch.to_pandas()
@@ -1,5 +1,12 @@
+import bisect
+from collections.abc import Iterable
+from collections.abc import Iterator
 from typing import NamedTuple
 
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as Df
+
 
 class S3Query:
     def __init__(self, bucket: str, prefix: str):
@@ -15,7 +22,7 @@ class S3Query:
         return False
 
     def __hash__(self):
-        return hash((self.bucket, self._prefix))
+        return hash((self.bucket, self.prefix))
 
     @property
     def prefix(self) -> str:
@@ -30,4 +37,82 @@ class FileS3Data(NamedTuple):
     hash: str | None = None
 
 
-S3Data = list[FileS3Data]
+class S3Data:
+    """Files of a S3 response, stored by column to avoid a Python object for each file and value.
+
+    The names are strings, the dates are UTC datetime64, the sizes int64 and the hashes fixed-width bytes, the ETags
+    are ASCII. The bucket and prefix are the same for all the files, they are added when the Df is built.
+    The files are returned as `FileS3Data` when iterated.
+    """
+
+    def __init__(self, names: np.ndarray, dates: np.ndarray, sizes: np.ndarray, hashes: np.ndarray):
+        self.names = names
+        self.dates = dates
+        self.sizes = sizes
+        self.hashes = hashes
+
+    @classmethod
+    def from_files(cls, files: Iterable[FileS3Data]) -> "S3Data":
+        files = list(files)
+        return cls(
+            np.array([file.name for file in files], dtype=object),
+            pd.to_datetime([file.date for file in files], utc=True).tz_convert(None).to_numpy(dtype="datetime64[ns]"),
+            np.array([file.size for file in files], dtype=np.int64),
+            np.array([file.hash for file in files], dtype=np.bytes_),
+        )
+
+    def __repr__(self):
+        return f"S3Data({list(self)})"
+
+    def __eq__(self, other):
+        if isinstance(other, S3Data):
+            return all(
+                np.array_equal(array, other_array)
+                for array, other_array in zip(
+                    (self.names, self.dates, self.sizes, self.hashes),
+                    (other.names, other.dates, other.sizes, other.hashes),
+                    strict=True,
+                )
+            )
+        return False
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index: int) -> FileS3Data:
+        return FileS3Data(
+            self.names[index],
+            pd.Timestamp(self.dates[index], tz="UTC"),
+            int(self.sizes[index]),
+            self.hashes[index].decode(),
+        )
+
+    def __iter__(self) -> Iterator[FileS3Data]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def get_files_after(self, name: str) -> "S3Data":
+        """The files are sorted by name."""
+        start_index = bisect.bisect_right(self.names, name)
+        return S3Data(
+            self.names[start_index:], self.dates[start_index:], self.sizes[start_index:], self.hashes[start_index:]
+        )
+
+    def get_files_of_mask(self, mask: np.ndarray) -> "S3Data":
+        return S3Data(self.names[mask], self.dates[mask], self.sizes[mask], self.hashes[mask])
+
+    def get_df(self, column_names: list[str] | None = None) -> Df:
+        """The name and the columns of the files, all by default. Only the selected columns are converted."""
+        column_names = ["date", "size", "hash"] if column_names is None else column_names
+        result = Df({"name": self.names})
+        if "date" in column_names:
+            result["date"] = pd.DatetimeIndex(self.dates).tz_localize("UTC")
+        if "size" in column_names:
+            result["size"] = self.sizes
+        if "hash" in column_names:
+            result["hash"] = self.hashes.astype(str).astype(object)
+        return result
+
+    def get_bytes(self) -> int:
+        """Sum of the sizes of the files."""
+        return int(self.sizes.sum())
@@ -0,0 +1,63 @@
+"""Time the creation of the Df of an account for a different number of S3 objects.
+
+The time per object must be constant if the Df is built in linear time.
+
+Usage: python -m benchmarks.account_df_assembly --objects 10000 100000 1000000 10000000
+"""
+
+import argparse
+import time
+from collections.abc import Iterator
+
+import numpy as np
+
+from aws_s3_diff.s3_data.one_account import AccountDataGenerator
+from aws_s3_diff.type_custom import S3Data
+from aws_s3_diff.type_custom import S3Query
+
+_OBJECTS_PER_PAGE = 1000
+
+
+class _SyntheticAccountDataGenerator(AccountDataGenerator):
+    def __init__(self, number_of_objects: int):
+        super().__init__("benchmark")
+        self._number_of_objects = number_of_objects
+
+    def _get_s3_queries(self) -> list[S3Query]:
+        return [S3Query("bucket", "prefix")]
+
+    def _get_s3_data_of_query(
+        self, s3_query: S3Query, start_after_file_name: str | None = None
+    ) -> Iterator[S3Data | None]:
+        date = np.datetime64("2024-10-14T08:49:01", "ns")
+        for page_start in range(0, self._number_of_objects, _OBJECTS_PER_PAGE):
+            indexes = range(page_start, min(page_start + _OBJECTS_PER_PAGE, self._number_of_objects))
+            yield S3Data(
+                np.array([f"file-{index:09d}.csv" for index in indexes], dtype=object),
+                np.full(len(indexes), date),
+                np.array(indexes, dtype=np.int64),
+                np.array([f"{index:032x}" for index in indexes], dtype=np.bytes_),
+            )
+
+
+def _get_seconds_to_build_df(number_of_objects: int) -> float:
+    account_data_generator = _SyntheticAccountDataGenerator(number_of_objects)
+    start = time.perf_counter()
+    df = account_data_generator.get_df()
+    result = time.perf_counter() - start
+    assert len(df) == number_of_objects
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", nargs="+", type=int, default=[10_000, 100_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+    print(f"{'objects':>12} {'seconds':>10} {'us/object':>10}")
+    for number_of_objects in args.objects:
+        seconds = _get_seconds_to_build_df(number_of_objects)
+        print(f"{number_of_objects:>12} {seconds:>10.2f} {seconds / number_of_objects * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
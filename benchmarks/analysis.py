@@ -0,0 +1,134 @@
+"""Compare the time to set the analysis columns with the previous and the current implementation.
+
+The previous implementation copied the Df and calculated the masks again for each analysis column.
+
+Usage: python -m benchmarks.analysis --rows 10000000 --accounts 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as Df
+from pandas import MultiIndex
+
+from aws_s3_diff.s3_data.analysis import _AccountsToCompare
+from aws_s3_diff.s3_data.analysis import _AnalysisBuilder
+
+
+class _AnalysisConfigReader:
+    def __init__(self, accounts: list[str]):
+        self._accounts = accounts
+
+    def get_accounts_where_hash_must_match(self) -> list[str]:
+        return self._accounts[1:]
+
+    def get_accounts_that_must_not_have_more_files(self) -> list[str]:
+        return self._accounts[1:]
+
+
+class _PreviousIsHashMatchedTwoAccountsAnalysisSetter:
+    """Previous implementation of the program."""
+
+    def __init__(self, accounts: _AccountsToCompare, df: Df):
+        self._accounts = accounts
+        self._df = df
+
+    def get_df_set_analysis_column(self) -> Df:
+        column_name = ("analysis", f"is_hash_the_same_in_{self._accounts.target}")
+        result = self._df.copy()
+        result[[column_name]] = None
+        result.loc[self._has_origin_file() & ~self._is_the_same_file(), [column_name]] = False
+        result.loc[self._has_origin_file() & self._is_the_same_file(), [column_name]] = True
+        result.loc[~self._has_origin_file() & self._has_target_file(), [column_name]] = False
+        result.loc[~self._has_origin_file() & ~self._has_target_file(), [column_name]] = None
+        return result
+
+    def _has_origin_file(self) -> pd.Series:
+        return self._df.loc[:, (self._accounts.origin, "size")].notnull()
+
+    def _has_target_file(self) -> pd.Series:
+        return self._df.loc[:, (self._accounts.target, "size")].notnull()
+
+    def _is_the_same_file(self) -> pd.Series:
+        return (
+            self._df.loc[:, (self._accounts.origin, "hash")]
+            .eq(self._df.loc[:, (self._accounts.target, "hash")])
+            .fillna(False)
+        )
+
+
+class _PreviousCanFileExistTwoAccountsAnalysisSetter(_PreviousIsHashMatchedTwoAccountsAnalysisSetter):
+    def get_df_set_analysis_column(self) -> Df:
+        column_name = ("analysis", f"can_exist_in_{self._accounts.target}")
+        result = self._df.copy()
+        result[[column_name]] = None
+        result.loc[~self._has_origin_file() & self._has_target_file(), [column_name]] = False
+        return result
+
+
+class _PreviousAnalysisBuilder(_AnalysisBuilder):
+    def with_analysis_is_hash_matched(self) -> "_AnalysisBuilder":
+        account_targets = self._analysis_config_reader.get_accounts_where_hash_must_match()
+        self._set_previous_analysis_columns(account_targets, _PreviousIsHashMatchedTwoAccountsAnalysisSetter)
+        return self
+
+    def with_analysis_can_the_file_exist(self) -> "_AnalysisBuilder":
+        account_targets = self._analysis_config_reader.get_accounts_that_must_not_have_more_files()
+        self._set_previous_analysis_columns(account_targets, _PreviousCanFileExistTwoAccountsAnalysisSetter)
+        return self
+
+    def _set_previous_analysis_columns(self, account_targets: list[str], two_accounts_analysis_setter_class: type):
+        for account_target in account_targets:
+            accounts = _AccountsToCompare(self._account_origin, account_target)
+            self._df = two_accounts_analysis_setter_class(accounts, self._df).get_df_set_analysis_column()
+
+
+def _get_df(number_of_rows: int, accounts: list[str]) -> Df:
+    """Some files are missing in each account and some hashes are different."""
+    random_generator = np.random.default_rng(0)
+    hashes = np.array([f"{index:032x}" for index in range(1000)], dtype=object)
+    data = {}
+    for account in accounts:
+        has_file = random_generator.random(number_of_rows) < 0.9
+        sizes = pd.array(np.arange(number_of_rows), dtype="Int64")
+        sizes[~has_file] = pd.NA
+        account_hashes = hashes[np.arange(number_of_rows) % len(hashes)].copy()
+        account_hashes[random_generator.random(number_of_rows) < 0.05] = hashes[0]
+        account_hashes[~has_file] = None
+        data[(account, "date")] = pd.Series(pd.Timestamp("2024-10-14", tz="UTC"), index=range(number_of_rows))
+        data[(account, "size")] = sizes
+        data[(account, "hash")] = account_hashes
+    result = Df(data)
+    result.columns = MultiIndex.from_tuples(result.columns)
+    return result
+
+
+def _get_seconds_to_set_analysis(analysis_builder_class: type[_AnalysisBuilder], df: Df, accounts: list[str]) -> float:
+    analysis_builder = analysis_builder_class(accounts[0], df)
+    analysis_builder._analysis_config_reader = _AnalysisConfigReader(accounts)
+    start = time.perf_counter()
+    analysis_builder.with_analysis_is_hash_matched().with_analysis_can_the_file_exist().build()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=5)
+    args = parser.parse_args()
+    accounts = [f"account-{index}" for index in range(args.accounts)]
+    print(f"{'implementation':>15} {'rows':>12} {'accounts':>9} {'seconds':>10}")
+    for implementation, analysis_builder_class in (
+        ("current", _AnalysisBuilder),
+        ("previous", _PreviousAnalysisBuilder),
+    ):
+        df = _get_df(args.rows, accounts)
+        seconds = _get_seconds_to_set_analysis(analysis_builder_class, df, accounts)
+        print(f"{implementation:>15} {args.rows:>12} {args.accounts:>9} {seconds:>10.2f}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
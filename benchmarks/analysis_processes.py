@@ -0,0 +1,55 @@
+"""Compare the time to set the analysis columns with different numbers of processes.
+
+Usage: python -m benchmarks.analysis_processes --rows 10000000 --accounts 5 --processes 1 2 4 8
+"""
+
+import argparse
+import time
+
+from aws_s3_diff.s3_data.analysis import _AnalysisProcessPool
+from aws_s3_diff.s3_data.analysis import _get_df_set_analysis_columns
+from benchmarks.analysis import _get_df
+
+
+class _AnalysisConfigReader:
+    """It is sent to the processes, it must be defined at module level."""
+
+    def __init__(self, accounts: list[str]):
+        self._accounts = accounts
+
+    def get_account_origin(self) -> str:
+        return self._accounts[0]
+
+    def get_accounts_where_hash_must_match(self) -> list[str]:
+        return self._accounts[1:]
+
+    def get_accounts_that_must_not_have_more_files(self) -> list[str]:
+        return self._accounts[1:]
+
+    def get_accounts_where_content_must_match(self) -> list[str]:
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    accounts = [f"account-{index}" for index in range(args.accounts)]
+    analysis_config_reader = _AnalysisConfigReader(accounts)
+    print(f"{'processes':>10} {'rows':>12} {'accounts':>9} {'seconds':>10}")
+    for processes in args.processes:
+        df = _get_df(args.rows, accounts)
+        start = time.perf_counter()
+        if processes == 1:
+            _get_df_set_analysis_columns(analysis_config_reader, df)
+        else:
+            _AnalysisProcessPool(processes, analysis_config_reader).get_df_set_analysis_columns(df)
+        seconds = time.perf_counter() - start
+        print(f"{processes:>10} {args.rows:>12} {args.accounts:>9} {seconds:>10.2f}")
+        del df
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the seconds and the requests of the listing of many S3 URIs in the same folder, with a listing for each
+S3 URI and with the S3 URIs coalesced by the planner of `AWS_COALESCE_PREFIXES`.
+
+The S3 client is fake, each request waits the latency. The S3 URIs are listed one after the other, as with one
+listing worker.
+
+Usage: python -m benchmarks.coalesce_prefixes --prefixes 1000 --objects 5 --latency 0.01
+"""
+
+import argparse
+import bisect
+import datetime
+import os
+import time
+from unittest.mock import patch
+
+from aws_s3_diff.s3_data.s3_client import S3Client
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.s3_data.s3_client import S3SiblingPrefixesClient
+from aws_s3_diff.s3_data.s3_query_planner import S3QueriesPlanner
+from aws_s3_diff.type_custom import S3Query
+
+
+class _FakeS3Client:
+    """Returns the `list_objects_v2` responses of the sorted keys, only the arguments used by the program."""
+
+    def __init__(self, keys: list[str], latency_seconds: float):
+        self._keys = keys
+        self._latency_seconds = latency_seconds
+        self._date = datetime.datetime(2024, 10, 14, 8, 49, 1, tzinfo=datetime.timezone.utc)
+        self.requests = 0
+
+    def list_objects_v2(self, Prefix: str, MaxKeys: int, StartAfter: str = "", **_kwargs) -> dict:  # noqa: N803
+        time.sleep(self._latency_seconds)
+        self.requests += 1
+        start_index = bisect.bisect_right(self._keys, max(StartAfter, Prefix))
+        end_index = bisect.bisect_left(self._keys, f"{Prefix[:-1]}0")
+        keys = self._keys[start_index : min(start_index + MaxKeys, end_index)]
+        contents = [{"Key": key, "LastModified": self._date, "ETag": '"hash"', "Size": 3} for key in keys]
+        return {
+            "KeyCount": len(contents),
+            "Contents": contents,
+            "IsTruncated": start_index + MaxKeys < end_index,
+        }
+
+
+def _get_seconds_and_requests(
+    s3_client: _FakeS3Client, s3_queries: list[S3Query], objects: int, must_coalesce: bool
+) -> tuple:
+    """The number of files of the S3 URIs is known, as with a previous analysis."""
+    s3_client.requests = 0
+    with patch.object(S3ClientFactory, "get_client", return_value=s3_client):
+        start = time.perf_counter()
+        sibling_prefixes_clients = {}
+        if must_coalesce:
+            for group in S3QueriesPlanner(dict.fromkeys(s3_queries, objects)).get_groups(s3_queries):
+                sibling_prefixes_clients |= dict.fromkeys(group, S3SiblingPrefixesClient(group))
+        for s3_query in s3_queries:
+            sibling_prefixes_client = sibling_prefixes_clients.get(s3_query)
+            if sibling_prefixes_client is None:
+                client = S3Client(s3_query)
+            else:
+                client = sibling_prefixes_client.get_s3_client(s3_query)
+            for s3_data in client.get_s3_data():
+                s3_data.get_df()
+        return time.perf_counter() - start, s3_client.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefixes", type=int, default=1000)
+    parser.add_argument("--objects", type=int, default=5, help="objects per prefix")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds of each request")
+    args = parser.parse_args()
+    s3_queries = [S3Query("bucket", f"folder/prefix-{index:06d}") for index in range(args.prefixes)]
+    keys = [f"{s3_query.prefix}file-{index:06d}.csv" for s3_query in s3_queries for index in range(args.objects)]
+    s3_client = _FakeS3Client(keys, args.latency)
+    print(f"{'listing':>10} {'seconds':>10} {'requests':>10}")
+    with patch.dict(os.environ, {"AWS_PREFETCH_PAGES": "0", "AWS_RECURSIVE": "true"}):
+        for name, must_coalesce in (("separate", False), ("coalesced", True)):
+            seconds, requests = _get_seconds_and_requests(s3_client, s3_queries, args.objects, must_coalesce)
+            print(f"{name:>10} {seconds:>10.2f} {requests:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare the time and the memory to combine the accounts files with the in-memory join and the sorted merge.
+
+Each combination runs in a new process to measure its maximum resident memory.
+
+Usage: python -m benchmarks.combine --files 1000000 --accounts 3 --queries 10
+"""
+
+import argparse
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as Df
+
+from aws_s3_diff.local_result import LocalPath
+from aws_s3_diff.s3_data.all_accounts import AccountsDataGenerator
+from aws_s3_diff.s3_data.all_accounts import AccountsSortedMergeDataGenerator
+
+_ANALYSIS_DATE_TIME = "20241014084901"
+
+
+def _create_files(directory_path: Path, files: int, accounts: list[str], queries: int):
+    """Some files are missing in each account, the files of each account are sorted as the S3 responses."""
+    config_directory_path = directory_path.joinpath("config")
+    config_directory_path.mkdir()
+    s3_uris = Df(
+        {account: [f"s3://bucket-{account}/prefix-{index}" for index in range(queries)] for account in accounts}
+    )
+    s3_uris.to_csv(config_directory_path.joinpath("s3-uris-to-analyze.csv"), index=False)
+    all_results_directory_path = directory_path.joinpath("s3-results")
+    directory_analysis_path = all_results_directory_path.joinpath(_ANALYSIS_DATE_TIME)
+    directory_analysis_path.mkdir(parents=True)
+    all_results_directory_path.joinpath("analysis_date_time.txt").write_text(_ANALYSIS_DATE_TIME)
+    random_generator = np.random.default_rng(0)
+    file_positions = np.arange(files)
+    for account in accounts:
+        has_file = random_generator.random(files) < 0.9
+        account_file_positions = file_positions[has_file]
+        Df(
+            {
+                "bucket": f"bucket-{account}",
+                "prefix": [f"prefix-{index}/" for index in account_file_positions % queries],
+                "name": [f"file-{index:09d}.csv" for index in account_file_positions],
+                "date": pd.Timestamp("2024-10-14", tz="UTC"),
+                "size": account_file_positions,
+                "hash": [f"{index:032x}" for index in account_file_positions],
+            }
+        ).sort_values(["prefix", "name"]).to_csv(directory_analysis_path.joinpath(f"{account}.csv"), index=False)
+
+
+def _get_seconds_and_megabytes_to_combine(implementation: str, directory_path: Path) -> tuple[float, float]:
+    with (
+        patch.object(LocalPath, "config_directory", directory_path.joinpath("config")),
+        patch.object(LocalPath, "all_results_directory", directory_path.joinpath("s3-results")),
+    ):
+        start = time.perf_counter()
+        if implementation == "join":
+            AccountsDataGenerator().get_df()
+        else:
+            for _ in AccountsSortedMergeDataGenerator().get_dfs():
+                pass
+        seconds = time.perf_counter() - start
+    # Kilobytes in Linux.
+    megabytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    return seconds, megabytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=10)
+    args = parser.parse_args()
+    accounts = [f"account{index}" for index in range(args.accounts)]
+    print(f"{'implementation':>15} {'files':>12} {'accounts':>9} {'seconds':>10} {'max MB':>10}")
+    with tempfile.TemporaryDirectory() as directory_path_name:
+        directory_path = Path(directory_path_name)
+        _create_files(directory_path, args.files, accounts, args.queries)
+        for implementation in ("join", "sorted-merge"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                seconds, megabytes = executor.submit(
+                    _get_seconds_and_megabytes_to_combine, implementation, directory_path
+                ).result()
+            print(f"{implementation:>15} {args.files:>12} {args.accounts:>9} {seconds:>10.2f} {megabytes:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Measure the time of each stage of the program with synthetic buckets: the listing of each account, the combination
+of the accounts and the analysis.
+
+The buckets are served by a fake S3 client, or by the local S3 server with `--client moto`, that is slower to
+populate. Each account has its bucket with the same prefixes, and some files are missing or have other hash in the
+accounts that are not the first one. The environment variables of the program apply.
+
+The results are exported as JSON, to compare them between versions.
+
+Usage: python -m benchmarks.csvs_generator --accounts 3 --prefixes 10 --objects 10000 --output results.json
+"""
+
+import argparse
+import bisect
+import datetime
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+from aws_s3_diff.account import get_accounts_to_analyze
+from aws_s3_diff.aws_s3_diff import _AccountState
+from aws_s3_diff.aws_s3_diff import _AnalysisState
+from aws_s3_diff.aws_s3_diff import _CsvsGenerator
+from aws_s3_diff.local_result import AnalysisDateTimeExporter
+from aws_s3_diff.local_result import LocalPath
+from aws_s3_diff.local_result import LocalResult
+from aws_s3_diff.logger import get_logger
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+
+_DATE = datetime.datetime(2024, 10, 14, tzinfo=datetime.timezone.utc)
+
+
+class _SyntheticBuckets:
+    """Keys and contents of the S3 objects of each account."""
+
+    def __init__(self, accounts: list[str], prefixes: int, objects: int):
+        self._accounts = accounts
+        self._prefixes = prefixes
+        self._objects = objects
+
+    @staticmethod
+    def get_bucket(account: str) -> str:
+        return f"bucket-{account}"
+
+    def get_prefixes(self) -> list[str]:
+        return [f"prefix-{index}/" for index in range(self._prefixes)]
+
+    def get_contents_of_buckets(self) -> dict[str, list[dict]]:
+        """The contents of each bucket are sorted by key, as in the S3 responses."""
+        random_generator = np.random.default_rng(0)
+        file_numbers = np.arange(self._objects)
+        result = {}
+        for account_index, account in enumerate(self._accounts):
+            is_file_missing = random_generator.random(self._objects * self._prefixes) < 0.05 * (account_index > 0)
+            is_other_hash = random_generator.random(self._objects * self._prefixes) < 0.05 * (account_index > 0)
+            contents = []
+            for prefix_index, prefix in enumerate(self.get_prefixes()):
+                for file_number in file_numbers:
+                    row_number = prefix_index * self._objects + file_number
+                    if is_file_missing[row_number]:
+                        continue
+                    contents.append(
+                        {
+                            "Key": f"{prefix}file-{file_number:09d}.csv",
+                            "LastModified": _DATE,
+                            "Size": int(file_number),
+                            "ETag": f'"{row_number + is_other_hash[row_number]:032x}"',
+                        }
+                    )
+            result[self.get_bucket(account)] = contents
+        return result
+
+
+class _FakeS3Client:
+    """Returns the `list_objects_v2` responses without HTTP requests, only the arguments used by the program."""
+
+    def __init__(self, contents_of_buckets: dict[str, list[dict]]):
+        self._contents_of_buckets = contents_of_buckets
+        self._keys_of_buckets = {
+            bucket: [content["Key"] for content in contents] for bucket, contents in contents_of_buckets.items()
+        }
+
+    def list_objects_v2(self, Bucket: str, Prefix: str, MaxKeys: int, StartAfter: str = "", **_kwargs) -> dict:  # noqa: N803
+        keys = self._keys_of_buckets[Bucket]
+        start_index = bisect.bisect_right(keys, max(StartAfter, Prefix))
+        contents = []
+        for content in self._contents_of_buckets[Bucket][start_index : start_index + MaxKeys]:
+            if not content["Key"].startswith(Prefix):
+                break
+            contents.append(content)
+        result = {"KeyCount": len(contents)}
+        if len(contents) > 0:
+            result["Contents"] = contents
+        return result
+
+
+def _create_config_files(config_directory_path: Path, accounts: list[str], synthetic_buckets: _SyntheticBuckets):
+    config_directory_path.mkdir()
+    rows = [",".join(accounts)] + [
+        ",".join(f"s3://{synthetic_buckets.get_bucket(account)}/{prefix}" for account in accounts)
+        for prefix in synthetic_buckets.get_prefixes()
+    ]
+    config_directory_path.joinpath("s3-uris-to-analyze.csv").write_text("\n".join(rows) + "\n")
+    analysis_config = {
+        "run_analysis": True,
+        "origin": accounts[0],
+        "can_the_file_exist_in": accounts[1:],
+        "is_hash_the_same_in": accounts[1:],
+    }
+    config_directory_path.joinpath("analysis-config.json").write_text(json.dumps(analysis_config))
+
+
+def _enter_s3_client(exit_stack: ExitStack, client_name: str, contents_of_buckets: dict[str, list[dict]]):
+    if client_name == "fake":
+        exit_stack.enter_context(
+            patch.object(S3ClientFactory, "get_client", return_value=_FakeS3Client(contents_of_buckets))
+        )
+        return
+    import boto3
+
+    from tests.aws import S3Server
+
+    exit_stack.enter_context(S3Server())
+    s3_client = boto3.client("s3")
+    for bucket, contents in contents_of_buckets.items():
+        s3_client.create_bucket(Bucket=bucket)
+        for content in contents:
+            s3_client.put_object(Bucket=bucket, Key=content["Key"], Body=b"a" * content["Size"])
+
+
+def _get_seconds_of_stages() -> list[dict]:
+    """Runs the program as `Main`, one execution for each account."""
+    result = []
+    must_run_program = True
+    while must_run_program:
+        local_result = LocalResult()
+        if not local_result.exist_analysis_date_time_file():
+            AnalysisDateTimeExporter().export_analysis_date_time_str()
+        if not local_result.exist_directory_analysis():
+            local_result.create_directory_analysis()
+        csvs_generator = _CsvsGenerator()
+        while csvs_generator.must_run_next_state:
+            state = csvs_generator._state
+            stage = {"stage": csvs_generator.state_name}
+            if isinstance(state, _AccountState):
+                accounts = get_accounts_to_analyze()
+                stage["accounts"] = accounts if os.getenv("AWS_PROFILES") == "true" else accounts[:1]
+            start = time.perf_counter()
+            csvs_generator.export_csv(csvs_generator.get_df())
+            result.append(stage | {"seconds": time.perf_counter() - start})
+            must_run_program = not isinstance(state, _AnalysisState)
+    return result
+
+
+def _get_environment_variables_of_program() -> dict[str, str]:
+    """The credentials are omitted."""
+    return {
+        name: value
+        for name, value in sorted(os.environ.items())
+        if name.startswith("AWS_") and not any(word in name for word in ("KEY_ID", "SECRET", "TOKEN"))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--prefixes", type=int, default=10)
+    parser.add_argument("--objects", type=int, default=10_000, help="objects per prefix")
+    parser.add_argument("--client", choices=["fake", "moto"], default="fake")
+    parser.add_argument("--output", type=Path, help="JSON file to export the results. Default: standard output")
+    args = parser.parse_args()
+    get_logger().setLevel(logging.WARNING)
+    accounts = [f"account{index}" for index in range(args.accounts)]
+    synthetic_buckets = _SyntheticBuckets(accounts, args.prefixes, args.objects)
+    with tempfile.TemporaryDirectory() as directory_path_name, ExitStack() as exit_stack:
+        directory_path = Path(directory_path_name)
+        _create_config_files(directory_path.joinpath("config"), accounts, synthetic_buckets)
+        directory_path.joinpath("s3-results").mkdir()
+        exit_stack.enter_context(patch.object(LocalPath, "config_directory", directory_path.joinpath("config")))
+        exit_stack.enter_context(
+            patch.object(LocalPath, "all_results_directory", directory_path.joinpath("s3-results"))
+        )
+        _enter_s3_client(exit_stack, args.client, synthetic_buckets.get_contents_of_buckets())
+        seconds_of_stages = _get_seconds_of_stages()
+    result = {
+        "parameters": {
+            "accounts": args.accounts,
+            "prefixes": args.prefixes,
+            "objects_per_prefix": args.objects,
+            "client": args.client,
+        },
+        "environment_variables": _get_environment_variables_of_program(),
+        "python": platform.python_version(),
+        "stages": seconds_of_stages,
+        "total_seconds": sum(stage["seconds"] for stage in seconds_of_stages),
+    }
+    result_str = json.dumps(result, indent=2)
+    if args.output is None:
+        print(result_str)
+    else:
+        args.output.write_text(result_str + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compare the CPU time to convert a `list_objects_v2` XML response to the files of a page with the botocore parser
+and with the fast parser of the `AWS_FAST_XML_PARSER` environment variable.
+
+The responses have URL encoded keys, as botocore requests them by default.
+
+Usage: python -m benchmarks.list_objects_v2_parser --keys 1000 --pages 100
+"""
+
+import argparse
+import time
+from urllib.parse import quote
+
+import botocore.session
+from botocore.handlers import decode_list_object_v2
+from botocore.parsers import create_parser
+
+from aws_s3_diff.s3_data.list_objects_v2 import get_response_from_xml
+from aws_s3_diff.s3_data.list_objects_v2 import ListObjectsV2Contents
+from aws_s3_diff.s3_data.s3_client import _ResponseAnalyzer
+from aws_s3_diff.type_custom import S3Data
+from aws_s3_diff.type_custom import S3Query
+
+_S3_QUERY = S3Query("bucket", "prefix")
+
+
+def _get_body(keys: int) -> bytes:
+    contents = "".join(
+        f"<Contents><Key>{quote(f'{_S3_QUERY.prefix}file {index:09d}.csv')}</Key>"
+        "<LastModified>2024-10-14T08:49:01.000Z</LastModified>"
+        f"<ETag>&quot;{index:032x}&quot;</ETag><Size>{index}</Size><StorageClass>STANDARD</StorageClass></Contents>"
+        for index in range(keys)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+        f"<Name>{_S3_QUERY.bucket}</Name><Prefix>{_S3_QUERY.prefix}</Prefix><MaxKeys>{keys}</MaxKeys>"
+        f"<KeyCount>{keys}</KeyCount><Delimiter>/</Delimiter><EncodingType>url</EncodingType>"
+        f"<IsTruncated>true</IsTruncated><NextContinuationToken>token</NextContinuationToken>{contents}"
+        "</ListBucketResult>"
+    ).encode()
+
+
+class _BotocoreParser:
+    def __init__(self):
+        self._output_shape = (
+            botocore.session.get_session().get_service_model("s3").operation_model("ListObjectsV2").output_shape
+        )
+        self._parser = create_parser("rest-xml")
+
+    def get_response(self, body: bytes) -> dict:
+        result = self._parser.parse({"body": body, "headers": {}, "status_code": 200}, self._output_shape)
+        decode_list_object_v2(result, context={"encoding_type_auto_set": True})
+        return result
+
+
+def _get_s3_data(response: dict) -> S3Data:
+    return _ResponseAnalyzer(_S3_QUERY).get_s3_data_from_contents(ListObjectsV2Contents.from_response(response))
+
+
+def _get_milliseconds_per_page(get_response, body: bytes, pages: int) -> float:
+    start = time.process_time()
+    for _ in range(pages):
+        _get_s3_data(get_response(body))
+    return (time.process_time() - start) / pages * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=1000, help="keys per page")
+    parser.add_argument("--pages", type=int, default=100)
+    args = parser.parse_args()
+    body = _get_body(args.keys)
+    assert _get_s3_data(_BotocoreParser().get_response(body)) == _get_s3_data(get_response_from_xml(body))
+    print(f"{'parser':>10} {'keys':>8} {'CPU ms/page':>12}")
+    for parser_name, get_response in (("botocore", _BotocoreParser().get_response), ("fast", get_response_from_xml)):
+        milliseconds = _get_milliseconds_per_page(get_response, body, args.pages)
+        print(f"{parser_name:>10} {args.keys:>8} {milliseconds:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Compare the memory, the garbage collections and the time to convert the S3 responses to the Dfs of an account with
+the previous representation of the pages, a `FileS3Data` and a dict for each file, and with the column arrays of
+`S3Data`.
+
+The responses are generated as boto3 returns them, before the measures. The page memory is the memory allocated by
+Python for the pages of all the responses, the peak memory includes the Dfs of the pages and their concatenation.
+The time is measured in other execution, without tracing the memory.
+
+Usage: python -m benchmarks.listing_memory --objects 100000 1000000
+"""
+
+import argparse
+import datetime
+import gc
+import time
+import tracemalloc
+
+import pandas as pd
+from pandas import DataFrame as Df
+
+from aws_s3_diff.s3_data.list_objects_v2 import ListObjectsV2Contents
+from aws_s3_diff.s3_data.s3_client import _ResponseAnalyzer
+from aws_s3_diff.type_custom import FileS3Data
+from aws_s3_diff.type_custom import S3Data
+from aws_s3_diff.type_custom import S3Query
+
+_OBJECTS_PER_PAGE = 1000
+_S3_QUERY = S3Query("bucket", "prefix")
+
+
+class _GarbageCollections:
+    def __init__(self):
+        self.collections = 0
+        self.seconds = 0.0
+        self._start = 0.0
+
+    def callback(self, phase: str, _info: dict):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.collections += 1
+            self.seconds += time.perf_counter() - self._start
+
+
+def _get_responses(number_of_objects: int) -> list[dict]:
+    date = datetime.datetime(2024, 10, 14, 8, 49, 1, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            "Contents": [
+                {
+                    "Key": f"{_S3_QUERY.prefix}file-{index:09d}.csv",
+                    "LastModified": date,
+                    "ETag": f'"{index:032x}"',
+                    "Size": index,
+                    "StorageClass": "STANDARD",
+                }
+                for index in range(page_start, min(page_start + _OBJECTS_PER_PAGE, number_of_objects))
+            ]
+        }
+        for page_start in range(0, number_of_objects, _OBJECTS_PER_PAGE)
+    ]
+
+
+def _get_page_of_rows(response: dict) -> list[FileS3Data]:
+    """Previous implementation."""
+    return [
+        FileS3Data(
+            content["Key"][len(_S3_QUERY.prefix) :],
+            content["LastModified"],
+            content["Size"],
+            content["ETag"].strip('"'),
+        )
+        for content in response["Contents"]
+    ]
+
+
+def _get_df_of_page_of_rows(page: list[FileS3Data]) -> Df:
+    return Df(file_s3_data._asdict() for file_s3_data in page)
+
+
+def _get_page_of_columns(response: dict) -> S3Data:
+    return _ResponseAnalyzer(_S3_QUERY).get_s3_data_from_contents(ListObjectsV2Contents.from_response(response))
+
+
+def _get_df_of_page_of_columns(page: S3Data) -> Df:
+    return page.get_df()
+
+
+_FUNCTIONS_OF_IMPLEMENTATIONS = {
+    "rows": (_get_page_of_rows, _get_df_of_page_of_rows),
+    "columns": (_get_page_of_columns, _get_df_of_page_of_columns),
+}
+
+
+def _get_df(implementation: str, responses: list[dict]) -> Df:
+    get_page, get_df_of_page = _FUNCTIONS_OF_IMPLEMENTATIONS[implementation]
+    return pd.concat([get_df_of_page(get_page(response)) for response in responses], ignore_index=True)
+
+
+def _get_result(implementation: str, responses: list[dict]) -> dict:
+    number_of_objects = sum(len(response["Contents"]) for response in responses)
+    get_page, _ = _FUNCTIONS_OF_IMPLEMENTATIONS[implementation]
+    garbage_collections = _GarbageCollections()
+    gc.collect()
+    gc.callbacks.append(garbage_collections.callback)
+    tracemalloc.start()
+    pages = [get_page(response) for response in responses]
+    page_bytes, _ = tracemalloc.get_traced_memory()
+    del pages
+    tracemalloc.reset_peak()
+    _get_df(implementation, responses)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.callbacks.remove(garbage_collections.callback)
+    start = time.perf_counter()
+    _get_df(implementation, responses)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "page_bytes_per_object": page_bytes / number_of_objects,
+        "peak_bytes_per_object": peak_bytes / number_of_objects,
+        "garbage_collections": garbage_collections.collections,
+        "garbage_collections_seconds": garbage_collections.seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", nargs="+", type=int, default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    print(
+        f"{'implementation':>15} {'objects':>10} {'seconds':>8} {'page B/object':>14} {'peak B/object':>14}"
+        f" {'GCs':>6} {'GC seconds':>11}"
+    )
+    for number_of_objects in args.objects:
+        responses = _get_responses(number_of_objects)
+        for implementation in _FUNCTIONS_OF_IMPLEMENTATIONS:
+            result = _get_result(implementation, responses)
+            print(
+                f"{implementation:>15} {number_of_objects:>10} {result['seconds']:>8.2f}"
+                f" {result['page_bytes_per_object']:>14.0f} {result['peak_bytes_per_object']:>14.0f}"
+                f" {result['garbage_collections']:>6} {result['garbage_collections_seconds']:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
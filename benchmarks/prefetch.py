@@ -0,0 +1,81 @@
+"""Compare the pages per second of the listing of one S3 URI with a different number of pages requested in advance.
+
+The S3 client is fake, each request waits the latency, and the pages are converted to Dfs as the program does. The
+maximum is the request rate, the pages per second of the requests without processing the responses.
+
+Usage: python -m benchmarks.prefetch --pages 100 --latency 0.01 --depths 0 1 2 4
+"""
+
+import argparse
+import datetime
+import os
+import time
+from unittest.mock import patch
+
+from aws_s3_diff.s3_data.s3_client import S3Client
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.type_custom import S3Query
+
+_OBJECTS_PER_PAGE = 1000
+_S3_QUERY = S3Query("bucket", "prefix")
+
+
+class _FakeS3Client:
+    """Returns pages with the continuation token as the number of the next page."""
+
+    def __init__(self, pages: int, latency_seconds: float):
+        self._pages = pages
+        self._latency_seconds = latency_seconds
+        self._date = datetime.datetime(2024, 10, 14, 8, 49, 1, tzinfo=datetime.timezone.utc)
+
+    def list_objects_v2(self, ContinuationToken: str = "0", **_kwargs) -> dict:  # noqa: N803
+        time.sleep(self._latency_seconds)
+        page = int(ContinuationToken)
+        contents = [
+            {
+                "Key": f"{_S3_QUERY.prefix}file-{index:09d}.csv",
+                "LastModified": self._date,
+                "ETag": f'"{index:032x}"',
+                "Size": index,
+            }
+            for index in range(page * _OBJECTS_PER_PAGE, (page + 1) * _OBJECTS_PER_PAGE)
+        ]
+        result = {"KeyCount": len(contents), "Contents": contents, "IsTruncated": page + 1 < self._pages}
+        if result["IsTruncated"]:
+            result["NextContinuationToken"] = str(page + 1)
+        return result
+
+
+def _get_pages_per_second_of_requests(s3_client: _FakeS3Client, pages: int) -> float:
+    start = time.perf_counter()
+    for page in range(pages):
+        s3_client.list_objects_v2(ContinuationToken=str(page))
+    return pages / (time.perf_counter() - start)
+
+
+def _get_pages_per_second(s3_client: _FakeS3Client, pages: int, depth: int) -> float:
+    with (
+        patch.object(S3ClientFactory, "get_client", return_value=s3_client),
+        patch.dict(os.environ, {"AWS_PREFETCH_PAGES": str(depth), "AWS_RECURSIVE": "true"}),
+    ):
+        start = time.perf_counter()
+        for s3_data in S3Client(_S3_QUERY).get_s3_data():
+            s3_data.get_df()
+        return pages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds of each request")
+    parser.add_argument("--depths", nargs="+", type=int, default=[0, 1, 2, 4])
+    args = parser.parse_args()
+    s3_client = _FakeS3Client(args.pages, args.latency)
+    print(f"{'depth':>10} {'pages/s':>10}")
+    print(f"{'requests':>10} {_get_pages_per_second_of_requests(s3_client, args.pages):>10.1f}")
+    for depth in args.depths:
+        print(f"{depth:>10} {_get_pages_per_second(s3_client, args.pages, depth):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare the S3 clients and connections created to list an account, reusing or not the boto3 client.
+
+A local S3 server is started with one file in each prefix.
+
+Usage: python -m benchmarks.s3_clients --prefixes 200
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import boto3
+from moto.server import ThreadedMotoServer
+
+from aws_s3_diff.s3_data.one_account import AccountDataGenerator
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.type_custom import S3Query
+from tests.aws import set_aws_credentials
+
+_BUCKET = "benchmark"
+_PORT = 5001
+
+
+class _S3ClientFactoryWithoutReuse(S3ClientFactory):
+    """Previous behavior of the program, a new client for each S3 query."""
+
+    def __init__(self):
+        super().__init__()
+        self._s3_client_factories = []
+
+    def get_client(self):
+        s3_client_factory = S3ClientFactory()
+        self._s3_client_factories.append(s3_client_factory)
+        return s3_client_factory.get_client()
+
+    def get_number_of_clients(self) -> int:
+        return sum(s3_client_factory.get_number_of_clients() for s3_client_factory in self._s3_client_factories)
+
+    def get_number_of_connections(self) -> int:
+        return sum(s3_client_factory.get_number_of_connections() for s3_client_factory in self._s3_client_factories)
+
+
+class _BenchmarkAccountDataGenerator(AccountDataGenerator):
+    def __init__(self, s3_queries: list[S3Query], s3_client_factory: S3ClientFactory):
+        super().__init__("benchmark")
+        self._s3_client_factory = s3_client_factory
+        self._s3_queries_cache = s3_queries
+
+
+def _create_s3_objects(prefixes: int) -> list[S3Query]:
+    s3_client = boto3.client("s3", endpoint_url=os.environ["AWS_ENDPOINT"])
+    s3_client.create_bucket(Bucket=_BUCKET)
+    result = []
+    for index in range(prefixes):
+        s3_query = S3Query(_BUCKET, f"prefix-{index}")
+        s3_client.put_object(Bucket=_BUCKET, Key=f"{s3_query.prefix}file.csv", Body=b"foo")
+        result.append(s3_query)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefixes", type=int, default=200)
+    args = parser.parse_args()
+    set_aws_credentials()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    os.environ["AWS_ENDPOINT"] = f"http://localhost:{_PORT}"
+    server = ThreadedMotoServer(port=_PORT, verbose=False)
+    server.start()
+    try:
+        s3_queries = _create_s3_objects(args.prefixes)
+        print(f"{'clients reused':>15} {'clients':>8} {'connections':>12} {'seconds':>8}")
+        for s3_client_factory in (_S3ClientFactoryWithoutReuse(), S3ClientFactory()):
+            start = time.perf_counter()
+            _BenchmarkAccountDataGenerator(s3_queries, s3_client_factory).get_df()
+            seconds = time.perf_counter() - start
+            print(
+                f"{str(not isinstance(s3_client_factory, _S3ClientFactoryWithoutReuse)):>15}"
+                f" {s3_client_factory.get_number_of_clients():>8}"
+                f" {s3_client_factory.get_number_of_connections():>12}"
+                f" {seconds:>8.2f}"
+            )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
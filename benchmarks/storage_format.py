@@ -0,0 +1,61 @@
+"""Compare the time to write and read the file with the data of all the accounts for each storage format.
+
+Usage: python -m benchmarks.storage_format --rows 1000000 --accounts 3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame as Df
+
+from aws_s3_diff.storage import get_storage
+
+
+def _get_df_all_accounts(rows: int, accounts: list[str]) -> Df:
+    result = Df(
+        {
+            f"bucket_in_{accounts[0]}": "bucket",
+            f"prefix_in_{accounts[0]}": "prefix/",
+            "file_name_in_all_accounts": [f"file-{index:09d}.csv" for index in range(rows)],
+        }
+    )
+    random_generator = np.random.default_rng(0)
+    for account in accounts:
+        result[f"date_in_{account}"] = pd.to_datetime(random_generator.integers(1.6e9, 1.7e9, rows), unit="s", utc=True)
+        result[f"size_in_{account}"] = pd.array(random_generator.integers(0, 1e9, rows), dtype="Int64")
+        result[f"hash_in_{account}"] = [f"{value:032x}" for value in random_generator.integers(0, 2**62, rows)]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=3)
+    args = parser.parse_args()
+    accounts = [f"account_{index}" for index in range(args.accounts)]
+    df = _get_df_all_accounts(args.rows, accounts)
+    print(f"{'format':>8} {'write seconds':>14} {'read seconds':>13} {'MB':>8}")
+    with tempfile.TemporaryDirectory() as directory_path_name:
+        for storage_format in ("csv", "feather", "parquet"):
+            os.environ["AWS_STORAGE_FORMAT"] = storage_format
+            storage = get_storage()
+            file_path = Path(directory_path_name).joinpath(f"s3-files-all-accounts.{storage.extension}")
+            start = time.perf_counter()
+            storage.write_df(df, file_path)
+            write_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            storage.read_df(file_path, date_column_names=[f"date_in_{account}" for account in accounts]).astype(
+                {f"size_in_{account}": "Int64" for account in accounts}
+            )
+            read_seconds = time.perf_counter() - start
+            megabytes = file_path.stat().st_size / 1e6
+            print(f"{storage_format:>8} {write_seconds:>14.2f} {read_seconds:>13.2f} {megabytes:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+import importlib.util
+import io
+import itertools
+import json
 import os
 import shutil
 import tempfile
@@ -5,6 +9,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
+import boto3
 from botocore.exceptions import ClientError
 from botocore.exceptions import NoCredentialsError
 from pandas import DataFrame as Df
@@ -17,8 +22,11 @@ from aws_s3_diff.aws_s3_diff import FolderInS3UriError
 from aws_s3_diff.aws_s3_diff import Main
 from aws_s3_diff.aws_s3_diff import S3UrisFileReader
 from aws_s3_diff.exception import MESSAGE_INCORRECT_CREDENTIALS
+from aws_s3_diff.exception import MESSAGE_S3_THROTTLING
+from aws_s3_diff.local_result import get_account_file_name
 from aws_s3_diff.local_result import LocalPath
 from aws_s3_diff.local_result import LocalResult
+from aws_s3_diff.storage import get_storage
 from tests.aws import S3Server
 
 
@@ -26,9 +34,7 @@ class TestMainWithLocalS3Server(unittest.TestCase):
     def setUp(self):
         os.environ["AWS_MAX_KEYS"] = "2"  # To check that multiple request loops work ok.
         self._original_current_path = LocalPath._current_path
-        tmp_directory_path_name = self.enterContext(tempfile.TemporaryDirectory())
-        LocalPath._current_path = Path(tmp_directory_path_name).joinpath("aws_s3_diff")
-        self._copy_files_to_temporal_folder(tmp_directory_path_name)
+        self._set_up_temporal_folder()
 
     def tearDown(self):
         os.environ.pop("AWS_MAX_KEYS")
@@ -42,6 +48,92 @@ class TestMainWithLocalS3Server(unittest.TestCase):
         folder_name_expected_results = "if-queries-with-results"
         self._asssert_created_csv_files_have_expected_values(folder_name_expected_results)
 
+    def test_run_all_acounts_exports_metrics_of_each_run(self):
+        with S3Server() as local_s3_server:
+            for account in S3UrisFileReader().get_accounts():
+                local_s3_server.create_objects(account)
+                Main().run()
+        directory_analysis_path = LocalPath().all_results_directory.joinpath(self._get_analysis_date_time_str())
+        runs = json.loads(directory_analysis_path.joinpath("metrics.json").read_text())["runs"]
+        self.assertEqual(
+            [["account"], ["account"], ["account", "combine", "analysis"]],
+            [[state["state"] for state in run["states"]] for run in runs],
+        )
+        expected_result_df = read_csv("tests/expected-results/if-queries-with-results/pro.csv")
+        pro_queries = runs[0]["queries"]
+        self.assertEqual(["pro"] * 4, [query["account"] for query in pro_queries])
+        self.assertEqual(expected_result_df["name"].count(), sum(query["keys"] for query in pro_queries))
+        self.assertEqual(expected_result_df["size"].sum(), sum(query["bytes"] for query in pro_queries))
+        # Two keys per request.
+        self.assertGreaterEqual(runs[0]["list_objects_v2_calls"], sum(query["pages"] for query in pro_queries))
+        self.assertEqual(0, runs[0]["throttles"])
+        self.assertGreater(runs[0]["max_memory_megabytes"], 0)
+
+    @patch.dict(os.environ, {"AWS_STREAM_EXPORT": "true"})
+    def test_run_all_acounts_generates_expected_results_if_stream_export(self):
+        with S3Server() as local_s3_server:
+            for account in S3UrisFileReader().get_accounts():
+                local_s3_server.create_objects(account)
+                Main().run()
+        self._asssert_created_csv_files_have_expected_values("if-queries-with-results")
+
+    @unittest.skipIf(importlib.util.find_spec("pyarrow") is None, "pyarrow is not installed")
+    def test_run_all_acounts_generates_expected_results_if_arrow_storage_formats(self):
+        for storage_format, must_stream_export in itertools.product(["feather", "parquet"], ["false", "true"]):
+            with (
+                self.subTest(storage_format=storage_format, must_stream_export=must_stream_export),
+                patch.dict(os.environ, {"AWS_STORAGE_FORMAT": storage_format, "AWS_STREAM_EXPORT": must_stream_export}),
+                S3Server() as local_s3_server,
+            ):
+                self._set_up_temporal_folder()
+                for account in S3UrisFileReader().get_accounts():
+                    local_s3_server.create_objects(account)
+                    Main().run()
+                self._asssert_created_csv_files_have_expected_values("if-queries-with-results")
+
+    @patch.dict(os.environ, {"AWS_PROJECT_COLUMNS": "true"})
+    def test_run_all_acounts_generates_expected_results_without_dates_if_projected_columns(self):
+        with S3Server() as local_s3_server:
+            for account in S3UrisFileReader().get_accounts():
+                local_s3_server.create_objects(account)
+                Main().run()
+        directory_analysis_path = LocalPath().all_results_directory.joinpath(self._get_analysis_date_time_str())
+        for account in ["pro", "release", "dev"]:
+            result_df = self._get_df_from_result_file(directory_analysis_path.joinpath(get_account_file_name(account)))
+            expected_result_df = read_csv(f"tests/expected-results/if-queries-with-results/{account}.csv")
+            assert_frame_equal(expected_result_df.drop(columns=["date"]), result_df)
+        local_result = LocalResult()
+        local_result._directory_analysis_path_cache = directory_analysis_path
+        result = self._get_df_from_csv(local_result.get_file_path_analysis())
+        expected_result = self._get_df_from_csv_expected_result("if-queries-with-results")
+        assert_frame_equal(expected_result.drop(columns=["date_in_pro", "date_in_release", "date_in_dev"]), result)
+
+    @patch.dict(os.environ, {"AWS_PROFILES": "true"})
+    def test_run_analyzes_all_accounts_in_one_run_with_their_profiles(self):
+        session_class = boto3.Session
+        with S3Server() as local_s3_server:
+            # The buckets of the local S3 server are shared by all the profiles, the release account has the pro files.
+            local_s3_server.create_objects("pro")
+            local_s3_server.create_objects("dev")
+            # The profiles are not configured in the test environment.
+            with patch("aws_s3_diff.s3_data.s3_client.boto3.Session") as mock_session:
+                mock_session.side_effect = lambda profile_name: session_class()
+                Main().run()
+        self.assertEqual(
+            ["dev", "pro", "release"], sorted(call.kwargs["profile_name"] for call in mock_session.call_args_list)
+        )
+        directory_analysis_path = LocalPath().all_results_directory.joinpath(self._get_analysis_date_time_str())
+        for account, account_expected_result in [("pro", "pro"), ("release", "pro"), ("dev", "dev")]:
+            file_path_results = directory_analysis_path.joinpath(get_account_file_name(account))
+            result_df = self._get_df_from_result_file(file_path_results)
+            expected_result_df = read_csv(
+                f"tests/expected-results/if-queries-with-results/{account_expected_result}.csv"
+            )
+            expected_result_df["date"] = result_df["date"]
+            assert_frame_equal(expected_result_df, result_df)
+        self.assertTrue(directory_analysis_path.joinpath("analysis.csv").is_file())
+        self.assertFalse(LocalPath().analysis_date_time_file.is_file())
+
     def _asssert_created_csv_files_have_expected_values(self, folder_name_expected_results: str):
         directory_analysis_path = LocalPath().all_results_directory.joinpath(self._get_analysis_date_time_str())
         self._assert_extracted_accounts_data_have_expected_values(directory_analysis_path, folder_name_expected_results)
@@ -49,6 +141,11 @@ class TestMainWithLocalS3Server(unittest.TestCase):
         local_result._directory_analysis_path_cache = directory_analysis_path
         self._assert_analysis_file_has_expected_values(folder_name_expected_results, local_result)
 
+    def _set_up_temporal_folder(self):
+        tmp_directory_path_name = self.enterContext(tempfile.TemporaryDirectory())
+        LocalPath._current_path = Path(tmp_directory_path_name).joinpath("aws_s3_diff")
+        self._copy_files_to_temporal_folder(tmp_directory_path_name)
+
     def _copy_files_to_temporal_folder(self, tmp_directory_path_name: str):
         for folder_name in ["aws_s3_diff", "config", "s3-results"]:
             Path(tmp_directory_path_name).joinpath(folder_name).mkdir()
@@ -72,17 +169,18 @@ class TestMainWithLocalS3Server(unittest.TestCase):
         return analysis_directory_names[-1]
 
     def _assert_extracted_accounts_data_have_expected_values(self, directory_analysis_path: Path, folder_name: str):
-        for file_name_expected_result in [
-            "pro.csv",
-            "release.csv",
-            "dev.csv",
-        ]:
-            file_path_results = directory_analysis_path.joinpath(file_name_expected_result)
-            result_df = read_csv(file_path_results)
-            expected_result_df = read_csv(f"tests/expected-results/{folder_name}/{file_name_expected_result}")
+        for account in ["pro", "release", "dev"]:
+            file_path_results = directory_analysis_path.joinpath(get_account_file_name(account))
+            result_df = self._get_df_from_result_file(file_path_results)
+            expected_result_df = read_csv(f"tests/expected-results/{folder_name}/{account}.csv")
             expected_result_df["date"] = result_df["date"]
             assert_frame_equal(expected_result_df, result_df)
 
+    def _get_df_from_result_file(self, file_path: Path) -> Df:
+        # Convert to CSV to compare with the expected results despite the storage format.
+        csv = get_storage().read_df(file_path, date_column_names=[]).to_csv(index=False)
+        return read_csv(io.StringIO(csv))
+
     def _assert_analysis_file_has_expected_values(self, folder_name: str, local_result: LocalResult):
         result = self._get_df_from_csv(local_result.get_file_path_analysis())
         expected_result = self._get_df_from_csv_expected_result(folder_name)
@@ -105,13 +203,17 @@ class TestMainWithLocalS3Server(unittest.TestCase):
 
 
 class TestMainWithoutLocalS3Server(unittest.TestCase):
+    @patch("aws_s3_diff.aws_s3_diff.MetricsExporter")
     @patch("aws_s3_diff.aws_s3_diff._CsvsGenerator")
-    def test_run_manages_analysis_config_error_and_generates_expected_error_messages(self, mock_s3_diff_process):
+    def test_run_manages_analysis_config_error_and_generates_expected_error_messages(
+        self, mock_s3_diff_process, mock_metrics_exporter
+    ):
         mock_s3_diff_process.return_value.get_df.side_effect = AnalysisConfigError("foo")
         with self.assertLogs(level="ERROR") as cm:
             Main().run()
         self.assertEqual("foo", cm.records[0].message)
 
+    @patch("aws_s3_diff.aws_s3_diff.MetricsExporter")
     @patch("aws_s3_diff.aws_s3_diff.LocalResult")
     @patch("aws_s3_diff.aws_s3_diff.have_all_accounts_been_analyzed", return_value=False)
     @patch("aws_s3_diff.aws_s3_diff.get_account_to_analyze", return_value="foo")
@@ -122,12 +224,13 @@ class TestMainWithoutLocalS3Server(unittest.TestCase):
         mock_get_account_to_analyze,
         mock_have_all_accounts_been_analyzed,
         mock_local_result,
+        mock_metrics_exporter,
     ):
         mock_local_result.return_value.analysis_paths.directory_analysis.is_dir.return_value = True
         mock_local_result.return_value.get_file_path_all_accounts.return_value.is_file.return_value = False
         mock_local_result.return_value.directory_analysis.is_dir.return_value = True
         message_error_subfolder = (
-            "Subfolders detected in bucket 'bucket-1'. The current version of the program cannot manage subfolders"
+            "Subfolders detected in bucket 'bucket-1'. Set AWS_RECURSIVE=true to analyze subfolders"
             ". Subfolders (1): folder/subfolder/"
         )
         for expected_error_message, aws_error in (
@@ -139,6 +242,10 @@ class TestMainWithoutLocalS3Server(unittest.TestCase):
                 MESSAGE_INCORRECT_CREDENTIALS,
                 _ListObjectsV2ClientErrorBuilder().with_error_code("AccessDenied").build(),
             ),
+            (
+                MESSAGE_S3_THROTTLING,
+                _ListObjectsV2ClientErrorBuilder().with_error_code("SlowDown").build(),
+            ),
             (
                 "The bucket 'invented_bucket' does not exist. Specify a correct bucket and run the program again",
                 _ListObjectsV2ClientErrorBuilder()
@@ -148,7 +255,7 @@ class TestMainWithoutLocalS3Server(unittest.TestCase):
             ),
             (
                 message_error_subfolder,
-                FolderInS3UriError(message_error_subfolder),
+                FolderInS3UriError("bucket-1", ["folder/subfolder/"]),
             ),
             (
                 MESSAGE_INCORRECT_CREDENTIALS,
@@ -1,9 +1,13 @@
+import json
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import Mock
 from unittest.mock import patch
 from unittest.mock import PropertyMock
 
+import numpy as np
+
 from aws_s3_diff import config_file as m_config_file
 from aws_s3_diff.exception import AnalysisConfigError
 from aws_s3_diff.exception import DuplicatedUriS3UrisFileError
@@ -91,6 +95,42 @@ class TestS3UrisFileReader(unittest.TestCase):
                 self.assertEqual(expected_result, result)
 
 
+class TestListingFiltersFileReader(unittest.TestCase):
+    def setUp(self):
+        self._config_directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(
+            patch(
+                "aws_s3_diff.config_file.LocalPath.config_directory",
+                new_callable=PropertyMock,
+                return_value=self._config_directory_path,
+            )
+        )
+
+    def test_get_listing_filter_returns_none_without_file(self):
+        self.assertIsNone(m_config_file.ListingFiltersFileReader().get_listing_filter(S3Query("bucket-1", "folder")))
+
+    def test_get_listing_filter_replaces_the_filters_of_all_s3_uris_with_the_filters_of_the_s3_uri(self):
+        self._config_directory_path.joinpath("listing-filters.json").write_text(
+            json.dumps(
+                {
+                    "all": {"include": ["*.csv"], "min_size": 2},
+                    "s3://bucket-1/folder": {"include": ["*.parquet"]},
+                }
+            )
+        )
+        names = np.array(["file.csv", "file.parquet", "big.csv"], dtype=object)
+        dates = np.zeros(3, dtype="datetime64[ns]")
+        sizes = np.array([1, 3, 3], dtype=np.int64)
+        reader = m_config_file.ListingFiltersFileReader()
+        for s3_query, expected_result in (
+            (S3Query("bucket-1", "folder/"), [False, True, False]),
+            (S3Query("bucket-1", "other-folder/"), [False, False, True]),
+        ):
+            with self.subTest(s3_query=s3_query):
+                result = reader.get_listing_filter(s3_query).get_mask(names, dates, sizes)
+                self.assertEqual(expected_result, result.tolist())
+
+
 class TestS3UrisFileChecker(unittest.TestCase):
     @patch("aws_s3_diff.config_file.LocalPath.config_directory", new_callable=PropertyMock, return_value=Mock())
     def test_assert_file_is_correct_raises_expected_exception_for_all_cases(self, mock_config_directory):
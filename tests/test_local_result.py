@@ -1,7 +1,10 @@
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from aws_s3_diff.local_result import LocalPath
+from aws_s3_diff.local_result import LocalResult
 
 
 class TestLocalPath(unittest.TestCase):
@@ -20,3 +23,25 @@ class TestLocalPath(unittest.TestCase):
             self._current_path.parent.joinpath("s3-results/analysis_date_time.txt"),
             LocalPath().analysis_date_time_file,
         )
+
+
+class TestLocalResult(unittest.TestCase):
+    def test_get_file_path_account_previous_analysis_returns_most_recent_previous_file_of_the_account(self):
+        with tempfile.TemporaryDirectory() as directory_name:
+            all_results_directory_path = Path(directory_name)
+            for analysis_directory_name, account in (
+                ("20240101000000", "pro"),
+                ("20240102000000", "pro"),
+                ("20240103000000", "dev"),
+                ("20240104000000", "pro"),
+            ):
+                all_results_directory_path.joinpath(analysis_directory_name).mkdir()
+                all_results_directory_path.joinpath(analysis_directory_name, f"{account}.csv").touch()
+            all_results_directory_path.joinpath("analysis_date_time.txt").write_text("20240104000000")
+            with mock.patch.object(LocalPath, "all_results_directory", all_results_directory_path):
+                local_result = LocalResult()
+                self.assertEqual(
+                    all_results_directory_path.joinpath("20240102000000", "pro.csv"),
+                    local_result.get_file_path_account_previous_analysis("pro"),
+                )
+                self.assertIsNone(local_result.get_file_path_account_previous_analysis("release"))
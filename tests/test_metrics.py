@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from aws_s3_diff.metrics import get_metrics
+from aws_s3_diff.metrics import MetricsExporter
+from aws_s3_diff.type_custom import S3Query
+
+_runs_of_hook = []
+
+
+def hook(run: dict):
+    _runs_of_hook.append(run)
+
+
+def hook_with_error(_run: dict):
+    raise ValueError("foo")
+
+
+class TestMetricsExporter(unittest.TestCase):
+    def setUp(self):
+        get_metrics().reset()
+        self._file_path = Path(self.enterContext(tempfile.TemporaryDirectory())).joinpath("metrics.json")
+
+    def tearDown(self):
+        get_metrics().reset()
+
+    def test_export_adds_the_run_to_the_file(self):
+        get_metrics().add_state("account", 1.5)
+        get_metrics().add_query("pro", S3Query("bucket-1", "folder"), 1.0, pages=2, keys=3, bytes_=4)
+        get_metrics().add_list_objects_v2_call(retries=1)
+        get_metrics().add_list_objects_v2_call(retries=0)
+        get_metrics().add_throttle()
+        MetricsExporter().export(self._file_path)
+        get_metrics().reset()
+        MetricsExporter().export(self._file_path)
+        runs = json.loads(self._file_path.read_text())["runs"]
+        self.assertEqual(2, len(runs))
+        self.assertEqual([{"state": "account", "seconds": 1.5}], runs[0]["states"])
+        self.assertEqual(
+            [{"account": "pro", "s3_uri": "s3://bucket-1/folder/", "seconds": 1.0, "pages": 2, "keys": 3, "bytes": 4}],
+            runs[0]["queries"],
+        )
+        self.assertEqual((2, 1, 1), (runs[0]["list_objects_v2_calls"], runs[0]["retries"], runs[0]["throttles"]))
+        self.assertEqual(([], [], 0), (runs[1]["states"], runs[1]["queries"], runs[1]["list_objects_v2_calls"]))
+
+    @patch.dict(os.environ, {"AWS_METRICS_HOOK": "tests.test_metrics:hook"})
+    def test_export_calls_the_hook(self):
+        get_metrics().add_state("account", 1.5)
+        MetricsExporter().export(self._file_path)
+        self.assertEqual(json.loads(self._file_path.read_text())["runs"], _runs_of_hook)
+
+    @patch.dict(os.environ, {"AWS_METRICS_HOOK": "tests.test_metrics:hook_with_error"})
+    def test_export_logs_the_hook_errors(self):
+        with self.assertLogs(level="ERROR") as cm:
+            MetricsExporter().export(self._file_path)
+        self.assertEqual(
+            "Error in the metrics hook tests.test_metrics:hook_with_error: ValueError('foo')", cm.records[0].message
+        )
+        self.assertTrue(self._file_path.is_file())
+
+    def test_export_logs_the_error_if_the_hook_name_is_malformed(self):
+        for hook_name in ("tests.test_metrics", "tests.test_metrics:hook:foo"):
+            with (
+                self.subTest(hook_name=hook_name),
+                patch.dict(os.environ, {"AWS_METRICS_HOOK": hook_name}),
+                self.assertLogs(level="ERROR") as cm,
+            ):
+                MetricsExporter().export(self._file_path)
+            self.assertTrue(cm.records[0].message.startswith(f"Error in the metrics hook {hook_name}: ValueError("))
+        self.assertTrue(self._file_path.is_file())
+
+    def test_export_adds_the_run_without_max_memory_if_resource_is_not_available(self):
+        # The `resource` module does not exist in Windows.
+        with patch.dict(sys.modules, {"resource": None}):
+            MetricsExporter().export(self._file_path)
+        self.assertIsNone(json.loads(self._file_path.read_text())["runs"][0]["max_memory_megabytes"])
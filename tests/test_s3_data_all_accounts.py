@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from pandas import DataFrame as Df
+from pandas import read_csv
+from pandas.testing import assert_frame_equal
+
+from aws_s3_diff.exception import UnsortedAccountDataError
+from aws_s3_diff.local_result import LocalPath
+from aws_s3_diff.s3_data.all_accounts import AccountsDataGenerator
+from aws_s3_diff.s3_data.all_accounts import AccountsPartitionedDataGenerator
+from aws_s3_diff.s3_data.all_accounts import AccountsSortedMergeDataGenerator
+
+_ANALYSIS_DATE_TIME = "20241014084901"
+
+
+class _AccountsFilesTestCase(unittest.TestCase):
+    def setUp(self):
+        directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        config_directory_path = directory_path.joinpath("config")
+        config_directory_path.mkdir()
+        current_path = Path(__file__).parent.absolute()
+        shutil.copyfile(
+            current_path.joinpath("fake-files/test-full-analysis/s3-uris-to-analyze.csv"),
+            config_directory_path.joinpath("s3-uris-to-analyze.csv"),
+        )
+        all_results_directory_path = directory_path.joinpath("s3-results")
+        self._directory_analysis_path = all_results_directory_path.joinpath(_ANALYSIS_DATE_TIME)
+        self._directory_analysis_path.mkdir(parents=True)
+        all_results_directory_path.joinpath("analysis_date_time.txt").write_text(_ANALYSIS_DATE_TIME)
+        for account in ["pro", "release", "dev"]:
+            shutil.copyfile(
+                current_path.joinpath(f"expected-results/if-queries-with-results/{account}.csv"),
+                self._directory_analysis_path.joinpath(f"{account}.csv"),
+            )
+        self.enterContext(patch.object(LocalPath, "config_directory", config_directory_path))
+        self.enterContext(patch.object(LocalPath, "all_results_directory", all_results_directory_path))
+
+
+class TestAccountsPartitionedDataGenerator(_AccountsFilesTestCase):
+    def test_get_df_returns_same_result_as_accounts_data_generator(self):
+        expected_result = AccountsDataGenerator().get_df()
+        for partitions in (1, 2, 3, 7):
+            with self.subTest(partitions=partitions):
+                assert_frame_equal(expected_result, AccountsPartitionedDataGenerator(partitions).get_df())
+
+    def test_get_df_returns_same_result_as_accounts_data_generator_if_files_are_not_sorted(self):
+        for account in ["pro", "release", "dev"]:
+            file_path = self._directory_analysis_path.joinpath(f"{account}.csv")
+            read_csv(file_path).iloc[::-1].to_csv(file_path, index=False)
+        expected_result = AccountsDataGenerator().get_df()
+        for partitions in (1, 2, 3, 7):
+            with self.subTest(partitions=partitions):
+                assert_frame_equal(expected_result, AccountsPartitionedDataGenerator(partitions).get_df())
+
+    def test_get_dfs_removes_the_partition_files(self):
+        list(AccountsPartitionedDataGenerator(3).get_dfs())
+        self.assertEqual(
+            ["dev.csv", "pro.csv", "release.csv"], sorted(path.name for path in self._directory_analysis_path.iterdir())
+        )
+
+
+class TestAccountsSortedMergeDataGenerator(_AccountsFilesTestCase):
+    def test_get_df_returns_same_rows_as_accounts_data_generator(self):
+        expected_result = _get_df_sorted_by_query_and_file_name(AccountsDataGenerator().get_df())
+        for must_verify_sort in (False, True):
+            with self.subTest(must_verify_sort=must_verify_sort):
+                result = AccountsSortedMergeDataGenerator(must_verify_sort).get_df()
+                assert_frame_equal(expected_result, result)
+
+    def test_get_df_raises_exception_if_verify_sort_and_files_are_not_sorted(self):
+        file_path = self._directory_analysis_path.joinpath("release.csv")
+        read_csv(file_path).iloc[::-1].to_csv(file_path, index=False)
+        with self.assertRaises(UnsortedAccountDataError) as exception:
+            AccountsSortedMergeDataGenerator(must_verify_sort=True).get_df()
+        self.assertIn("AWS account release", str(exception.exception))
+
+
+def _get_df_sorted_by_query_and_file_name(df: Df) -> Df:
+    """The files of each query are sorted by name, the queries keep their order."""
+    query_positions = df.groupby(df.columns[:2].to_list(), sort=False).ngroup()
+    return (
+        df.assign(query_position=query_positions)
+        .sort_values(["query_position", "file_name_in_all_accounts"], kind="stable", na_position="first")
+        .drop(columns="query_position")
+        .reset_index(drop=True)
+    )
@@ -1,18 +1,27 @@
+import os
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import Mock
+from unittest.mock import patch
 
+import boto3
 import numpy as np
 from pandas import DataFrame as Df
+from pandas import MultiIndex
 from pandas import read_csv
 from pandas import to_datetime
 from pandas.testing import assert_frame_equal
 
+from aws_s3_diff.local_result import LocalPath
 from aws_s3_diff.s3_data.all_accounts import AccountsCsvReader
 from aws_s3_diff.s3_data.analysis import _AccountsToCompare
+from aws_s3_diff.s3_data.analysis import _AnalysisProcessPool
 from aws_s3_diff.s3_data.analysis import _CanFileExistTwoAccountsAnalysisSetter
+from aws_s3_diff.s3_data.analysis import _IsContentMatchedTwoAccountsAnalysisSetter
 from aws_s3_diff.s3_data.analysis import _IsHashMatchedTwoAccountsAnalysisSetter
 from aws_s3_diff.s3_data.analysis import AnalysisDataGenerator
+from tests.aws import S3Server
 
 
 class TestDfAnalysis(unittest.TestCase):
@@ -62,6 +71,103 @@ class TestDfAnalysis(unittest.TestCase):
                     self.assertEqual(expected_result, result_to_check)
 
 
+class TestIsContentMatchedTwoAccountsAnalysisSetter(unittest.TestCase):
+    """The files with the same size and different hash are downloaded from the local S3 server."""
+
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_client = boto3.client("s3")
+        config_directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        config_directory_path.joinpath("s3-uris-to-analyze.csv").write_text(
+            "pro,release\ns3://bucket-1/folder,s3://bucket-2/other-folder\n"
+        )
+        self.enterContext(patch.object(LocalPath, "config_directory", config_directory_path))
+
+    def test_get_df_set_analysis_column(self):
+        content = b"a" * 5 * 1024 * 1024 + b"b"
+        self._s3_client.create_bucket(Bucket="bucket-1")
+        self._s3_client.create_bucket(Bucket="bucket-2")
+        for key, body in (
+            ("folder/multipart.csv", content),
+            ("folder/multipart-other-content.csv", content),
+            ("folder/same-hash.csv", b"foo"),
+            ("folder/other-size.csv", b"foo"),
+            ("folder/not-in-target.csv", b"foo"),
+        ):
+            self._s3_client.put_object(Bucket="bucket-1", Key=key, Body=body)
+        self._upload_multipart("other-folder/multipart.csv", content)
+        self._upload_multipart("other-folder/multipart-other-content.csv", content[:-1] + b"c")
+        self._s3_client.put_object(Bucket="bucket-2", Key="other-folder/same-hash.csv", Body=b"foo")
+        self._s3_client.put_object(Bucket="bucket-2", Key="other-folder/other-size.csv", Body=b"foo-2")
+        df = self._get_df_from_s3_objects()
+        result = _IsContentMatchedTwoAccountsAnalysisSetter(
+            _AccountsToCompare("pro", "release"), df
+        ).get_df_set_analysis_column()
+        self.assertEqual(
+            {
+                "multipart-other-content.csv": False,
+                "multipart.csv": True,
+                "not-in-target.csv": None,
+                "other-size.csv": None,
+                "same-hash.csv": None,
+            },
+            result.loc[:, ("analysis", "is_content_the_same_in_release")].droplevel([0, 1]).to_dict(),
+        )
+
+    def test_analysis_data_generator_get_df_sets_the_content_column_if_configured(self):
+        self._s3_client.create_bucket(Bucket="bucket-1")
+        self._s3_client.create_bucket(Bucket="bucket-2")
+        self._s3_client.put_object(Bucket="bucket-1", Key="folder/multipart.csv", Body=b"a" * 5 * 1024 * 1024)
+        self._upload_multipart("other-folder/multipart.csv", b"a" * 5 * 1024 * 1024)
+        LocalPath.config_directory.joinpath("analysis-config.json").write_text(
+            '{"run_analysis": true, "origin": "pro", "can_the_file_exist_in": [], "is_hash_the_same_in": ["release"],'
+            ' "is_content_the_same_in": ["release"]}'
+        )
+        analysis_data_generator = AnalysisDataGenerator()
+        analysis_data_generator._accounts_csv_reader = Mock()
+        analysis_data_generator._accounts_csv_reader.get_df.return_value = self._get_df_from_s3_objects()
+        result = analysis_data_generator.get_df()
+        self.assertEqual(
+            [{"is_hash_the_same_in_release": False, "is_content_the_same_in_release": True}],
+            result[["is_hash_the_same_in_release", "is_content_the_same_in_release"]].to_dict("records"),
+        )
+
+    def _get_df_from_s3_objects(self) -> Df:
+        dfs = []
+        for account, bucket, prefix in (("pro", "bucket-1", "folder/"), ("release", "bucket-2", "other-folder/")):
+            contents = self._s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)["Contents"]
+            df = Df(
+                {
+                    (account, "size"): [content["Size"] for content in contents],
+                    (account, "hash"): [content["ETag"].strip('"') for content in contents],
+                },
+                index=MultiIndex.from_tuples(
+                    [("bucket-1", "folder/", content["Key"][len(prefix) :]) for content in contents]
+                ),
+            )
+            dfs.append(df)
+        result = dfs[0].join(dfs[1], how="outer")
+        result.columns = MultiIndex.from_tuples(result.columns)
+        return result.astype({("pro", "size"): "Int64", ("release", "size"): "Int64"})
+
+    def _upload_multipart(self, key: str, content: bytes):
+        part_bytes = 5 * 1024 * 1024
+        upload_id = self._s3_client.create_multipart_upload(Bucket="bucket-2", Key=key)["UploadId"]
+        parts = []
+        for part_number, start in enumerate(range(0, len(content), part_bytes), 1):
+            response = self._s3_client.upload_part(
+                Bucket="bucket-2",
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=content[start : start + part_bytes],
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._s3_client.complete_multipart_upload(
+            Bucket="bucket-2", Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+
+
 class TestAnalysisDataGenerator(unittest.TestCase):
     def test_get_df_returns_expected_result(self):
         mock_local_result = Mock()
@@ -75,6 +181,34 @@ class TestAnalysisDataGenerator(unittest.TestCase):
         result = result.replace({np.nan: None})
         assert_frame_equal(expected_result, result)
 
+    def test_get_df_returns_expected_result_if_several_processes(self):
+        mock_local_result = Mock()
+        mock_local_result.get_file_path_all_accounts.return_value = (
+            Path(__file__).parent.absolute().joinpath("fake-files/test-full-analysis/s3-files-all-accounts.csv")
+        )
+        expected_result = self._get_df_expected_result_from_csv()
+        for processes in (2, 3, 20):
+            with self.subTest(processes=processes), patch.dict(os.environ, {"AWS_ANALYSIS_PROCESSES": str(processes)}):
+                analysis_data_generator = AnalysisDataGenerator()
+                analysis_data_generator._accounts_csv_reader._local_result = mock_local_result
+                result = analysis_data_generator.get_df().replace({np.nan: None})
+                assert_frame_equal(expected_result, result)
+
+    def test_analysis_process_pool_splits_the_content_hash_workers_between_the_processes(self):
+        for content_hash_workers, processes, expected_result in (("10", 2, 5), ("10", 3, 3), ("2", 4, 1)):
+            with (
+                self.subTest(content_hash_workers=content_hash_workers, processes=processes),
+                patch.dict(os.environ, {"AWS_CONTENT_HASH_WORKERS": content_hash_workers}),
+                patch("aws_s3_diff.s3_data.analysis.ProcessPoolExecutor") as mock_process_pool_executor,
+            ):
+                mock_process_pool_executor.return_value.__enter__.return_value.map.return_value = [Df()]
+                mock_analysis_config_reader = Mock()
+                mock_analysis_config_reader.get_accounts_where_hash_must_match.return_value = []
+                mock_analysis_config_reader.get_accounts_that_must_not_have_more_files.return_value = []
+                mock_analysis_config_reader.get_accounts_where_content_must_match.return_value = []
+                _AnalysisProcessPool(processes, mock_analysis_config_reader).get_df_set_analysis_columns(Df())
+                self.assertEqual((expected_result,), mock_process_pool_executor.call_args.kwargs["initargs"])
+
     def _get_df_expected_result_from_csv(self) -> Df:
         expected_result_file_path = (
             Path(__file__).parent.absolute().joinpath("expected-results/if-queries-with-results/analysis.csv")
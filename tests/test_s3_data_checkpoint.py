@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pandas import DataFrame as Df
+from pandas.testing import assert_frame_equal
+
+from aws_s3_diff.s3_data.checkpoint import ListingCheckpoint
+from aws_s3_diff.s3_data.checkpoint import remove_listing_checkpoint
+from aws_s3_diff.type_custom import S3Query
+
+
+class TestListingCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self._directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        mock_local_result = self.enterContext(mock.patch("aws_s3_diff.s3_data.checkpoint.LocalResult"))
+        mock_local_result().get_file_path_account.return_value = self._directory_path.joinpath("pro.csv")
+        self._s3_queries = [S3Query("bucket-1", "prefix-1"), S3Query("bucket-1", "prefix-2")]
+        self._dfs = [Df({"name": [f"file-{index}.csv"], "size": [index]}) for index in range(3)]
+
+    def test_new_checkpoint_returns_the_saved_pages(self):
+        checkpoint = ListingCheckpoint("pro")
+        checkpoint.add_page(self._s3_queries[0], self._dfs[0], "file-0.csv")
+        checkpoint.add_page(self._s3_queries[0], self._dfs[1], "file-1.csv")
+        checkpoint.set_query_completed(self._s3_queries[0])
+        checkpoint.add_page(self._s3_queries[1], self._dfs[2], "file-2.csv")
+        result = ListingCheckpoint("pro")
+        self.assertTrue(result.is_query_completed(self._s3_queries[0]))
+        self.assertFalse(result.is_query_completed(self._s3_queries[1]))
+        self.assertEqual("file-2.csv", result.get_last_file_name(self._s3_queries[1]))
+        self.assertIsNone(result.get_last_file_name(S3Query("bucket-1", "prefix-3")))
+        for expected_df, df in zip(
+            self._dfs,
+            result.get_dfs_of_query(self._s3_queries[0]) + result.get_dfs_of_query(self._s3_queries[1]),
+            strict=True,
+        ):
+            assert_frame_equal(expected_df, df)
+
+    def test_new_checkpoint_discards_the_page_not_saved_in_the_journal(self):
+        checkpoint = ListingCheckpoint("pro")
+        checkpoint.add_page(self._s3_queries[0], self._dfs[0], "file-0.csv")
+        with mock.patch.object(ListingCheckpoint, "_append_to_journal"):
+            checkpoint.add_page(self._s3_queries[0], self._dfs[1], "file-1.csv")
+        journal_file_path = self._directory_path.joinpath("pro.csv.journal")
+        with open(journal_file_path, "a") as file:
+            file.write('{"s3_uri": "s3://bucket-1/prefix-1/", "last_')
+        result = ListingCheckpoint("pro")
+        self.assertEqual("file-0.csv", result.get_last_file_name(self._s3_queries[0]))
+        self.assertEqual(1, len(result.get_dfs_of_query(self._s3_queries[0])))
+        assert_frame_equal(self._dfs[0], result.get_dfs_of_query(self._s3_queries[0])[0])
+        # The next pages are appended after the valid data.
+        result.add_page(self._s3_queries[0], self._dfs[2], "file-2.csv")
+        self.assertEqual(2, len(ListingCheckpoint("pro").get_dfs_of_query(self._s3_queries[0])))
+
+    def test_remove_listing_checkpoint_removes_the_files(self):
+        ListingCheckpoint("pro").add_page(self._s3_queries[0], self._dfs[0], "file-0.csv")
+        self.assertEqual(2, len(list(self._directory_path.iterdir())))
+        remove_listing_checkpoint("pro")
+        self.assertEqual([], list(self._directory_path.iterdir()))
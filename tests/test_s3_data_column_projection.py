@@ -0,0 +1,26 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from aws_s3_diff.s3_data.column_projection import get_file_column_names
+
+
+class TestGetFileColumnNames(unittest.TestCase):
+    @patch("aws_s3_diff.s3_data.column_projection.AnalysisConfigReader")
+    def test_get_file_column_names_returns_the_columns_of_the_analysis_if_projected_columns(
+        self, mock_analysis_config_reader
+    ):
+        for must_run_analysis, hash_accounts, content_accounts, expected_result in (
+            (True, [], [], ["size"]),
+            (True, ["dev"], [], ["size", "hash"]),
+            (True, [], ["dev"], ["size", "hash"]),
+            (False, [], [], ["date", "size", "hash"]),
+        ):
+            mock_analysis_config_reader().must_run_analysis.return_value = must_run_analysis
+            mock_analysis_config_reader().get_accounts_where_hash_must_match.return_value = hash_accounts
+            mock_analysis_config_reader().get_accounts_where_content_must_match.return_value = content_accounts
+            with self.subTest(must_run_analysis=must_run_analysis, hash_accounts=hash_accounts):
+                with patch.dict(os.environ, {"AWS_PROJECT_COLUMNS": "true"}):
+                    self.assertEqual(expected_result, get_file_column_names())
+                with patch.dict(os.environ, {"AWS_PROJECT_COLUMNS": "false"}):
+                    self.assertEqual(["date", "size", "hash"], get_file_column_names())
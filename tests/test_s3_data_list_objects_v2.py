@@ -0,0 +1,83 @@
+import unittest
+
+import boto3
+import numpy as np
+from botocore.exceptions import ClientError
+
+from aws_s3_diff.s3_data.list_objects_v2 import add_fast_parser
+from aws_s3_diff.s3_data.list_objects_v2 import get_last_key
+from aws_s3_diff.s3_data.list_objects_v2 import get_response_from_xml
+from aws_s3_diff.s3_data.list_objects_v2 import ListObjectsV2Contents
+from tests.aws import S3Server
+
+
+class TestFastParserWithLocalS3Server(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_client = boto3.client("s3")
+        self._s3_client_fast_parser = boto3.client("s3")
+        add_fast_parser(self._s3_client_fast_parser)
+        self._s3_client.create_bucket(Bucket="bucket-1")
+        for key, body in [
+            ("folder/", b""),
+            ("folder/a&b c+d%e.csv", b"foo"),
+            ("folder/<ñ>'\"=.csv", b"foo"),
+            ("folder/empty.csv", b""),
+            ("folder/subfolder/file.csv", b"foobar"),
+            ("folder/subfolder+1/file.csv", b"foo"),
+            ("other/file.csv", b"foo"),
+        ]:
+            self._s3_client.put_object(Bucket="bucket-1", Key=key, Body=body)
+
+    def test_response_is_equal_to_botocore_response(self):
+        for max_keys in (1, 2, 1000):
+            for delimiter in ("/", None):
+                with self.subTest(max_keys=max_keys, delimiter=delimiter):
+                    request_arguments = {"Bucket": "bucket-1", "Prefix": "folder/", "MaxKeys": max_keys}
+                    if delimiter is not None:
+                        request_arguments["Delimiter"] = delimiter
+                    self._assert_pages_are_equal(request_arguments)
+
+    def test_error_response_is_parsed_by_botocore(self):
+        with self.assertRaises(ClientError) as exception:
+            self._s3_client_fast_parser.list_objects_v2(Bucket="bucket-2")
+        self.assertEqual("NoSuchBucket", exception.exception.response["Error"]["Code"])
+
+    def _assert_pages_are_equal(self, request_arguments: dict):
+        start_after = None
+        while True:
+            arguments = request_arguments if start_after is None else request_arguments | {"StartAfter": start_after}
+            expected_result = self._s3_client.list_objects_v2(**arguments)
+            result = self._s3_client_fast_parser.list_objects_v2(**arguments)
+            self.assertNotIn("Contents", result)
+            for key in ("KeyCount", "IsTruncated", "CommonPrefixes"):
+                self.assertEqual(expected_result.get(key), result.get(key), key)
+            self.assertEqual("NextContinuationToken" in expected_result, "NextContinuationToken" in result)
+            for expected_array, array in zip(
+                ListObjectsV2Contents.from_response(expected_result),
+                ListObjectsV2Contents.from_response(result),
+                strict=True,
+            ):
+                np.testing.assert_array_equal(expected_array, array)
+            self.assertEqual(get_last_key(expected_result), get_last_key(result))
+            if not result["IsTruncated"]:
+                return
+            start_after = get_last_key(result) or result["CommonPrefixes"][-1]["Prefix"]
+
+
+class TestGetResponseFromXml(unittest.TestCase):
+    def test_keys_are_not_decoded_without_url_encoding(self):
+        body = (
+            b'<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/"><KeyCount>1</KeyCount>'
+            b"<IsTruncated>false</IsTruncated><Contents><Key>folder/a+b%20c&amp;d.csv</Key>"
+            b"<LastModified>2024-10-14T08:49:01.123Z</LastModified><ETag>&quot;foo-2&quot;</ETag><Size>3</Size>"
+            b"</Contents></ListBucketResult>"
+        )
+        result = get_response_from_xml(body)
+        contents = result["ContentsColumns"]
+        self.assertEqual(["folder/a+b%20c&d.csv"], contents.keys.tolist())
+        np.testing.assert_array_equal(np.array(["2024-10-14T08:49:01.123"], dtype="datetime64[ns]"), contents.dates)
+        self.assertEqual([3], contents.sizes.tolist())
+        self.assertEqual([b"foo-2"], contents.hashes.tolist())
+        self.assertFalse(result["IsTruncated"])
+        self.assertNotIn("NextContinuationToken", result)
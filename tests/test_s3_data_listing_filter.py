@@ -0,0 +1,51 @@
+import datetime
+import unittest
+
+import numpy as np
+
+from aws_s3_diff.exception import ListingFiltersFileError
+from aws_s3_diff.s3_data.listing_filter import ListingFilter
+
+
+class TestListingFilter(unittest.TestCase):
+    def setUp(self):
+        self._names = np.array(["a.parquet", "b.csv", "folder/c.parquet", "tmp.parquet"], dtype=object)
+        self._dates = np.array(
+            ["2024-10-01T00:00:00", "2024-10-10T00:00:00", "2024-10-20T00:00:00", "2024-10-30T00:00:00"],
+            dtype="datetime64[ns]",
+        )
+        self._sizes = np.array([0, 10, 20, 30], dtype=np.int64)
+
+    def test_get_mask_returns_the_files_that_match_all_the_filters(self):
+        for filters, expected_result in (
+            ({}, [True, True, True, True]),
+            ({"include": ["*.parquet"]}, [True, False, True, True]),
+            ({"include": ["*.parquet", "b.*"], "exclude": ["tmp*"]}, [True, True, True, False]),
+            ({"include": ["*.PARQUET"]}, [False, False, False, False]),
+            ({"min_size": 10, "max_size": 20}, [False, True, True, False]),
+            ({"modified_since": "2024-10-10", "modified_before": "2024-10-30"}, [False, True, True, False]),
+            ({"modified_since": "2024-10-10T02:00:00+02:00"}, [False, True, True, True]),
+        ):
+            with self.subTest(filters=filters):
+                result = ListingFilter(filters).get_mask(self._names, self._dates, self._sizes)
+                self.assertEqual(expected_result, result.tolist())
+
+    def test_get_mask_returns_the_files_modified_in_the_last_days(self):
+        now = np.datetime64(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None), "ns")
+        dates = np.array([now - np.timedelta64(3, "D"), now - np.timedelta64(1, "D")])
+        result = ListingFilter({"modified_in_last_days": 2}).get_mask(self._names[:2], dates, self._sizes[:2])
+        self.assertEqual([False, True], result.tolist())
+
+    def test_get_start_after_and_end_key_returns_the_keys_around_the_literal_prefix_of_the_include_patterns(self):
+        for filters, expected_result in (
+            ({}, (None, None)),
+            ({"include": ["*.csv"]}, (None, None)),
+            ({"include": ["2024-10-*.csv", "2024-11-*.csv"]}, ("folder/2024-", "folder/2024-2")),
+            ({"include": ["b"]}, ("folder/", "folder/c")),
+        ):
+            with self.subTest(filters=filters):
+                self.assertEqual(expected_result, ListingFilter(filters).get_start_after_and_end_key("folder/"))
+
+    def test_init_raises_exception_if_unknown_filter(self):
+        with self.assertRaises(ListingFiltersFileError):
+            ListingFilter({"include": ["*.csv"], "min_sise": 1})
@@ -1,13 +1,25 @@
+import io
+import os
+import tempfile
+import time
 import unittest
+from pathlib import Path
 from unittest import mock
 
+import boto3
 import numpy as np
 from pandas import DataFrame as Df
 from pandas.testing import assert_frame_equal
 
+from aws_s3_diff.metrics import get_metrics
+from aws_s3_diff.s3_data.df_utility import write_dfs_to_csv_buffer
 from aws_s3_diff.s3_data.one_account import AccountDataGenerator
 from aws_s3_diff.s3_data.one_account import OriginS3UrisAsIndexAccountDfModifier
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.type_custom import FileS3Data
+from aws_s3_diff.type_custom import S3Data
 from aws_s3_diff.type_custom import S3Query
+from tests.aws import S3Server
 
 ExpectedResult = list[dict]
 
@@ -35,10 +47,237 @@ class TestAccountDataGenerator(unittest.TestCase):
             ],
             columns=["bucket", "prefix", "name", "date", "size", "hash"],
             index=[0, 0],
-        )
+        ).astype({"date": "datetime64[ns, UTC]", "size": "Int64"})
         result = AccountDataGenerator("foo").get_df()
         assert_frame_equal(expected_result, result)
 
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_df_returns_same_result_with_one_and_several_workers(self, mock_s3_uris_file_reader, mock_s3_client):
+        s3_queries = [S3Query(f"bucket_{index}", f"prefix_{index}") for index in range(5)]
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = s3_queries
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        with mock.patch.dict(os.environ, {"AWS_LISTING_WORKERS": "1"}):
+            expected_result = AccountDataGenerator("foo").get_df()
+        with mock.patch.dict(os.environ, {"AWS_LISTING_WORKERS": "3"}):
+            result = AccountDataGenerator("foo").get_df()
+        assert_frame_equal(expected_result, result)
+        self.assertEqual([f"bucket_{index}" for index in range(5)], result["bucket"].unique().tolist())
+
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_dfs_lists_one_s3_uri_for_each_worker_ahead(self, mock_s3_uris_file_reader, mock_s3_client):
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = [
+            S3Query(f"bucket_{index}", f"prefix_{index}") for index in range(10)
+        ]
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        with mock.patch.dict(os.environ, {"AWS_LISTING_WORKERS": "3"}):
+            dfs = AccountDataGenerator("foo").get_dfs()
+            next(dfs)
+            # Time for the workers to list other S3 URIs if they were submitted.
+            time.sleep(0.1)
+            self.assertLessEqual(mock_s3_client.call_count, 3)
+            # 2 pages for each S3 URI, the S3 URI of `bucket_2` has 1 Df without files.
+            self.assertEqual(2 * 10 - 1 - 1, len(list(dfs)))
+        self.assertEqual(10, mock_s3_client.call_count)
+
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_df_logs_unknown_connections_if_they_cannot_be_read(self, mock_s3_uris_file_reader, mock_s3_client):
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = [S3Query("bucket_1", "prefix_1")]
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        with (
+            mock.patch.object(S3ClientFactory, "get_number_of_connections", side_effect=AttributeError),
+            self.assertLogs(level="DEBUG") as cm,
+        ):
+            result = AccountDataGenerator("foo").get_df()
+        self.assertEqual(6, len(result))
+        self.assertIn("S3 clients created: 0. Connections opened: unknown", cm.output[-1])
+
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_dfs_exported_to_csv_is_equal_to_get_df_exported_to_csv(self, mock_s3_uris_file_reader, mock_s3_client):
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = [
+            S3Query(f"bucket_{index}", f"prefix_{index}") for index in range(5)
+        ]
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        expected_result = AccountDataGenerator("foo").get_df().to_csv(index=False)
+        buffer = io.StringIO()
+        write_dfs_to_csv_buffer(AccountDataGenerator("foo").get_dfs(), buffer)
+        self.assertEqual(expected_result, buffer.getvalue())
+
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisToRelistFileReader")
+    @mock.patch("aws_s3_diff.s3_data.one_account.LocalResult")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_df_reuses_previous_results_of_s3_uris_not_to_relist_if_incremental_analysis(
+        self, mock_s3_uris_file_reader, mock_s3_client, mock_local_result, mock_s3_uris_to_relist_file_reader
+    ):
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = [
+            S3Query("cars", "europe/spain"),
+            S3Query("pets", "dogs/big_size"),
+            S3Query("pets", "horses/europe"),
+        ]
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        mock_local_result().get_file_path_account_previous_analysis.return_value = Path(__file__).parent.joinpath(
+            "expected-results", "if-queries-with-results", "pro.csv"
+        )
+        mock_s3_uris_to_relist_file_reader().get_s3_queries.return_value = {S3Query("pets", "dogs/big_size")}
+        with mock.patch.dict(os.environ, {"AWS_INCREMENTAL": "true"}):
+            result = AccountDataGenerator("foo").get_df()
+        mock_s3_client.assert_called_once()
+        self.assertEqual(S3Query("pets", "dogs/big_size"), mock_s3_client.call_args.args[0])
+        self.assertEqual(
+            ["cars-20241014.csv"]
+            + [f"pets-{page_index}-{file_index}.csv" for page_index in range(2) for file_index in range(3)],
+            result["name"].tolist()[:7],
+        )
+        self.assertEqual(["pets", "horses/europe/"], result.iloc[-1][["bucket", "prefix"]].tolist())
+        self.assertTrue(result.iloc[-1][["name", "date", "size", "hash"]].isna().all())
+
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisToRelistFileReader")
+    @mock.patch("aws_s3_diff.s3_data.one_account.LocalResult")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_df_does_not_reuse_previous_results_without_the_columns_of_the_run(
+        self, mock_s3_uris_file_reader, mock_s3_client, mock_local_result, mock_s3_uris_to_relist_file_reader
+    ):
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = [S3Query("cars", "europe/spain")]
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        mock_s3_uris_to_relist_file_reader().get_s3_queries.return_value = set()
+        # The previous run used AWS_PROJECT_COLUMNS without hash analysis.
+        previous_file_path = Path(self.enterContext(tempfile.TemporaryDirectory())).joinpath("pro.csv")
+        previous_file_path.write_text("bucket,prefix,name,size\ncars,europe/spain/,cars-20241014.csv,49\n")
+        mock_local_result().get_file_path_account_previous_analysis.return_value = previous_file_path
+        with mock.patch.dict(os.environ, {"AWS_INCREMENTAL": "true"}):
+            result = AccountDataGenerator("foo").get_df()
+        mock_s3_client.assert_called_once()
+        self.assertFalse(result[["date", "hash"]].isna().any().any())
+        # A previous file with more columns is reused by a run with projected columns.
+        mock_s3_client.reset_mock()
+        previous_file_path.write_text(
+            "bucket,prefix,name,date,size,hash\ncars,europe/spain/,cars-20241014.csv,2024-10-14 08:49:01+00:00,49,foo\n"
+        )
+        with (
+            mock.patch.dict(os.environ, {"AWS_INCREMENTAL": "true"}),
+            mock.patch("aws_s3_diff.s3_data.one_account.get_file_column_names", return_value=["size", "hash"]),
+        ):
+            result = AccountDataGenerator("foo").get_df()
+        mock_s3_client.assert_not_called()
+        self.assertEqual(["bucket", "prefix", "name", "size", "hash"], result.columns.tolist())
+        self.assertEqual(["cars-20241014.csv", 49, "foo"], result.iloc[0][["name", "size", "hash"]].tolist())
+
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3Client")
+    @mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+    def test_get_df_does_not_reuse_previous_results_if_not_incremental_analysis(
+        self, mock_s3_uris_file_reader, mock_s3_client
+    ):
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = [S3Query("cars", "europe/spain")]
+        mock_s3_client.side_effect = _get_mock_s3_client_for_query
+        with mock.patch.dict(os.environ, {"AWS_INCREMENTAL": "false"}):
+            AccountDataGenerator("foo").get_df()
+        mock_s3_client.assert_called_once()
+
+
+class TestAccountDataGeneratorWithCheckpointLocalS3Server(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_queries = [S3Query("bucket-1", "prefix-1"), S3Query("bucket-1", "prefix-2")]
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket="bucket-1")
+        for s3_query in self._s3_queries:
+            for file_index in range(5):
+                s3_client.put_object(Bucket="bucket-1", Key=f"{s3_query.prefix}file-{file_index}.csv", Body=b"foo")
+        directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        mock_local_result = self.enterContext(mock.patch("aws_s3_diff.s3_data.checkpoint.LocalResult"))
+        mock_local_result().get_file_path_account.return_value = directory_path.joinpath("pro.csv")
+        self._mock_s3_uris_file_reader = self.enterContext(
+            mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader")
+        )
+        self._mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = self._s3_queries
+        self.enterContext(mock.patch.dict(os.environ, {"AWS_MAX_KEYS": "2"}))
+
+    def test_get_df_continues_the_interrupted_listing_after_the_last_saved_file(self):
+        expected_result = AccountDataGenerator("pro").get_df()
+        with mock.patch.dict(os.environ, {"AWS_CHECKPOINT": "true"}):
+            dfs = AccountDataGenerator("pro").get_dfs()
+            # The 3 pages of the first S3 URI and the first page of the second one.
+            for _ in range(3 + 1):
+                next(dfs)
+            dfs.close()
+            get_metrics().reset()
+            result = AccountDataGenerator("pro").get_df()
+        assert_frame_equal(expected_result, result)
+        # The last 2 pages of the second S3 URI, the last one is not truncated.
+        self.assertEqual(2, get_metrics().get_run()["list_objects_v2_calls"])
+
+    def test_get_df_does_not_duplicate_the_s3_uri_without_files_if_interrupted_after_it(self):
+        s3_queries = [*self._s3_queries, S3Query("bucket-1", "prefix-3")]
+        self._mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = s3_queries
+        expected_result = AccountDataGenerator("pro").get_df()
+        with mock.patch.dict(os.environ, {"AWS_CHECKPOINT": "true"}):
+            dfs = AccountDataGenerator("pro").get_dfs()
+            # The 3 pages of the first 2 S3 URIs and the page without files of the last one.
+            for _ in range(3 + 3 + 1):
+                next(dfs)
+            dfs.close()
+            get_metrics().reset()
+            result = AccountDataGenerator("pro").get_df()
+        assert_frame_equal(expected_result, result)
+        self.assertEqual(0, get_metrics().get_run()["list_objects_v2_calls"])
+
+
+class TestAccountDataGeneratorWithCoalescedPrefixesLocalS3Server(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_queries = [S3Query("bucket-1", f"folder/prefix-{prefix_index}") for prefix_index in range(4)]
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket="bucket-1")
+        # The last S3 URI has no files.
+        for s3_query in self._s3_queries[:-1]:
+            for file_index in range(2):
+                s3_client.put_object(Bucket="bucket-1", Key=f"{s3_query.prefix}file-{file_index}.csv", Body=b"foo")
+        mock_local_result = self.enterContext(mock.patch("aws_s3_diff.s3_data.one_account.LocalResult"))
+        mock_local_result().get_file_path_account_previous_analysis.return_value = None
+        mock_s3_uris_file_reader = self.enterContext(mock.patch("aws_s3_diff.s3_data.one_account.S3UrisFileReader"))
+        mock_s3_uris_file_reader().get_s3_queries_for_account.return_value = self._s3_queries
+        get_metrics().reset()
+
+    def tearDown(self):
+        get_metrics().reset()
+
+    def test_get_df_returns_same_result_with_fewer_requests_if_prefixes_are_coalesced(self):
+        expected_result = AccountDataGenerator("pro").get_df()
+        self.assertEqual(4, get_metrics().get_run()["list_objects_v2_calls"])
+        get_metrics().reset()
+        # The number of files of the previous analysis, the last S3 URI has no files.
+        number_of_files_of_queries = dict(zip(self._s3_queries, [2, 2, 2, 0], strict=True))
+        with (
+            mock.patch.dict(os.environ, {"AWS_COALESCE_PREFIXES": "true", "AWS_LISTING_WORKERS": "2"}),
+            mock.patch(
+                "aws_s3_diff.s3_data.one_account._PreviousAccountDataReader.get_number_of_files_of_queries",
+                return_value=number_of_files_of_queries,
+            ),
+        ):
+            result = AccountDataGenerator("pro").get_df()
+        assert_frame_equal(expected_result, result)
+        self.assertEqual(1, get_metrics().get_run()["list_objects_v2_calls"])
+
+
+def _get_mock_s3_client_for_query(s3_query: S3Query, _s3_client_factory: S3ClientFactory, **_kwargs) -> mock.Mock:
+    result = mock.Mock()
+    if s3_query.bucket == "bucket_2":
+        result.get_s3_data.return_value = []
+        return result
+    result.get_s3_data.return_value = [
+        S3Data.from_files(
+            FileS3Data(f"{s3_query.bucket}-{page_index}-{file_index}.csv", "2024-10-14", file_index, "hash")
+            for file_index in range(3)
+        )
+        for page_index in range(2)
+    ]
+    return result
+
 
 class TestOriginS3UrisAsIndexAccountDfModifier(unittest.TestCase):
     def test_get_df_replace_index_with_s3_uris_map_if_prefixes_end_and_not_end_with_slash(self):
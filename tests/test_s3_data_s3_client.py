@@ -1,9 +1,27 @@
+import os
+import threading
+import time
 import unittest
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
+import boto3
+import numpy as np
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from botocore.exceptions import ProfileNotFound
+
+from aws_s3_diff.metrics import get_metrics
+from aws_s3_diff.s3_data import s3_client as m_s3_client
+from aws_s3_diff.s3_data.listing_filter import ListingFilter
 from aws_s3_diff.s3_data.s3_client import FolderInS3UriError
 from aws_s3_diff.s3_data.s3_client import S3Client
+from aws_s3_diff.s3_data.s3_client import S3ClientFactory
+from aws_s3_diff.s3_data.s3_client import S3SiblingPrefixesClient
+from aws_s3_diff.type_custom import S3Data
 from aws_s3_diff.type_custom import S3Query
+from tests.aws import S3Server
 
 
 class TestS3Client(unittest.TestCase):
@@ -29,7 +47,378 @@ class TestS3Client(unittest.TestCase):
             for _ in S3Client(S3Query("bucket-1", "tmp")).get_s3_data():
                 pass
         expected_error_message = (
-            "Subfolders detected in bucket 'bucket-1'. The current version of the program cannot manage subfolders"
+            "Subfolders detected in bucket 'bucket-1'. Set AWS_RECURSIVE=true to analyze subfolders"
             ". Subfolders (1): tmp/folder/"
         )
         self.assertEqual(expected_error_message, str(exception.exception))
+
+
+class TestS3ClientFactory(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+
+    def test_get_client_returns_the_same_client_for_the_same_endpoint(self):
+        s3_client_factory = S3ClientFactory()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            clients = list(executor.map(lambda _: s3_client_factory.get_client(), range(20)))
+        self.assertEqual(1, len({id(client) for client in clients}))
+        self.assertEqual(1, s3_client_factory.get_number_of_clients())
+        with patch.dict(os.environ, {"AWS_ENDPOINT": "http://localhost:5000"}):
+            self.assertIsNot(clients[0], s3_client_factory.get_client())
+        self.assertEqual(2, s3_client_factory.get_number_of_clients())
+
+    def test_get_client_uses_the_profile(self):
+        with self.assertRaises(ProfileNotFound) as exception:
+            S3ClientFactory("non-existent-profile").get_client()
+        self.assertIn("non-existent-profile", str(exception.exception))
+
+    @patch.dict(os.environ, {"AWS_MAX_POOL_CONNECTIONS": "20", "AWS_CONNECT_TIMEOUT": "5", "AWS_READ_TIMEOUT": "7"})
+    def test_get_client_returns_client_with_configured_values(self):
+        client_config = S3ClientFactory().get_client().meta.config
+        self.assertEqual(20, client_config.max_pool_connections)
+        self.assertEqual(5, client_config.connect_timeout)
+        self.assertEqual(7, client_config.read_timeout)
+
+
+class TestS3ClientFactoryMetrics(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        get_metrics().reset()
+
+    def tearDown(self):
+        get_metrics().reset()
+
+    def test_get_client_adds_metrics_of_throttled_requests(self):
+        s3_client = S3ClientFactory().get_client()
+        s3_client.create_bucket(Bucket="bucket-1")
+        throttled_responses = [_get_slow_down_response(), _get_slow_down_response()]
+        # A response returned before sending the request is used instead of the local S3 server response.
+        s3_client.meta.events.register(
+            "before-send.s3.ListObjectsV2",
+            lambda **_kwargs: throttled_responses.pop() if len(throttled_responses) > 0 else None,
+        )
+        list(S3Client(S3Query("bucket-1", "folder"), _S3ClientFactoryOfClient(s3_client)).get_s3_data())
+        run = get_metrics().get_run()
+        self.assertEqual((1, 2, 2), (run["list_objects_v2_calls"], run["retries"], run["throttles"]))
+
+
+class TestS3ClientWithThrottlingLocalS3Server(unittest.TestCase):
+    """The local S3 server responses are replaced with throttling errors, before botocore sends the requests."""
+
+    def setUp(self):
+        self.enterContext(S3Server())
+        self.enterContext(patch.dict(os.environ, {"AWS_MAX_ATTEMPTS": "1", "AWS_MAX_KEYS": "2"}))
+        self.enterContext(patch.dict(m_s3_client._rate_controllers, clear=True))
+        self.enterContext(patch.object(m_s3_client._RateController, "_backoff_base_seconds", 0.001))
+        self._s3_client = S3ClientFactory().get_client()
+        self._s3_client.create_bucket(Bucket="bucket-1")
+        for file_number in range(5):
+            self._s3_client.put_object(Bucket="bucket-1", Key=f"folder/file-{file_number}.csv", Body=b"foo")
+        self._s3_query = S3Query("bucket-1", "folder")
+        self._expected_result = list(self._get_s3_data())
+
+    def test_get_s3_data_retries_throttled_requests(self):
+        self._throttle_requests(requests=3)
+        self.assertEqual(self._expected_result, list(self._get_s3_data()))
+        self.assertLess(m_s3_client._get_rate_controller("bucket-1").concurrency_limit, 10)
+
+    @patch.dict(os.environ, {"AWS_LISTING_PARTITIONS": "4"})
+    def test_get_s3_data_retries_throttled_requests_of_parallel_key_ranges(self):
+        self._throttle_requests(requests=10)
+        self.assertEqual(self._expected_result, list(self._get_s3_data()))
+
+    @patch.dict(os.environ, {"AWS_THROTTLE_MAX_ATTEMPTS": "3"})
+    def test_get_s3_data_raises_exception_if_throttled_more_than_max_attempts(self):
+        self._throttle_requests(requests=3)
+        with self.assertRaises(ClientError) as exception:
+            list(self._get_s3_data())
+        self.assertEqual("SlowDown", exception.exception.response["Error"]["Code"])
+
+    def _get_s3_data(self) -> Iterator[S3Data]:
+        return S3Client(self._s3_query, _S3ClientFactoryOfClient(self._s3_client)).get_s3_data()
+
+    def _throttle_requests(self, requests: int):
+        throttled_responses = [_get_slow_down_response() for _ in range(requests)]
+        lock = threading.Lock()
+
+        def get_throttled_response(**_kwargs) -> AWSResponse | None:
+            with lock:
+                return throttled_responses.pop() if len(throttled_responses) > 0 else None
+
+        self._s3_client.meta.events.register("before-send.s3.ListObjectsV2", get_throttled_response)
+
+
+class TestRateController(unittest.TestCase):
+    def test_get_response_does_not_exceed_the_concurrency_limit(self):
+        rate_controller = m_s3_client._RateController(max_concurrency=3)
+        requests_in_progress = []
+        lock = threading.Lock()
+
+        def send_request() -> dict:
+            with lock:
+                requests_in_progress.append(rate_controller._requests_in_progress)
+            time.sleep(0.01)
+            return {}
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(lambda _: rate_controller.get_response(send_request), range(30)))
+        self.assertEqual(3, max(requests_in_progress))
+
+    def test_concurrency_limit_is_halved_if_throttled_and_increased_if_not(self):
+        rate_controller = m_s3_client._RateController(max_concurrency=8)
+        for _ in range(2):
+            rate_controller._decrease_concurrency_limit()
+        self.assertEqual(2, rate_controller.concurrency_limit)
+        for _ in range(5):
+            rate_controller._decrease_concurrency_limit()
+        self.assertEqual(1, rate_controller.concurrency_limit)
+        for _ in range(100):
+            rate_controller._increase_concurrency_limit()
+        self.assertEqual(8, rate_controller.concurrency_limit)
+
+
+class TestResponsesPrefetcher(unittest.TestCase):
+    def test_get_responses_returns_the_responses_in_order_with_any_depth(self):
+        for depth in (0, 1, 3):
+            with self.subTest(depth=depth):
+                self.assertEqual(
+                    list(range(10)), list(m_s3_client._ResponsesPrefetcher(depth).get_responses(iter(range(10))))
+                )
+
+    def test_get_responses_does_not_request_more_responses_than_the_depth(self):
+        responses = _CountedResponses(10)
+        result = m_s3_client._ResponsesPrefetcher(2).get_responses(responses)
+        self.assertEqual(0, next(result))
+        time.sleep(0.2)
+        # 2 responses waiting and 1 response waiting to be queued.
+        self.assertEqual(1 + 2 + 1, responses.requested)
+        result.close()
+        self.assertEqual(1 + 2 + 1, responses.requested)
+
+    def test_get_responses_raises_the_exception_of_the_requests(self):
+        def get_responses():
+            yield 0
+            raise ValueError("foo")
+
+        result = m_s3_client._ResponsesPrefetcher(1).get_responses(get_responses())
+        self.assertEqual(0, next(result))
+        with self.assertRaisesRegex(ValueError, "foo"):
+            next(result)
+
+
+class _CountedResponses:
+    def __init__(self, responses: int):
+        self.requested = 0
+        self._responses = responses
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> int:
+        if self.requested == self._responses:
+            raise StopIteration
+        self.requested += 1
+        return self.requested - 1
+
+
+class _S3ClientFactoryOfClient(S3ClientFactory):
+    def __init__(self, s3_client):
+        super().__init__()
+        self._s3_client = s3_client
+
+    def get_client(self):
+        return self._s3_client
+
+
+class _RawResponse:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def stream(self):
+        yield self._body
+
+
+def _get_slow_down_response() -> AWSResponse:
+    """https://docs.aws.amazon.com/AmazonS3/latest/API/ErrorResponses.html"""
+    body = b"<Error><Code>SlowDown</Code><Message>Please reduce your request rate.</Message></Error>"
+    return AWSResponse("https://bucket-1.s3.amazonaws.com", 503, {}, _RawResponse(body))
+
+
+class TestS3ClientWithLocalS3Server(unittest.TestCase):
+    def setUp(self):
+        self._s3_server = self.enterContext(S3Server())
+        self._s3_query = S3Query("bucket-1", "folder")
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket=self._s3_query.bucket)
+        for file_name in [
+            *(f"{character}-file.csv" for character in "09AZaz_-~.!"),
+            "ñ-file.csv",
+            "B",
+            "B0",
+            "file-0.csv",
+            "file-1.csv",
+        ]:
+            s3_client.put_object(Bucket=self._s3_query.bucket, Key=f"{self._s3_query.prefix}{file_name}", Body=b"foo")
+        s3_client.put_object(Bucket=self._s3_query.bucket, Key="file-not-in-prefix.csv", Body=b"foo")
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_returns_same_result_with_and_without_partitions(self):
+        expected_result = self._get_s3_data_of_all_requests()
+        self.assertEqual(16, len(expected_result))
+        for partitions in ("2", "5", "63", "100"):
+            with self.subTest(partitions=partitions), patch.dict(os.environ, {"AWS_LISTING_PARTITIONS": partitions}):
+                self.assertEqual(expected_result, self._get_s3_data_of_all_requests())
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_returns_same_result_with_and_without_prefetch(self):
+        get_metrics().reset()
+        with patch.dict(os.environ, {"AWS_PREFETCH_PAGES": "0"}):
+            expected_result = self._get_s3_data_of_all_requests()
+        # The last response is not truncated, there is no request without files.
+        self.assertEqual(8, get_metrics().get_run()["list_objects_v2_calls"])
+        for depth in ("1", "3"):
+            with self.subTest(depth=depth), patch.dict(os.environ, {"AWS_PREFETCH_PAGES": depth}):
+                self.assertEqual(expected_result, self._get_s3_data_of_all_requests())
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_returns_same_result_with_and_without_fast_xml_parser(self):
+        expected_result = self._get_s3_data_of_all_requests()
+        for partitions in ("1", "5"):
+            with (
+                self.subTest(partitions=partitions),
+                patch.dict(os.environ, {"AWS_FAST_XML_PARSER": "true", "AWS_LISTING_PARTITIONS": partitions}),
+            ):
+                self.assertEqual(expected_result, self._get_s3_data_of_all_requests())
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_returns_files_after_the_file_name_with_and_without_partitions(self):
+        all_files = self._get_s3_data_of_all_requests()
+        for partitions in ("1", "2", "5", "100"):
+            for file_index in (0, 7, 15):
+                with (
+                    self.subTest(partitions=partitions, file_index=file_index),
+                    patch.dict(os.environ, {"AWS_LISTING_PARTITIONS": partitions}),
+                ):
+                    self.assertEqual(
+                        all_files[file_index + 1 :], self._get_s3_data_of_all_requests(all_files[file_index].name)
+                    )
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_returns_the_files_of_the_filter_with_and_without_partitions(self):
+        all_files = self._get_s3_data_of_all_requests()
+        for filters in ({"include": ["file-*"]}, {"include": ["B*", "*-file.csv"], "exclude": ["~*"]}):
+            listing_filter = ListingFilter(filters)
+            expected_result = [
+                file_s3_data
+                for file_s3_data in all_files
+                if listing_filter.get_mask(*(np.array([value]) for value in file_s3_data[:3]))[0]
+            ]
+            for partitions in ("1", "4"):
+                with (
+                    self.subTest(filters=filters, partitions=partitions),
+                    patch.dict(os.environ, {"AWS_LISTING_PARTITIONS": partitions}),
+                ):
+                    self.assertEqual(expected_result, self._get_s3_data_of_all_requests(listing_filter=listing_filter))
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_requests_only_the_keys_of_the_literal_prefix_of_the_filter(self):
+        get_metrics().reset()
+        result = self._get_s3_data_of_all_requests(listing_filter=ListingFilter({"include": ["file-*"]}))
+        self.assertEqual(["file-0.csv", "file-1.csv"], [file_s3_data.name for file_s3_data in result])
+        # The first response is truncated and the second one has no keys. Without the filter, there are 8 requests.
+        self.assertEqual(2, get_metrics().get_run()["list_objects_v2_calls"])
+        get_metrics().reset()
+
+    def _get_s3_data_of_all_requests(
+        self, start_after_file_name: str | None = None, listing_filter: ListingFilter | None = None
+    ) -> list:
+        return [
+            file_s3_data
+            for s3_data in S3Client(self._s3_query, listing_filter=listing_filter).get_s3_data(start_after_file_name)
+            for file_s3_data in s3_data
+        ]
+
+
+class TestS3ClientWithSubfoldersInLocalS3Server(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_query = S3Query("bucket-1", "folder")
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket=self._s3_query.bucket)
+        for key, body in [
+            ("folder/file-1.csv", b"foo"),
+            ("folder/subfolder/", b""),
+            ("folder/subfolder/file-2.csv", b"foo"),
+            ("folder/subfolder/subfolder/file-3.csv", b"foo"),
+        ]:
+            s3_client.put_object(Bucket=self._s3_query.bucket, Key=key, Body=body)
+
+    @patch.dict(os.environ, {"AWS_RECURSIVE": "true"})
+    def test_get_s3_data_returns_file_paths_relative_to_the_prefix_if_recursive(self):
+        result = [file_s3_data.name for s3_data in S3Client(self._s3_query).get_s3_data() for file_s3_data in s3_data]
+        self.assertEqual(["file-1.csv", "subfolder/file-2.csv", "subfolder/subfolder/file-3.csv"], result)
+
+    def test_get_s3_data_raises_folder_error_if_not_recursive(self):
+        with self.assertRaises(FolderInS3UriError):
+            for _ in S3Client(self._s3_query).get_s3_data():
+                pass
+
+
+class TestS3SiblingPrefixesClientWithLocalS3Server(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        # `folder/a-b/` is before `folder/a/`, `folder/b/` has no files.
+        self._s3_queries = [S3Query("bucket-1", f"folder/{name}") for name in ("a", "a-b", "b", "c")]
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket="bucket-1")
+        for key in [
+            "folder/a/file-1.csv",
+            "folder/a/file-2.csv",
+            "folder/a/file-3.csv",
+            "folder/a-b/file-1.csv",
+            "folder/a0.csv",
+            "folder/b.csv",
+            "folder/c/file-1.csv",
+            "folder/c/subfolder/file-2.csv",
+            "folder/d/file-1.csv",
+        ]:
+            s3_client.put_object(Bucket="bucket-1", Key=key, Body=b"foo")
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2", "AWS_RECURSIVE": "true"})
+    def test_get_s3_data_returns_same_result_as_s3_client(self):
+        expected_result = [list(S3Client(s3_query).get_s3_data()) for s3_query in self._s3_queries]
+        sibling_prefixes_client = S3SiblingPrefixesClient(self._s3_queries)
+        result = [list(sibling_prefixes_client.get_s3_client(s3_query).get_s3_data()) for s3_query in self._s3_queries]
+        self.assertEqual(self._get_files(expected_result), self._get_files(result))
+
+    @patch.dict(os.environ, {"AWS_RECURSIVE": "true"})
+    def test_get_s3_data_returns_files_after_the_file_name(self):
+        s3_client = S3SiblingPrefixesClient(self._s3_queries).get_s3_client(self._s3_queries[0])
+        result = [file_s3_data.name for s3_data in s3_client.get_s3_data("file-1.csv") for file_s3_data in s3_data]
+        self.assertEqual(["file-2.csv", "file-3.csv"], result)
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "1", "AWS_PREFETCH_PAGES": "0", "AWS_RECURSIVE": "true"})
+    def test_get_s3_data_lists_the_s3_uris_alone_after_as_many_requests_as_s3_uris(self):
+        expected_result = [list(S3Client(s3_query).get_s3_data()) for s3_query in self._s3_queries]
+        get_metrics().reset()
+        sibling_prefixes_client = S3SiblingPrefixesClient(self._s3_queries)
+        result = [list(sibling_prefixes_client.get_s3_client(s3_query).get_s3_data()) for s3_query in self._s3_queries]
+        self.assertEqual(self._get_files(expected_result), self._get_files(result))
+        # 4 requests of the folder until `folder/a/file-3.csv`, 1 for the rest of `folder/a/`, 1 for `folder/b/`
+        # and 2 for `folder/c/`.
+        self.assertEqual(8, get_metrics().get_run()["list_objects_v2_calls"])
+        get_metrics().reset()
+
+    def test_get_s3_data_raises_folder_error_if_not_recursive(self):
+        sibling_prefixes_client = S3SiblingPrefixesClient(self._s3_queries)
+        with self.assertRaises(FolderInS3UriError) as exception:
+            list(sibling_prefixes_client.get_s3_client(self._s3_queries[3]).get_s3_data())
+        self.assertIn("folder/c/subfolder/", str(exception.exception))
+
+    @staticmethod
+    def _get_files(s3_data_of_queries: list[list[S3Data]]) -> list[list]:
+        """The pages of the S3 URIs are different."""
+        return [
+            [file_s3_data for s3_data in s3_data_list for file_s3_data in s3_data]
+            for s3_data_list in s3_data_of_queries
+        ]
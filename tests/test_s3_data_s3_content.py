@@ -0,0 +1,57 @@
+import base64
+import hashlib
+import unittest
+from unittest.mock import patch
+
+import boto3
+
+from aws_s3_diff.s3_data.s3_content import S3ContentHasher
+from tests.aws import S3Server
+
+_MULTIPART_BYTES = 5 * 1024 * 1024  # Minimum size of the parts, except the last one.
+
+
+class TestS3ContentHasher(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_client = boto3.client("s3")
+        self._s3_client.create_bucket(Bucket="bucket-1")
+        self._content = b"a" * _MULTIPART_BYTES + b"b"
+        self._expected_result = base64.b64encode(hashlib.sha256(self._content).digest()).decode()
+
+    def test_get_hash_returns_checksum_of_content_if_single_part_with_checksum(self):
+        self._s3_client.put_object(Bucket="bucket-1", Key="file.csv", Body=self._content, ChecksumAlgorithm="SHA256")
+        with patch.object(S3ContentHasher, "_get_hash_of_ranges") as mock_get_hash_of_ranges:
+            result = S3ContentHasher(self._s3_client).get_hash("bucket-1", "file.csv")
+        self.assertEqual(self._expected_result, result)
+        mock_get_hash_of_ranges.assert_not_called()
+
+    def test_get_hash_returns_hash_of_content_if_single_part_without_checksum(self):
+        self._s3_client.put_object(Bucket="bucket-1", Key="file.csv", Body=self._content)
+        self.assertEqual(self._expected_result, S3ContentHasher(self._s3_client).get_hash("bucket-1", "file.csv"))
+
+    def test_get_hash_returns_hash_of_content_if_multipart(self):
+        self._upload_multipart("file.csv")
+        for bytes_per_range in (1024 * 1024, 2 * _MULTIPART_BYTES):
+            with (
+                self.subTest(bytes_per_range=bytes_per_range),
+                patch.object(S3ContentHasher, "_bytes_per_range", bytes_per_range),
+            ):
+                result = S3ContentHasher(self._s3_client).get_hash("bucket-1", "file.csv")
+                self.assertEqual(self._expected_result, result)
+
+    def _upload_multipart(self, key: str):
+        upload_id = self._s3_client.create_multipart_upload(Bucket="bucket-1", Key=key)["UploadId"]
+        parts = []
+        for part_number, start in enumerate(range(0, len(self._content), _MULTIPART_BYTES), 1):
+            response = self._s3_client.upload_part(
+                Bucket="bucket-1",
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=self._content[start : start + _MULTIPART_BYTES],
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self._s3_client.complete_multipart_upload(
+            Bucket="bucket-1", Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
@@ -0,0 +1,240 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from collections.abc import Iterable
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import quote_plus
+
+import boto3
+
+from aws_s3_diff.exception import FolderInS3UriError
+from aws_s3_diff.s3_data import s3_inventory as m_s3_inventory
+from aws_s3_diff.s3_data.listing_filter import ListingFilter
+from aws_s3_diff.s3_data.s3_client import S3Client
+from aws_s3_diff.s3_data.s3_inventory import S3InventoryClient
+from aws_s3_diff.s3_data.s3_inventory import S3InventoryManifests
+from aws_s3_diff.s3_data.s3_inventory import S3InventoryReader
+from aws_s3_diff.type_custom import FileS3Data
+from aws_s3_diff.type_custom import S3Data
+from aws_s3_diff.type_custom import S3Query
+from tests.aws import S3Server
+
+_FILE_SCHEMA = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size, LastModifiedDate, ETag, StorageClass"
+
+
+class TestS3InventoryClient(unittest.TestCase):
+    """The S3 Inventory report files are created with the objects of the local S3 server."""
+
+    def setUp(self):
+        self.enterContext(S3Server())
+        self._s3_query = S3Query("bucket-1", "folder")
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket=self._s3_query.bucket)
+        for key in [
+            "folder/",
+            "folder/file 1.csv",
+            "folder/file+2.csv",
+            "folder/ñ-file.csv",
+            "folder/B",
+            "folder/a-file.csv",
+            "file-not-in-prefix.csv",
+        ]:
+            s3_client.put_object(Bucket=self._s3_query.bucket, Key=key, Body=b"" if key.endswith("/") else b"foo")
+        self._inventory_rows = self._get_inventory_rows(s3_client)
+        self._directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    @patch.dict(os.environ, {"AWS_MAX_KEYS": "2"})
+    def test_get_s3_data_returns_same_files_as_s3_client(self):
+        expected_result = _get_files_s3_data(S3Client(self._s3_query).get_s3_data())
+        self.assertEqual(5, len(expected_result))
+        for file_format in ("CSV", "ORC", "Parquet"):
+            with self.subTest(file_format=file_format):
+                if file_format != "CSV":
+                    self._skip_test_if_pyarrow_is_not_installed()
+                manifest_path = self._get_manifest_path_with_inventory(file_format)
+                self.assertEqual(
+                    expected_result,
+                    _get_files_s3_data(
+                        S3InventoryClient(self._s3_query, _get_s3_inventory_reader(manifest_path)).get_s3_data()
+                    ),
+                )
+
+    def test_get_s3_data_returns_same_files_as_s3_client_with_filter(self):
+        listing_filter = ListingFilter({"include": ["*file*"], "exclude": ["a-*"]})
+        expected_result = _get_files_s3_data(S3Client(self._s3_query, listing_filter=listing_filter).get_s3_data())
+        self.assertEqual(3, len(expected_result))
+        manifest_path = self._get_manifest_path_with_inventory("CSV")
+        result = _get_files_s3_data(
+            S3InventoryClient(self._s3_query, _get_s3_inventory_reader(manifest_path), listing_filter).get_s3_data()
+        )
+        self.assertEqual(expected_result, result)
+
+    def test_get_s3_data_raises_folder_error_if_not_recursive(self):
+        self._inventory_rows.append(self._inventory_rows[0] | {"Key": "folder/subfolder/file.csv"})
+        manifest_path = self._get_manifest_path_with_inventory("CSV")
+        with self.assertRaises(FolderInS3UriError) as exception:
+            list(S3InventoryClient(self._s3_query, _get_s3_inventory_reader(manifest_path)).get_s3_data())
+        self.assertIn("Subfolders (1): folder/subfolder/", str(exception.exception))
+        with patch.dict(os.environ, {"AWS_RECURSIVE": "true"}):
+            result = [
+                file_s3_data.name
+                for s3_data in S3InventoryClient(self._s3_query, _get_s3_inventory_reader(manifest_path)).get_s3_data()
+                for file_s3_data in s3_data
+            ]
+        self.assertIn("subfolder/file.csv", result)
+
+    def test_get_df_of_query_reads_the_report_once_and_splits_the_files_by_s3_uri(self):
+        self._inventory_rows.append(self._inventory_rows[0] | {"Key": "folder-2/file.csv"})
+        self._inventory_rows.append(self._inventory_rows[0] | {"Key": "folder/subfolder/file.csv"})
+        manifest_path = self._get_manifest_path_with_inventory("CSV")
+        s3_queries = [self._s3_query, S3Query("bucket-1", "folder-2"), S3Query("bucket-1", "folder/subfolder")]
+        expected_result = [
+            S3InventoryReader(manifest_path, [s3_query]).get_df_of_query(s3_query).sort_values("name").to_dict("list")
+            for s3_query in s3_queries
+        ]
+        s3_inventory_reader = S3InventoryReader(manifest_path, s3_queries)
+        with patch.object(
+            m_s3_inventory._Manifest, "get_dfs", autospec=True, side_effect=m_s3_inventory._Manifest.get_dfs
+        ) as mock_get_dfs:
+            result = [
+                s3_inventory_reader.get_df_of_query(s3_query).sort_values("name").to_dict("list")
+                for s3_query in s3_queries
+            ]
+        self.assertEqual(1, mock_get_dfs.call_count)
+        self.assertEqual(expected_result, result)
+        self.assertEqual(["file.csv"], result[1]["name"])
+        self.assertIn("subfolder/file.csv", result[0]["name"])
+
+    def test_get_manifest_path_returns_manifest_of_the_bucket(self):
+        manifest_path = self._get_manifest_path_with_inventory("CSV")
+        with patch.dict(os.environ, {"AWS_INVENTORY_MANIFESTS": f"{manifest_path}"}):
+            s3_inventory_manifests = S3InventoryManifests()
+            self.assertEqual(manifest_path, s3_inventory_manifests.get_manifest_path(self._s3_query.bucket))
+            self.assertIsNone(s3_inventory_manifests.get_manifest_path("bucket-2"))
+
+    def test_get_manifest_path_returns_none_if_the_report_has_not_the_required_fields(self):
+        manifest_path = self._get_manifest_path_with_inventory("CSV")
+        manifest = json.loads(manifest_path.read_text())
+        manifest["fileSchema"] = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, LastModifiedDate, StorageClass"
+        manifest_path.write_text(json.dumps(manifest))
+        with (
+            patch.dict(os.environ, {"AWS_INVENTORY_MANIFESTS": f"{manifest_path}"}),
+            self.assertLogs(level="WARNING") as logs,
+        ):
+            self.assertIsNone(S3InventoryManifests().get_manifest_path(self._s3_query.bucket))
+        self.assertIn("has not the fields ['size', 'e_tag']", logs.output[0])
+
+    def test_get_manifest_path_reads_the_fields_of_the_orc_and_parquet_schema(self):
+        manifest_path = self._get_manifest_path_with_inventory("CSV")
+        manifest = json.loads(manifest_path.read_text())
+        for file_format, file_schema in (
+            ("ORC", "struct<bucket:string,key:string,size:bigint,last_modified_date:timestamp,e_tag:string>"),
+            (
+                "Parquet",
+                "message s3.inventory { required binary bucket (STRING); required binary key (STRING);"
+                " optional int64 size; optional int64 last_modified_date (TIMESTAMP(MILLIS,true));"
+                " optional binary e_tag (STRING);}",
+            ),
+        ):
+            with self.subTest(file_format=file_format):
+                manifest_path.write_text(json.dumps(manifest | {"fileFormat": file_format, "fileSchema": file_schema}))
+                with patch.dict(os.environ, {"AWS_INVENTORY_MANIFESTS": f"{manifest_path}"}):
+                    self.assertEqual(manifest_path, S3InventoryManifests().get_manifest_path(self._s3_query.bucket))
+
+    def _get_inventory_rows(self, s3_client) -> list[dict]:
+        """Rows of the S3 Inventory report, it has no order and includes other versions and delete markers."""
+        contents = s3_client.list_objects_v2(Bucket=self._s3_query.bucket)["Contents"]
+        result = [
+            {
+                "Bucket": self._s3_query.bucket,
+                "Key": content["Key"],
+                "VersionId": "",
+                "IsLatest": "true",
+                "IsDeleteMarker": "false",
+                "Size": str(content["Size"]),
+                "LastModifiedDate": content["LastModified"].strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "ETag": content["ETag"].strip('"'),
+                "StorageClass": "STANDARD",
+            }
+            for content in reversed(contents)
+        ]
+        result.append(result[0] | {"Key": "folder/deleted-file.csv", "IsDeleteMarker": "true", "Size": "", "ETag": ""})
+        result.append(result[0] | {"Key": "folder/file 1.csv", "IsLatest": "false", "Size": "1"})
+        result.append(result[0] | {"Bucket": "bucket-2", "Key": "folder/file-of-other-bucket.csv"})
+        return result
+
+    def _get_manifest_path_with_inventory(self, file_format: str) -> Path:
+        """https://docs.aws.amazon.com/AmazonS3/latest/userguide/storage-inventory-location.html"""
+        data_file_name = {"CSV": "inventory.csv.gz", "ORC": "inventory.orc", "Parquet": "inventory.parquet"}[
+            file_format
+        ]
+        data_file_path = self._directory_path.joinpath("data", data_file_name)
+        data_file_path.parent.mkdir(exist_ok=True)
+        if file_format == "CSV":
+            with gzip.open(data_file_path, "wt", newline="") as file:
+                writer = csv.writer(file, quoting=csv.QUOTE_ALL)
+                for row in self._inventory_rows:
+                    writer.writerow(quote_plus(value) if name == "Key" else value for name, value in row.items())
+        else:
+            self._write_arrow_inventory(data_file_path, file_format)
+        manifest_path = self._directory_path.joinpath("2024-10-14T01-00Z", "manifest.json")
+        manifest_path.parent.mkdir(exist_ok=True)
+        manifest = {
+            "sourceBucket": self._s3_query.bucket,
+            "destinationBucket": "arn:aws:s3:::inventory-bucket",
+            "fileFormat": file_format,
+            "fileSchema": _FILE_SCHEMA,
+            "files": [{"key": f"inventory/bucket-1/config-1/data/{data_file_name}", "size": 1, "MD5checksum": "foo"}],
+        }
+        manifest_path.write_text(json.dumps(manifest))
+        return manifest_path
+
+    def _write_arrow_inventory(self, data_file_path: Path, file_format: str):
+        import pandas as pd
+        import pyarrow as pa
+
+        df = pd.DataFrame(self._inventory_rows).rename(
+            columns={
+                "Bucket": "bucket",
+                "Key": "key",
+                "VersionId": "version_id",
+                "IsLatest": "is_latest",
+                "IsDeleteMarker": "is_delete_marker",
+                "Size": "size",
+                "LastModifiedDate": "last_modified_date",
+                "ETag": "e_tag",
+                "StorageClass": "storage_class",
+            }
+        )
+        df["is_latest"] = df["is_latest"].eq("true")
+        df["is_delete_marker"] = df["is_delete_marker"].eq("true")
+        df["size"] = pd.to_numeric(df["size"].mask(df["size"].eq(""))).astype("Int64")
+        df["last_modified_date"] = pd.to_datetime(df["last_modified_date"])
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if file_format == "ORC":
+            import pyarrow.orc as orc
+
+            orc.write_table(table, data_file_path)
+        else:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, data_file_path)
+
+    def _skip_test_if_pyarrow_is_not_installed(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+
+
+def _get_s3_inventory_reader(manifest_path: Path) -> S3InventoryReader:
+    return S3InventoryReader(manifest_path, [S3Query("bucket-1", "folder")])
+
+
+def _get_files_s3_data(s3_data_pages: Iterable[S3Data]) -> list[FileS3Data]:
+    """The pages can be different, S3 omits the folders after paginating."""
+    return [file_s3_data for s3_data in s3_data_pages for file_s3_data in s3_data]
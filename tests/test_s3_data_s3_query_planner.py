@@ -0,0 +1,68 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from aws_s3_diff.s3_data.s3_query_planner import S3QueriesPlanner
+from aws_s3_diff.type_custom import S3Query
+
+
+@patch.dict(os.environ, {"AWS_MAX_KEYS": "10"})
+class TestS3QueriesPlanner(unittest.TestCase):
+    def test_get_groups_returns_s3_uris_of_the_same_bucket_and_folder(self):
+        s3_queries = [
+            S3Query("bucket-1", "folder/b"),
+            S3Query("bucket-1", "folder/a"),
+            S3Query("bucket-1", "other-folder/a"),
+            S3Query("bucket-2", "folder/c"),
+            S3Query("bucket-1", "folder/subfolder/a"),
+            S3Query("bucket-1", "folder/subfolder/b"),
+            S3Query("bucket-1", "a"),
+            S3Query("bucket-1", "b"),
+        ]
+        self.assertEqual(
+            [
+                [S3Query("bucket-1", "folder/a"), S3Query("bucket-1", "folder/b")],
+                [S3Query("bucket-1", "folder/subfolder/a"), S3Query("bucket-1", "folder/subfolder/b")],
+            ],
+            S3QueriesPlanner(dict.fromkeys(s3_queries, 1)).get_groups(s3_queries),
+        )
+
+    def test_get_groups_does_not_group_s3_uris_with_unknown_number_of_files(self):
+        s3_queries = [S3Query("bucket-1", f"folder/{name}") for name in "abcde"]
+        self.assertEqual([], S3QueriesPlanner({}).get_groups(s3_queries))
+        # The S3 URI without previous files is between the groups.
+        number_of_files_of_queries = {s3_query: 1 for s3_query in s3_queries if s3_query.prefix != "folder/c/"}
+        self.assertEqual(
+            [s3_queries[:2], s3_queries[3:]], S3QueriesPlanner(number_of_files_of_queries).get_groups(s3_queries)
+        )
+
+    def test_get_groups_estimates_the_files_of_the_s3_uris_between_the_s3_uris_to_list(self):
+        s3_queries = [S3Query("bucket-1", f"folder/{name}") for name in "abc"]
+        # The S3 URIs `folder/b/` and `folder/b/subfolder/` have previous results, they are not listed again.
+        number_of_files_of_queries = dict.fromkeys(s3_queries, 1) | {
+            S3Query("bucket-1", "folder/b/"): 8,
+            S3Query("bucket-1", "folder/b/subfolder/"): 9,
+            S3Query("bucket-2", "folder/b/"): 100,
+        }
+        s3_queries_to_list = [s3_queries[0], s3_queries[2]]
+        self.assertEqual([], S3QueriesPlanner(number_of_files_of_queries).get_groups(s3_queries_to_list))
+        number_of_files_of_queries[S3Query("bucket-1", "folder/b/subfolder/")] = 0
+        self.assertEqual(
+            [s3_queries_to_list], S3QueriesPlanner(number_of_files_of_queries).get_groups(s3_queries_to_list)
+        )
+
+    def test_get_groups_does_not_group_s3_uris_with_more_requests_together(self):
+        s3_queries = [S3Query("bucket-1", f"folder/{name}") for name in "abcd"]
+        number_of_files_of_queries = dict(zip(s3_queries, [10, 9, 9, 0], strict=True))
+        # The S3 URI with one page is listed alone, 2 requests for the other 3 S3 URIs.
+        self.assertEqual([s3_queries[1:]], S3QueriesPlanner(number_of_files_of_queries).get_groups(s3_queries))
+        number_of_files_of_queries[s3_queries[3]] = 9
+        self.assertEqual([], S3QueriesPlanner(number_of_files_of_queries).get_groups(s3_queries))
+
+    @patch.object(S3QueriesPlanner, "_max_files_per_listing", 5)
+    def test_get_groups_splits_the_groups_with_more_files_than_the_maximum(self):
+        s3_queries = [S3Query("bucket-1", f"folder/{name}") for name in "abcde"]
+        number_of_files_of_queries = dict(zip(s3_queries, [2, 2, 2, 0, 2], strict=True))
+        self.assertEqual(
+            [s3_queries[:2], s3_queries[2:]], S3QueriesPlanner(number_of_files_of_queries).get_groups(s3_queries)
+        )
@@ -0,0 +1,96 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+from pandas import concat
+from pandas import DataFrame as Df
+from pandas import to_datetime
+from pandas.testing import assert_frame_equal
+
+from aws_s3_diff.exception import StorageFormatError
+from aws_s3_diff.storage import get_storage
+
+
+class TestGetStorage(unittest.TestCase):
+    @patch.dict(os.environ, {"AWS_STORAGE_FORMAT": "xlsx"})
+    def test_get_storage_raises_exception_if_not_supported_format(self):
+        with self.assertRaises(StorageFormatError) as exception:
+            get_storage()
+        self.assertEqual(
+            "Not supported storage format 'xlsx'. Supported formats: csv, feather, parquet", str(exception.exception)
+        )
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self._directory_path = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_write_dfs_and_read_df_return_the_concatenation_of_the_dfs(self):
+        dfs = [
+            Df({"name": [None], "date": to_datetime([np.nan], utc=True), "size": [None], "hash": [None]}),
+            Df(
+                {
+                    "name": ["file.csv"],
+                    "date": to_datetime(["2024-10-14 08:49:01+00:00"], utc=True),
+                    "size": [49],
+                    "hash": ["f15993242621717c5eb2a329b672bc1d"],
+                }
+            ),
+        ]
+        dfs = [df.astype({"size": "Int64"}) for df in dfs]
+        for storage_format in self._get_storage_formats():
+            with (
+                self.subTest(storage_format=storage_format),
+                patch.dict(os.environ, {"AWS_STORAGE_FORMAT": storage_format}),
+            ):
+                storage = get_storage()
+                file_path = self._directory_path.joinpath(f"file.{storage.extension}")
+                storage.write_dfs(dfs, file_path)
+                result = storage.read_df(file_path, date_column_names=["date"]).astype({"size": "Int64"})
+                self.assertEqual([None, "file.csv"], result["name"].replace({np.nan: None}).tolist())
+                self.assertEqual(
+                    [None, "f15993242621717c5eb2a329b672bc1d"], result["hash"].replace({np.nan: None}).tolist()
+                )
+                assert_frame_equal(
+                    Df(
+                        {"date": to_datetime([np.nan, "2024-10-14 08:49:01+00:00"], utc=True), "size": [None, 49]}
+                    ).astype({"size": "Int64"}),
+                    result[["date", "size"]],
+                )
+
+    def test_read_dfs_returns_dfs_whose_concatenation_is_read_df(self):
+        df = Df({"name": [f"file-{index}.csv" for index in range(5)], "size": range(5)})
+        for storage_format in self._get_storage_formats():
+            with (
+                self.subTest(storage_format=storage_format),
+                patch.dict(os.environ, {"AWS_STORAGE_FORMAT": storage_format}),
+            ):
+                storage = get_storage()
+                file_path = self._directory_path.joinpath(f"file.{storage.extension}")
+                storage.write_dfs([df.iloc[:3], df.iloc[3:]], file_path)
+                result = list(storage.read_dfs(file_path, date_column_names=[], rows_per_df=3))
+                self.assertEqual(2, len(result))
+                assert_frame_equal(storage.read_df(file_path, date_column_names=[]), concat(result, ignore_index=True))
+
+    def test_read_dfs_returns_dfs_with_the_rows_per_df_if_written_in_one_df(self):
+        df = Df({"name": [f"file-{index}.csv" for index in range(7)], "size": range(7)})
+        for storage_format in self._get_storage_formats():
+            with (
+                self.subTest(storage_format=storage_format),
+                patch.dict(os.environ, {"AWS_STORAGE_FORMAT": storage_format}),
+            ):
+                storage = get_storage()
+                file_path = self._directory_path.joinpath(f"file.{storage.extension}")
+                storage.write_df(df, file_path)
+                result = list(storage.read_dfs(file_path, date_column_names=[], rows_per_df=3))
+                self.assertEqual([3, 3, 1], [len(result_df) for result_df in result])
+                assert_frame_equal(df, concat(result, ignore_index=True))
+
+    def _get_storage_formats(self) -> list[str]:
+        if importlib.util.find_spec("pyarrow") is None:
+            return ["csv"]
+        return ["csv", "feather", "parquet"]
@@ -1,5 +1,11 @@
 import unittest
 
+import pandas as pd
+from pandas import DataFrame as Df
+from pandas.testing import assert_frame_equal
+
+from aws_s3_diff.type_custom import FileS3Data
+from aws_s3_diff.type_custom import S3Data
 from aws_s3_diff.type_custom import S3Query
 
 
@@ -13,3 +19,35 @@ class TestS3Query(unittest.TestCase):
     def test_equals_if_different_prefix_slash_end(self):
         prefix = "bar/baz"
         self.assertEqual(S3Query("foo", prefix), S3Query("foo", f"{prefix}/"))
+
+    def test_hash_is_equal_if_different_prefix_slash_end(self):
+        prefix = "bar/baz"
+        self.assertEqual({S3Query("foo", prefix)}, {S3Query("foo", f"{prefix}/")})
+
+
+class TestS3Data(unittest.TestCase):
+    def setUp(self):
+        self._files = [
+            FileS3Data(
+                "file-1.csv", pd.Timestamp("2024-10-14 08:49:01", tz="UTC"), 3, "acbd18db4cc2f85cedef654fccc4a4d8"
+            ),
+            FileS3Data("ñ-file.csv", pd.Timestamp("2024-10-15 10:00:00.123", tz="UTC"), 0, "d41d8cd98f00b204-2"),
+        ]
+
+    def test_iter_returns_the_files(self):
+        self.assertEqual(self._files, list(S3Data.from_files(self._files)))
+
+    def test_get_df_has_the_types_of_the_account_df(self):
+        result = S3Data.from_files(self._files).get_df()
+        expected_result = Df(file._asdict() for file in self._files)
+        assert_frame_equal(expected_result, result)
+        self.assertEqual("datetime64[ns, UTC]", str(result["date"].dtype))
+        self.assertEqual("int64", str(result["size"].dtype))
+
+    def test_get_df_returns_the_name_and_the_selected_columns(self):
+        result = S3Data.from_files(self._files).get_df(["size", "hash"])
+        expected_result = Df(file._asdict() for file in self._files).drop(columns=["date"])
+        assert_frame_equal(expected_result, result)
+
+    def test_get_bytes_returns_the_sum_of_the_sizes(self):
+        self.assertEqual(3, S3Data.from_files(self._files).get_bytes())